@@ -0,0 +1,66 @@
+# Time `ftcheck diff` on two generated scan outputs and report its peak memory
+# Run from the repo root: python benchmarks/bench_diff.py [ITEMS] [MEMORY_LIMIT]
+# The old output is a --json document, the new one NDJSON with about 1% of paths changed
+
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from filetype_checker import extsort, scandiff
+
+
+def item(i: int, changed: bool) -> dict:
+    file_type = "GIF Image" if changed else "PNG Image"
+    return {
+        "ok": True,
+        "path": f"/data/d{i // 1000:04}/{i:08}.png",
+        "file_type": file_type,
+        "size_bytes": 1000 + i,
+        "magic": {"matched": True, "offset": 0, "signature": "89504E470D0A1A0A"},
+        "ext": ".png",
+        "mismatch": changed,
+    }
+
+
+def write_outputs(tmpdir: str, count: int) -> tuple[str, str]:
+    old = os.path.join(tmpdir, "old.json")
+    new = os.path.join(tmpdir, "new.ndjson")
+    with open(old, "w", encoding="utf-8") as f:
+        f.write('{"ok":true,"summary":{"inputs":1},"results":[')
+        for i in range(count):
+            f.write(("," if i else "") + json.dumps(item(i, False), separators=(",", ":")))
+        f.write("]}\n")
+    with open(new, "w", encoding="utf-8") as f:
+        # Drop every 500th path and shift the rest so there are additions as well
+        for i in range(count + count // 1000):
+            if i % 500:
+                f.write(json.dumps(item(i, i % 97 == 0), separators=(",", ":")) + "\n")
+    return old, new
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    memory_limit = extsort.parse_size(sys.argv[2]) if len(sys.argv) > 2 else 64 << 20
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        old, new = write_outputs(tmpdir, count)
+        sizes = os.path.getsize(old) + os.path.getsize(new)
+        start = time.perf_counter()
+        counts = scandiff.new_counts()
+        with scandiff.sorted_entries(old, memory_limit // 2, tmpdir) as a:
+            with scandiff.sorted_entries(new, memory_limit // 2, tmpdir) as b:
+                for _ in scandiff.diff_entries(a, b, counts):
+                    pass
+        seconds = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"inputs: {sizes / 2**20:.0f} MiB, {count} items each")
+    print(f"diff: {seconds:.2f}s  {count / seconds:.0f} items/s  peak RSS {peak:.0f} MiB")
+    print(counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Time scans of a tree where every file is unreadable, with and without --collapse-errors
+# Run from the repo root: python benchmarks/bench_errors.py [FILES]
+# Root can read any file, so when run as root each scan runs in a child as user "nobody"
+
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from filetype_checker import cli
+
+NOBODY = 65534
+MODES = (
+    ("ndjson", ["--ndjson"]),
+    ("ndjson collapsed", ["--ndjson", "--collapse-errors"]),
+    ("json", ["--json"]),
+    ("json collapsed", ["--json", "--collapse-errors"]),
+)
+
+
+def make_tree(root: str, count: int) -> None:
+    for i in range(count):
+        if i % 1000 == 0:
+            directory = os.path.join(root, f"d{i // 1000:05}")
+            os.mkdir(directory)
+        # Mode 0: nobody but root may open it
+        os.close(os.open(os.path.join(directory, f"{i:08}.bin"), os.O_CREAT | os.O_WRONLY, 0))
+
+
+# Scan in a forked child so peak RSS is per mode and root can drop to nobody
+def run(tree: str, args: list[str]) -> tuple[float, float]:
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        if os.geteuid() == 0:
+            os.setgid(NOBODY)
+            os.setuid(NOBODY)
+        start = time.perf_counter()
+        cli.main(["-r", "-o", os.devnull, *args, tree])
+        seconds = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        os.write(write_fd, f"{seconds} {peak}".encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result = f.read()
+    os.waitpid(pid, 0)
+    seconds, peak = map(float, result.split())
+    return seconds, peak
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    root = tempfile.mkdtemp()
+    os.chmod(root, 0o755)
+    try:
+        make_tree(root, count)
+        sys.stderr = open(os.devnull, "w")
+        for name, args in MODES:
+            seconds, peak = run(root, args)
+            print(
+                f"{name:>17}: {seconds:6.2f}s  {count / seconds:9.0f} files/s  "
+                f"peak RSS {peak:5.0f} MiB",
+                file=sys.__stderr__,
+            )
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Compare per-line print() with LineWriter batching for human, NDJSON and TSV output
+# Run from the repo root: python benchmarks/bench_output.py [LINES] > /dev/null
+# Output goes to stdout (redirect it to a file, a pipe or /dev/null); timings go to stderr
+
+import sys
+import time
+
+from filetype_checker import reporting
+
+
+def make_items(count: int) -> list[dict]:
+    items = []
+    for i in range(count):
+        if i % 50 == 0:
+            items.append(
+                {
+                    "ok": False,
+                    "path": f"/data/d{i // 1000:04}/{i:08}.bin",
+                    "error": {"code": "EACCES", "message": "Permission denied"},
+                }
+            )
+            continue
+        items.append(
+            {
+                "ok": True,
+                "path": f"/data/d{i // 1000:04}/{i:08}.png",
+                "file_type": "PNG Image",
+                "size_bytes": 1000 + i,
+                "magic": {"matched": True, "offset": 0, "signature": "89504E470D0A1A0A"},
+                "ext": ".png",
+                "mismatch": False,
+            }
+        )
+    return items
+
+
+def human(item: dict) -> str:
+    if item["ok"]:
+        return reporting.format_human_success(item) + "\n"
+    error = item["error"]
+    return reporting.format_human_error(item["path"], error["code"], error["message"]) + "\n"
+
+
+def ndjson(item: dict) -> str:
+    return reporting.format_json(item) + "\n"
+
+
+def bench_print(items: list[dict], fmt) -> float:
+    start = time.perf_counter()
+    for item in items:
+        print(fmt(item), end="", file=sys.stdout)
+    sys.stdout.flush()
+    return time.perf_counter() - start
+
+
+def bench_writer(items: list[dict], fmt) -> float:
+    start = time.perf_counter()
+    writer = reporting.LineWriter(sys.stdout)
+    write = writer.write
+    for item in items:
+        write(fmt(item))
+    writer.close()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    items = make_items(count)
+
+    for name, fmt in (("human", human), ("ndjson", ndjson), ("tsv", reporting.format_tsv)):
+        for mode, bench in (("print", bench_print), ("LineWriter", bench_writer)):
+            seconds = bench(items, fmt)
+            print(
+                f"{name:>6} {mode:>10}: {seconds:6.2f}s  {count / seconds:10.0f} lines/s",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Compare the shared-memory process pool with a naive pickle-based multiprocessing.Pool
+# Run from the repo root: python benchmarks/bench_parallel.py [FILES] [WORKERS]
+
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+from filetype_checker import cli, parallel, reporting
+from filetype_checker.error import ErrorRecord
+
+PAYLOADS = [b"%PDF-1.4", b"\x89PNG\r\n\x1a\n", b"plain text\n", b"\x00\x11\x22\x33"]
+
+
+def _pickle_detect(path: str) -> dict:
+    # What a naive pool returns: the full report dict, pickled back to the parent
+    return cli._detect_item(path)
+
+
+def make_tree(root: str, count: int) -> list[str]:
+    paths = []
+    for i in range(count):
+        sub = os.path.join(root, f"d{i // 1000:04}")
+        os.makedirs(sub, exist_ok=True)
+        path = os.path.join(sub, f"{i:07}.bin")
+        with open(path, "wb") as f:
+            f.write(PAYLOADS[i % len(PAYLOADS)])
+        paths.append(path)
+    return paths
+
+
+def bench_shared_memory(paths: list[str], workers: int) -> float:
+    start = time.perf_counter()
+    for report, rule in parallel.iter_results(paths, workers):
+        if not isinstance(report, ErrorRecord):
+            reporting.report_item(report, rule)
+    return time.perf_counter() - start
+
+
+def bench_pickle_pool(paths: list[str], workers: int) -> float:
+    start = time.perf_counter()
+    with mp.Pool(workers) as pool:
+        for _ in pool.imap(_pickle_detect, paths, chunksize=parallel.DEFAULT_BATCH_SIZE):
+            pass
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 2
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = make_tree(root, count)
+        benches = (("shared memory", bench_shared_memory), ("pickle pool", bench_pickle_pool))
+        for name, bench in benches:
+            seconds = bench(paths, workers)
+            rate = count / seconds
+            print(f"{name:>14}: {seconds:6.2f}s  {rate:10.0f} files/s ({workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
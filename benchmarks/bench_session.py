@@ -0,0 +1,54 @@
+# Compare repeated small scans through the free functions with a reused Session
+# Run from the repo root: python benchmarks/bench_session.py [SCANS] [FILES]
+
+import os
+import sys
+import tempfile
+import time
+
+from filetype_checker import detector, scanner
+from filetype_checker.reporting import report_item
+from filetype_checker.session import Session
+
+PAYLOADS = [b"%PDF-1.4\n" * 40, b"\x89PNG\r\n\x1a\n" * 100, b"plain text\n" * 30]
+
+
+def make_files(root: str, count: int) -> None:
+    for i in range(count):
+        with open(os.path.join(root, f"{i:05}.bin"), "wb") as f:
+            f.write(PAYLOADS[i % len(PAYLOADS)])
+
+
+# What library users did before sessions: expand, then detect each file from scratch
+def scan_free(root: str) -> int:
+    files, _ = scanner.expand_paths([root], recursive=False)
+    for path in files:
+        report_item(*detector.detect_with_rule(path))
+    return len(files)
+
+
+def bench(name: str, scan, scans: int) -> None:
+    start = time.perf_counter()
+    files = sum(scan() for _ in range(scans))
+    seconds = time.perf_counter() - start
+    rates = f"{scans / seconds:8.0f} scans/s  {files / seconds:9.0f} files/s"
+    print(f"{name:>18}: {seconds:6.2f}s  {rates}")
+
+
+def main() -> None:
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as root:
+        make_files(root, count)
+        bench("free functions", lambda: scan_free(root), scans)
+        with Session() as session:
+            bench("Session", lambda: sum(1 for _ in session.scan(root)), scans)
+        with Session(cache_size=count) as session:
+            bench("Session + cache", lambda: sum(1 for _ in session.scan(root)), scans)
+        with Session(threads=4) as session:
+            bench("Session, 4 threads", lambda: sum(1 for _ in session.scan(root)), scans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Compare buffered open()/fstat()/read() detection with HeaderReader on many tiny files
+# Run from the repo root: python benchmarks/bench_small_files.py [FILES]
+
+import os
+import sys
+import tempfile
+import time
+
+from filetype_checker import detector
+
+PAYLOADS = [b"%PDF-1.4\n" * 40, b"\x89PNG\r\n\x1a\n" * 100, b"plain text\n" * 30]
+
+
+def make_files(root: str, count: int) -> list[str]:
+    paths = []
+    for i in range(count):
+        sub = os.path.join(root, f"d{i // 1000:04}")
+        os.makedirs(sub, exist_ok=True)
+        path = os.path.join(sub, f"{i:07}.bin")
+        with open(path, "wb") as f:
+            f.write(PAYLOADS[i % len(PAYLOADS)])
+        paths.append(path)
+    return paths
+
+
+def bench(paths: list[str], reader) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        detector.detect_with_rule(path, False, reader)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = make_files(root, count)
+        with detector.HeaderReader() as reader:
+            for name, r in (("buffered open", None), ("HeaderReader", reader)):
+                seconds = bench(paths, r)
+                print(f"{name:>14}: {seconds:6.2f}s  {count / seconds:10.0f} files/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# Microbenchmark for the text/binary classifier used on unmatched headers
+# Run from the repo root: python benchmarks/bench_textclass.py
+
+import timeit
+
+from filetype_checker import textclass
+
+SAMPLES = {
+    "ascii": b"id,name,size\n" * 64,
+    "utf-8": "naïve café, résumé\n".encode() * 32,
+    "utf-16le bom": "plain text\n".encode("utf-16") * 32,
+    "json": b'{"items": [1, 2, 3], "ok": true}\n' * 32,
+    "binary": bytes(range(256)) * 4,
+}
+
+
+def main() -> None:
+    number = 100_000
+    for name, payload in SAMPLES.items():
+        header = payload[: textclass.TEXT_WINDOW]
+        seconds = timeit.timeit(lambda h=header: textclass.classify_text(h), number=number)
+        print(f"{name:>14}: {seconds / number * 1e9:8.0f} ns/header ({len(header)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Compare serial and threaded directory listing with per-call latency injected into scandir,
+# standing in for a network filesystem where every listing is a round-trip
+# Run from the repo root: python benchmarks/bench_walk.py [ENTRIES] [LATENCY_MS] [THREADS]
+
+import os
+import sys
+import tempfile
+import time
+
+from filetype_checker import scanner
+
+FILES_PER_DIR = 100
+DIRS_PER_PARENT = 10
+
+
+def make_tree(root: str, entries: int) -> int:
+    # Two directory levels with FILES_PER_DIR empty files in each leaf
+    leaves = max(1, entries // FILES_PER_DIR)
+    made = 0
+    for i in range(leaves):
+        leaf = os.path.join(root, f"p{i // DIRS_PER_PARENT:05}", f"d{i % DIRS_PER_PARENT:02}")
+        os.makedirs(leaf, exist_ok=True)
+        for j in range(FILES_PER_DIR):
+            os.close(os.open(os.path.join(leaf, f"{j:03}.bin"), os.O_CREAT | os.O_WRONLY, 0o644))
+            made += 1
+    return made
+
+
+def slow_scandir(latency: float):
+    real_scandir = os.scandir
+
+    def scandir(path):
+        time.sleep(latency)
+        return real_scandir(path)
+
+    return scandir
+
+
+def bench(root: str, threads: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    files, problems = scanner.expand_paths([root], recursive=True, threads=threads)
+    assert not problems
+    return time.perf_counter() - start, len(files)
+
+
+def main() -> None:
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.002
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    with tempfile.TemporaryDirectory() as root:
+        made = make_tree(root, entries)
+        print(f"tree: {made} files, {latency * 1000:.1f} ms per scandir call")
+        real_scandir = os.scandir
+        os.scandir = slow_scandir(latency)
+        try:
+            for n in (1, threads):
+                seconds, found = bench(root, n)
+                print(f"{n:>3} threads: {seconds:6.2f}s  {found / seconds:10.0f} entries/s")
+        finally:
+            os.scandir = real_scandir
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,13 @@ except PackageNotFoundError:
     __version__ = "0.0.0"
 
 from .error import (
+    ArchiveLimitError,
+    ArchiveReadError,
+    CheckpointError,
     CliUsageError,
+    ErrorRecord,
     FileReadError,
+    FileTimeoutError,
     FtcheckError,
     InternalDetectionError,
     InvalidPathArgumentError,
@@ -19,8 +24,12 @@ from .error import (
     PathIsDirectoryError,
     PathNotFoundError,
     PermissionDeniedError,
+    PolicyError,
+    PrioritySettingError,
+    ScanDiffError,
     SignatureDatabaseError,
     SignatureParseError,
+    SinkWriteError,
 )
 
 __all__ = [
@@ -38,4 +47,13 @@ __all__ = [
     "InternalDetectionError",
     "JsonSerializationError",
     "OutputWriteError",
+    "SinkWriteError",
+    "ArchiveReadError",
+    "ArchiveLimitError",
+    "CheckpointError",
+    "PrioritySettingError",
+    "FileTimeoutError",
+    "PolicyError",
+    "ScanDiffError",
+    "ErrorRecord",
 ]
\ No newline at end of file
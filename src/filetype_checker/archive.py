@@ -0,0 +1,171 @@
+# Classify members of ZIP archives without extracting them
+# Only the central directory and each member's header window are read, and
+# depth, member count and expanded bytes are capped to defend against zip bombs
+
+import io
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, Optional, Union
+
+from filetype_checker import detector, throttle
+from filetype_checker.error import ArchiveLimitError, ArchiveReadError, FtcheckError
+
+# Separator between an archive path and a member name, e.g. "uploads/a.zip!docs/b.pdf"
+MEMBER_SEPARATOR = "!"
+ZIP_FILE_TYPE = "ZIP Archive"
+
+_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+
+@dataclass(frozen=True)
+class ArchiveLimits:
+    """Per top-level archive limits; nested archives share their parent's budget."""
+
+    max_depth: int = 2
+    max_members: int = 10_000
+    max_expanded_bytes: int = 64 * 1024 * 1024
+
+
+# A member header read from an archive: (member path, uncompressed size, header bytes)
+MemberHeader = tuple[str, int, bytes]
+
+
+class _Budget:
+    def __init__(self, limits: ArchiveLimits) -> None:
+        self.limits = limits
+        self.members = 0
+        self.expanded_bytes = 0
+        self.exhausted = False
+
+    def fits(self, nbytes: int) -> bool:
+        return self.expanded_bytes + nbytes <= self.limits.max_expanded_bytes
+
+
+def member_path(archive_path: str, name: str) -> str:
+    return f"{archive_path}{MEMBER_SEPARATOR}{name}"
+
+
+# Raw file that charges every read to a limiter, below the buffer so read-ahead is counted
+class _ThrottledFile(io.RawIOBase):
+    def __init__(self, path: str, limiter: throttle.Throttle) -> None:
+        self._raw = open(path, "rb", buffering=0)
+        self._limiter = limiter
+
+    def readinto(self, b) -> Optional[int]:
+        n = self._raw.readinto(b)
+        if n:
+            self._limiter.after_read(n)
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def iter_zip_members(
+    path: str,
+    limits: ArchiveLimits | None = None,
+    signatures: detector.SignatureSet | None = None,
+    limiter: throttle.Throttle | None = None,
+) -> Iterator[Union[MemberHeader, FtcheckError]]:
+    """Yield the header of every member of the ZIP at ``path``, recursing into nested ZIPs.
+
+    Problems are yielded as ``FtcheckError`` items rather than raised, so one bad
+    member does not hide the rest of the archive. Headers are sized for
+    ``signatures`` (default: the set active when the archive is opened). Every
+    byte read from ``path`` is charged to ``limiter``'s byte rate.
+    """
+    budget = _Budget(limits or ArchiveLimits())
+    signatures = signatures or detector.current_signatures()
+    try:
+        if limiter is not None and limiter.enabled:
+            source = io.BufferedReader(_ThrottledFile(path, limiter))
+        else:
+            source = open(path, "rb")
+        with source, zipfile.ZipFile(source) as zf:
+            yield from _walk_zip(zf, path, 1, budget, signatures)
+    except (zipfile.BadZipFile, OSError) as e:
+        yield ArchiveReadError(path, os_error=str(e))
+
+
+def _walk_zip(
+    zf: zipfile.ZipFile,
+    prefix: str,
+    depth: int,
+    budget: _Budget,
+    signatures: detector.SignatureSet,
+):
+    limits = budget.limits
+
+    for info in zf.infolist():
+        if budget.exhausted:
+            return
+        if info.is_dir():
+            continue
+
+        name = member_path(prefix, info.filename)
+        window = min(info.file_size, signatures.max_bytes)
+        if budget.members >= limits.max_members:
+            budget.exhausted = True
+            yield ArchiveLimitError(
+                prefix, message=f"Archive member limit ({limits.max_members}) reached: {prefix}"
+            )
+            return
+        if not budget.fits(window):
+            budget.exhausted = True
+            yield ArchiveLimitError(
+                prefix,
+                message=f"Archive expanded-bytes limit ({limits.max_expanded_bytes}) "
+                f"reached: {prefix}",
+            )
+            return
+        budget.members += 1
+
+        # zipfile reads stored members directly and only inflates as much as requested
+        try:
+            with zf.open(info) as member:
+                header = member.read(window)
+        except _MEMBER_ERRORS as e:
+            yield ArchiveReadError(name, os_error=str(e))
+            continue
+        budget.expanded_bytes += len(header)
+        yield name, info.file_size, header
+
+        if depth >= limits.max_depth:
+            continue
+        rule = signatures.match(header)
+        if rule is None or rule.label != ZIP_FILE_TYPE:
+            continue
+
+        # A nested central directory sits at the end and ZipFile seeks back and forth,
+        # which on a deflated stream re-inflates from the start, so inflate it once into a copy
+        # in memory; copies are charged to the budget, so all of them together fit within it
+        if not budget.fits(info.file_size):
+            yield ArchiveLimitError(
+                name,
+                message=f"Nested archive exceeds expanded-bytes limit "
+                f"({limits.max_expanded_bytes}): {name}",
+            )
+            continue
+        budget.expanded_bytes += info.file_size
+        try:
+            # ZipExtFile stops at the declared size, so the copy cannot outgrow the budget
+            with zf.open(info) as member:
+                copy = io.BytesIO(member.read())
+            with zipfile.ZipFile(copy) as inner:
+                yield from _walk_zip(inner, name, depth + 1, budget, signatures)
+        except (*_MEMBER_ERRORS, OSError) as e:
+            yield ArchiveReadError(name, os_error=str(e))
@@ -0,0 +1,44 @@
+# Save and load scan checkpoints so long traversals can be resumed
+# A checkpoint holds the last walked path, running counters and the output offset,
+# never the per-file results, so its size does not grow with the number of files
+
+import json
+import os
+
+from filetype_checker.error import CheckpointError
+
+CHECKPOINT_VERSION = 2
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """Atomically replace the checkpoint at ``path`` with ``state``."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CHECKPOINT_VERSION, **state}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str, fingerprint: dict) -> dict:
+    """Load a checkpoint and check it was written by a scan with the same ``fingerprint``."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError as e:
+        raise CheckpointError(path, message=f"Checkpoint not found: {path}") from e
+    except (OSError, ValueError) as e:
+        raise CheckpointError(path, message=f"Cannot read checkpoint: {path}") from e
+
+    if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+        raise CheckpointError(path, message=f"Unsupported checkpoint version: {path}")
+    if state.get("fingerprint") != fingerprint:
+        raise CheckpointError(path, message=f"Checkpoint was written for a different scan: {path}")
+    return state
+
+
+def remove_checkpoint(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,14 +1,483 @@
 # Import necessary modules
 import argparse
+import os
+import random
+import sqlite3
 import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Iterable
 
-from filetype_checker import detector, reporting, scanner
-from filetype_checker.error import FtcheckError
-from filetype_checker.extensions import get_ext_and_mismatch
+from filetype_checker import (
+    archive,
+    checkpoint,
+    detector,
+    extsort,
+    metrics,
+    parallel,
+    policy,
+    reporting,
+    sampling,
+    scandiff,
+    scanner,
+    sinks,
+    throttle,
+    watchdog,
+)
+from filetype_checker.error import (
+    ErrorRecord,
+    FileTimeoutError,
+    FtcheckError,
+    SinkWriteError,
+    error_code,
+)
+from filetype_checker.extensions import check_extension, get_ext_and_mismatch
+from filetype_checker.reporting import problem_item, report_item
+
+# Default number of seconds between checkpoint writes
+DEFAULT_CHECKPOINT_INTERVAL = 30.0
+
+
+# Detect one file and return its success item, or an ErrorRecord if it cannot be read
+def _detect_item(
+    file: str, classify_text: bool = False, reader: detector.HeaderReader | None = None
+) -> dict | ErrorRecord:
+    result = detector.detect_or_error(file, classify_text, reader)
+    if isinstance(result, ErrorRecord):
+        return result
+    return report_item(*result)
+
+
+# Detect one file while honouring the configured rate limits
+def _scan_file(file: str, args, limiter: throttle.Throttle) -> dict:
+    if args.watchdog is not None:
+        return _watched_item(args.watchdog.call(file), args)
+    if args.metrics is not None:
+        start = time.perf_counter()
+        item = _scan_file_unmetered(file, args, limiter, args.reader)
+        args.metrics.observe_detection(item, time.perf_counter() - start)
+        return item
+    return _scan_file_unmetered(file, args, limiter, args.reader)
+
+
+def _scan_file_unmetered(file: str, args, limiter: throttle.Throttle, reader) -> dict:
+    if not limiter.enabled:
+        return _detect_item(file, args.classify_text, reader)
+
+    limiter.before_file()
+    item = _detect_item(file, args.classify_text, reader)
+    if item["ok"]:
+        limiter.after_read(min(item["size_bytes"], detector.read_window(args.classify_text)))
+    return item
+
+
+# Build the item for an archive member from its header bytes
+def _member_item(
+    path: str, size_bytes: int, header: bytes, signatures: detector.SignatureSet
+) -> dict:
+    rule = signatures.match(header)
+    item = detector.build_report(path, size_bytes, rule, signatures)
+    item["ext"], item["mismatch"] = check_extension(
+        path, rule.extensions if rule is not None else None
+    )
+    return item
+
+
+# Yield the item for a file, followed by its archive members when --scan-archives is set
+def _file_items(file: str, args, limiter: throttle.Throttle):
+    yield from _with_members(_scan_file(file, args, limiter), args, limiter)
+
+
+def _with_members(item: dict, args, limiter: throttle.Throttle):
+    if args.policy is not None and item["ok"]:
+        args.policy.evaluate(item)
+    yield item
+
+    file = item["path"]
+    if not (args.scan_archives and item["ok"] and item["file_type"] == archive.ZIP_FILE_TYPE):
+        return
+    signatures = detector.current_signatures()
+    entries = archive.iter_zip_members(file, args.archive_limits, signatures, limiter)
+    if args.watchdog is not None:
+        # Members are read from the same mount, so the whole archive gets one deadline
+        members = entries
+        entries = args.watchdog.call(file, lambda _: list(members))
+        if isinstance(entries, FtcheckError):
+            yield problem_item(entries)
+            return
+    for entry in entries:
+        if isinstance(entry, FtcheckError):
+            yield problem_item(entry, file)
+            continue
+        member = _member_item(*entry, signatures)
+        if args.policy is not None:
+            args.policy.evaluate(member)
+        yield member
+
+
+def _new_counts() -> dict:
+    return {
+        "files_scanned": 0,
+        "matched": 0,
+        "unknown": 0,
+        "errors": 0,
+        "text": 0,
+        "violations": 0,
+    }
+
+
+def _count(counts: dict, item: dict, metrics=None) -> None:
+    if metrics is not None:
+        metrics.observe(item)
+    if item.get("ok") is True:
+        counts["files_scanned"] += 1
+        if item.get("violations"):
+            counts["violations"] += 1
+        if item["magic"]["matched"] is True:
+            counts["matched"] += 1
+        elif "text" in item:
+            counts["text"] += 1
+        else:
+            counts["unknown"] += 1
+    else:
+        counts["errors"] += 1
+
+
+# JSON summary counts; "text" only appears with --classify-text and "violations" with --policy
+def _summary(args, counts: dict, inputs: int | None = None) -> dict:
+    summary = {"inputs": len(args.paths) if inputs is None else inputs, **counts}
+    if not args.classify_text:
+        del summary["text"]
+    if args.policy is None:
+        del summary["violations"]
+    else:
+        summary["policy_hits"] = args.policy.hit_counts()
+    if args.error_groups is not None:
+        summary["error_groups"] = args.error_groups.summary()
+    summary["db_version"] = detector.current_signatures().version
+    return summary
+
+
+# Write one item in a streaming output mode (human lines, NDJSON, TSV or a structured sink)
+def _emit(item: dict, args, out) -> None:
+    if isinstance(out, sinks.Sink):
+        out.write(item)
+    elif args.ndjson:
+        out.write(reporting.format_json(item) + "\n")
+    elif args.tsv:
+        out.write(reporting.format_tsv(item))
+    elif item["ok"]:
+        out.write(reporting.format_human_success(item) + "\n")
+    else:
+        error = item["error"]
+        args.err.write(
+            reporting.format_human_error(item["path"], error["code"], error["message"]) + "\n"
+        )
+
+
+# Emit an item, keep it for the --json document or fold it into the --collapse-errors groups
+def _deliver(item, args, out, items: list) -> None:
+    if args.error_groups is not None and not item["ok"]:
+        args.error_groups.add(item)
+    elif args.json:
+        items.append(item)
+    else:
+        _emit(item, args, out)
+
+
+def _write_sink_summary(out, summary: dict) -> None:
+    if isinstance(out, sinks.Sink):
+        out.write_summary(summary)
+
+
+def _exit_code(counts: dict) -> int:
+    if counts["errors"] > 0:
+        return 2
+    if counts["violations"] > 0:
+        return 4
+    if counts["unknown"] > 0:
+        return 1
+    return 0
+
+
+def _print_summary(args, counts: dict, limiter: throttle.Throttle) -> None:
+    args.err.flush()
+    if args.error_groups is not None:
+        for line in args.error_groups.format_human():
+            print(line, file=sys.stderr)
+    text = f", text: {counts['text']}" if counts["text"] else ""
+    violations = f", violations: {counts['violations']}" if counts["violations"] else ""
+    print(
+        f"Scanned: {counts['files_scanned']} files "
+        f"(matched: {counts['matched']}{text}, unknown: {counts['unknown']}, "
+        f"errors: {counts['errors']}{violations})",
+        file=sys.stderr,
+    )
+    if limiter.enabled:
+        print(
+            f"Throttled: {limiter.throttled_seconds:.2f}s over {limiter.throttled_count} waits",
+            file=sys.stderr,
+        )
+
+
+def _print_estimates(sample: dict) -> None:
+    print(
+        f"Sampled: {sample['sampled']} of {sample['population']} files "
+        f"({sample['confidence']:.0%} confidence intervals)",
+        file=sys.stderr,
+    )
+    for label, est in sample["estimates"].items():
+        print(
+            f"  {label}: {est['proportion']:.2%} "
+            f"[{est['ci_low']:.2%}, {est['ci_high']:.2%}] ~{est['estimated_files']} files",
+            file=sys.stderr,
+        )
+
+
+def _sample_rate_arg(value: str) -> float:
+    try:
+        rate = float(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value!r}") from e
+    if not 0 < rate <= 1:
+        raise argparse.ArgumentTypeError("rate must be in (0, 1]")
+    return rate
+
+
+def _size_arg(value: str) -> int:
+    try:
+        return extsort.parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def _ionice_arg(value: str) -> tuple[int, int]:
+    try:
+        return throttle.parse_ionice(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+# Metrics for --metrics-file/--metrics-port, or None when neither is set
+def _setup_metrics(args) -> metrics.ScanMetrics | None:
+    if args.metrics_file is None and args.metrics_port is None:
+        return None
+    scan_metrics = metrics.ScanMetrics(
+        detector.read_window(args.classify_text), args.metrics_file, args.metrics_interval
+    )
+    if args.metrics_port is not None:
+        scan_metrics.serve("127.0.0.1", args.metrics_port)
+    return scan_metrics
+
+
+# Apply --nice/--ionice and build the shared limiter for the detection loop
+def _setup_throttle(args) -> throttle.Throttle:
+    if args.nice is not None:
+        throttle.apply_nice(args.nice)
+    if args.ionice is not None:
+        throttle.apply_ionice(*args.ionice)
+    return throttle.Throttle(args.max_files_per_sec, args.max_bytes_per_sec)
+
+
+# Identify a scan so a checkpoint is only resumed by the same command
+def _fingerprint(args) -> dict:
+    return {
+        "paths": list(args.paths),
+        "recursive": args.recursive,
+        "ndjson": args.ndjson,
+        "output": args.output,
+        "scan_archives": args.scan_archives,
+        "classify_text": args.classify_text,
+        "policy": args.policy_file,
+        "db_version": detector.current_signatures().version,
+    }
+
+
+# Streaming scan that periodically saves the walker frontier and the output offset
+def _run_checkpointed(args, limiter: throttle.Throttle) -> int:
+    fingerprint = _fingerprint(args)
+    state = None
+    counts = _new_counts()
+
+    try:
+        if args.resume:
+            state = checkpoint.load_checkpoint(args.checkpoint, fingerprint)
+            counts.update(state["counts"])
+            out = open(args.output, "r+", encoding="utf-8", newline="\n")
+            # Drop anything written after the last checkpoint so records are not duplicated
+            out.seek(state["output_offset"])
+            out.truncate()
+        else:
+            out = open(args.output, "w", encoding="utf-8", newline="\n")
+    except FtcheckError as e:
+        print(reporting.format_human_error(e.details["path"], e.code, str(e)), file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(
+            reporting.format_human_error(args.output, "EIO", f"Cannot open output: {e}"),
+            file=sys.stderr,
+        )
+        return 2
+
+    walker = scanner.TreeWalker(
+        args.paths, args.recursive, state=state["walker"] if state else None
+    )
+
+    def save() -> None:
+        out.flush()
+        checkpoint.save_checkpoint(
+            args.checkpoint,
+            {
+                "fingerprint": fingerprint,
+                "walker": walker.state(),
+                "counts": counts,
+                "output_offset": out.tell(),
+            },
+        )
+
+    with out:
+        save()
+        last_save = time.monotonic()
+        for entry in walker:
+            if isinstance(entry, FtcheckError):
+                items = [problem_item(entry)]
+            else:
+                items = _file_items(entry, args, limiter)
+            for item in items:
+                _count(counts, item, args.metrics)
+                _emit(item, args, out)
+
+            if time.monotonic() - last_save >= args.checkpoint_interval:
+                save()
+                last_save = time.monotonic()
+
+    checkpoint.remove_checkpoint(args.checkpoint)
+    _print_summary(args, counts, limiter)
+    return _exit_code(counts)
+
+
+# Scan only a sample of the traversed files and estimate per-type proportions
+def _run_sampled(args, out, limiter: throttle.Throttle) -> int:
+    rng = random.Random(args.seed)
+    estimator = sampling.ProportionEstimator()
+    items = []
+    counts = _new_counts()
+
+    def handle(item: dict) -> None:
+        _count(counts, item, args.metrics)
+        _deliver(item, args, out, items)
+
+    def scan_labels(files: list[str]) -> list[str]:
+        labels = []
+        for file in files:
+            file_items = list(_file_items(file, args, limiter))
+            for item in file_items:
+                handle(item)
+            first = file_items[0]
+            labels.append(first["file_type"] if first["ok"] else sampling.ERROR_LABEL)
+        return labels
+
+    try:
+        if args.sample_count is not None:
+            method = "reservoir"
+            walker = scanner.TreeWalker(args.paths, args.recursive)
+            population, chosen = sampling.reservoir_sample(
+                walker, args.sample_count, rng, lambda p: handle(problem_item(p))
+            )
+            estimator.add_stratum(population, scan_labels(chosen))
+        else:
+            method = "stratified"
+            sampler = sampling.StratifiedSampler(args.sample, rng)
+            directories = sampling.iter_directories(args.paths, args.recursive)
+            for group in sampling.iter_strata(directories, args.sample):
+                if isinstance(group, FtcheckError):
+                    handle(problem_item(group))
+                    continue
+                estimator.add_stratum(len(group), scan_labels(sampler.sample(group)))
+    except BrokenPipeError:
+        return 0
+
+    sample = estimator.report(method)
+    if args.json:
+        summary = {**_summary(args, counts), "sample": sample}
+        final_doc = {"ok": counts["errors"] == 0, "summary": summary, "results": items}
+        print(reporting.format_json(final_doc), file=out)
+    else:
+        _write_sink_summary(out, _summary(args, counts))
+        _print_summary(args, counts, limiter)
+        _print_estimates(sample)
+
+    return _exit_code(counts)
+
+
+# `ftcheck diff OLD NEW`: compare two scan outputs by path
+def _diff_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="ftcheck diff",
+        description=(
+            "Compare two ftcheck --json or --ndjson outputs by path and report added, removed "
+            "and changed files (exit code 1 if anything changed)."
+        ),
+    )
+    parser.add_argument("old", help="Earlier scan output")
+    parser.add_argument("new", help="Later scan output")
+    parser.add_argument(
+        "--ndjson", action="store_true", help="Print one JSON change record per line."
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=_size_arg,
+        default=scandiff.DEFAULT_MEMORY_LIMIT,
+        metavar="SIZE",
+        help="Keep both sorted inputs within about SIZE bytes in total (default: 256M).",
+    )
+    args = parser.parse_args(argv)
+
+    counts = scandiff.new_counts()
+    stdout = reporting.LineWriter(
+        sys.stdout, flush_interval=0.0 if sys.stdout.isatty() else 1.0
+    )
+    old = new = None
+    try:
+        old = scandiff.sorted_entries(args.old, args.memory_limit // 2)
+        new = scandiff.sorted_entries(args.new, args.memory_limit // 2)
+        for change in scandiff.diff_entries(old, new, counts):
+            if args.ndjson:
+                stdout.write(reporting.format_json(change) + "\n")
+            else:
+                stdout.write(reporting.format_human_change(change) + "\n")
+    except FtcheckError as e:
+        print(reporting.format_human_error(None, e.code, str(e)), file=sys.stderr)
+        return e.exit_code
+    except BrokenPipeError:
+        return 0
+    finally:
+        for sorter in (old, new):
+            if sorter is not None:
+                sorter.close()
+        try:
+            stdout.close()
+        except BrokenPipeError:
+            _discard_stdout()
+
+    print(
+        f"Compared: added: {counts['added']}, removed: {counts['removed']}, "
+        f"changed: {counts['changed']}, unchanged: {counts['unchanged']} "
+        f"(type changes: {counts['type_changes']}, size changes: {counts['size_changes']}, "
+        f"new mismatches: {counts['new_mismatches']})",
+        file=sys.stderr,
+    )
+    return 1 if counts["added"] or counts["removed"] or counts["changed"] else 0
 
 
 # Main function for CLI
 def main(argv=None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["diff"]:
+        return _diff_main(argv[1:])
+
     # Set up argument parser
     parser = argparse.ArgumentParser(
         prog="ftcheck",
@@ -16,135 +485,632 @@ def main(argv=None) -> int:
     )
 
     # Add arguments
-    parser.add_argument("paths", nargs="+", help="Files and/or directories to scan")
+    parser.add_argument("paths", nargs="*", help="Files and/or directories to scan")
+    path_list = parser.add_mutually_exclusive_group()
+    path_list.add_argument(
+        "--from-file",
+        metavar="FILE",
+        help="Read the paths to scan from FILE, one per line, as they are needed.",
+    )
+    path_list.add_argument(
+        "--stdin",
+        action="store_const",
+        const="-",
+        dest="from_file",
+        help="Read the paths to scan from standard input (same as --from-file -).",
+    )
+    parser.add_argument(
+        "-0",
+        "--null",
+        action="store_true",
+        help="Paths in --from-file/--stdin are NUL-terminated (find -print0).",
+    )
     parser.add_argument("--json", action="store_true", help="Emit a single JSON document to stdout")
+    parser.add_argument(
+        "--ndjson", action="store_true", help="Emit one JSON item per line as files are scanned."
+    )
+    parser.add_argument(
+        "--tsv",
+        action="store_true",
+        help="Emit a header and one tab-separated line per item (errors included).",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        metavar="SECONDS",
+        help="Flush buffered output at least this often (default: 1, or 0 = every line on a TTY).",
+    )
     parser.add_argument(
         "-r", "--recursive", action="store_true", help="Recurse into directories."
     )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        help="Write results to FILE, or load them into sqlite:PATH, csv:PATH or parquet:PATH.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=sinks.DEFAULT_BATCH_SIZE,
+        metavar="N",
+        help="Rows per write/transaction for sqlite:, csv: and parquet: outputs "
+        "(default: %(default)s).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="Periodically save scan progress to FILE (requires --output).",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=DEFAULT_CHECKPOINT_INTERVAL,
+        metavar="SECONDS",
+        help=f"Seconds between checkpoint writes (default: {DEFAULT_CHECKPOINT_INTERVAL:g}).",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continue the scan saved in --checkpoint."
+    )
+    parser.add_argument(
+        "--max-files-per-sec", type=float, metavar="N", help="Open at most N files per second."
+    )
+    parser.add_argument(
+        "--max-bytes-per-sec", type=float, metavar="N", help="Read at most N bytes per second."
+    )
+    parser.add_argument(
+        "--nice", type=int, metavar="N", help="Lower the CPU priority by N (see nice(1))."
+    )
+    parser.add_argument(
+        "--ionice",
+        type=_ionice_arg,
+        metavar="CLASS[:LEVEL]",
+        help="Set the I/O priority class: idle or best-effort[:0-7] (Linux only).",
+    )
+    parser.add_argument(
+        "--scan-archives",
+        action="store_true",
+        help="Also classify the members of ZIP archives (reported as ARCHIVE!MEMBER).",
+    )
+    parser.add_argument(
+        "--archive-max-depth",
+        type=int,
+        default=archive.ArchiveLimits.max_depth,
+        metavar="N",
+        help="Maximum nesting depth of archives to open (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--archive-max-members",
+        type=int,
+        default=archive.ArchiveLimits.max_members,
+        metavar="N",
+        help="Maximum members to read per top-level archive (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--archive-max-bytes",
+        type=int,
+        default=archive.ArchiveLimits.max_expanded_bytes,
+        metavar="N",
+        help="Maximum bytes to decompress per top-level archive (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--classify-text",
+        action="store_true",
+        help="Label unmatched files that look like text (ASCII, UTF-8/16/32, JSON, XML).",
+    )
+    sample_group = parser.add_mutually_exclusive_group()
+    sample_group.add_argument(
+        "--sample",
+        type=_sample_rate_arg,
+        metavar="RATE",
+        help="Scan a fraction RATE of the files in each directory and estimate type shares.",
+    )
+    sample_group.add_argument(
+        "--sample-count",
+        type=int,
+        metavar="N",
+        help="Scan a uniform random sample of N files and estimate type shares.",
+    )
+    parser.add_argument("--seed", type=int, help="Random seed for --sample/--sample-count.")
+    parser.add_argument(
+        "-L",
+        "--follow-symlinks",
+        action="store_true",
+        help="Follow symlinks to files and directories; link cycles are skipped.",
+    )
+    parser.add_argument(
+        "-x",
+        "--one-file-system",
+        action="store_true",
+        help="Do not descend into directories on other file systems.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Detect files in N worker processes (default: 1, no worker processes).",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=_size_arg,
+        metavar="SIZE",
+        help=(
+            "Keep the sorted file list within about SIZE bytes (e.g. 512M), spilling sorted "
+            "runs to temporary files; each hard link is then read separately."
+        ),
+    )
+    parser.add_argument(
+        "--signatures",
+        dest="signatures_file",
+        metavar="FILE",
+        help="Detect with the signatures in a JSON file instead of the built-in database.",
+    )
+    parser.add_argument(
+        "--policy",
+        dest="policy_file",
+        metavar="FILE",
+        help="Check results against the rules in a JSON policy file (exit code 4 on violations).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="Write Prometheus metrics to PATH (textfile collector format) during the scan.",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=metrics.DEFAULT_INTERVAL,
+        metavar="SECONDS",
+        help="Seconds between --metrics-file updates (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the scan.",
+    )
+    parser.add_argument(
+        "--collapse-errors",
+        action="store_true",
+        help=(
+            "Report errors as one line per error code (with a count and the first paths) "
+            "instead of one item per path; with --json they go to summary.error_groups."
+        ),
+    )
+    parser.add_argument(
+        "--file-timeout",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Give up on a file after SECONDS and report it as ETIMEDOUT; detection then runs "
+            "on watchdog threads so a hung mount cannot stall the scan."
+        ),
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="List directories on N threads during recursive scans (default: 1).",
+    )
     args = parser.parse_args(argv)
+    args.archive_limits = archive.ArchiveLimits(
+        max_depth=args.archive_max_depth,
+        max_members=args.archive_max_members,
+        max_expanded_bytes=args.archive_max_bytes,
+    )
 
-    files, problems = scanner.expand_paths(args.paths, args.recursive)
-    items = []
+    for name in ("max_files_per_sec", "max_bytes_per_sec"):
+        value = getattr(args, name)
+        if value is not None and value <= 0:
+            parser.error(f"--{name.replace('_', '-')} must be positive")
 
-    # Print Errors encountered during path expansion
-    for problem in problems:
-        path = (problem.details or {}).get("path") or "<unknown>"
+    if args.from_file is None and not args.paths:
+        parser.error("the following arguments are required: paths (or --from-file/--stdin)")
+    if args.from_file is not None:
+        if args.paths:
+            parser.error("paths cannot be given together with --from-file/--stdin")
+        if args.json or args.checkpoint or args.memory_limit is not None:
+            parser.error(
+                "--from-file/--stdin stream results; use --ndjson, an --output sink or "
+                "human output, without --checkpoint or --memory-limit"
+            )
+        if args.sample is not None or args.sample_count is not None:
+            parser.error("--sample/--sample-count cannot be used with --from-file/--stdin")
+    elif args.null:
+        parser.error("-0/--null requires --from-file or --stdin")
+    if args.tsv and (args.json or args.ndjson):
+        parser.error("--tsv cannot be used with --json or --ndjson")
+    if args.tsv and args.checkpoint:
+        parser.error("--tsv cannot be used with --checkpoint")
+    if args.flush_interval is not None and args.flush_interval < 0:
+        parser.error("--flush-interval cannot be negative")
+    if args.json and args.ndjson:
+        parser.error("--json and --ndjson are mutually exclusive")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.sample_count is not None and args.sample_count <= 0:
+        parser.error("--sample-count must be positive")
+    sampled = args.sample is not None or args.sample_count is not None
+    if sampled and args.checkpoint:
+        parser.error("--checkpoint cannot be used with --sample/--sample-count")
+    if args.metrics_interval <= 0:
+        parser.error("--metrics-interval must be positive")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (args.follow_symlinks or args.one_file_system) and (sampled or args.checkpoint):
+        parser.error(
+            "--follow-symlinks/--one-file-system cannot be used with --checkpoint or --sample"
+        )
+    if args.workers > 1 and (sampled or args.checkpoint):
+        parser.error("--workers cannot be used with --checkpoint or --sample/--sample-count")
+    if args.memory_limit is not None and (args.json or sampled or args.checkpoint):
+        parser.error("--memory-limit cannot be used with --json, --checkpoint or --sample")
+    if args.collapse_errors and args.checkpoint:
+        parser.error("--collapse-errors cannot be used with --checkpoint")
+    if args.file_timeout is not None:
+        if args.file_timeout <= 0:
+            parser.error("--file-timeout must be positive")
+        if args.workers > 1 or sampled or args.checkpoint:
+            parser.error("--file-timeout cannot be used with --workers, --checkpoint or --sample")
+    if args.walk_threads < 1:
+        parser.error("--walk-threads must be at least 1")
+    if args.walk_threads > 1 and (sampled or args.checkpoint):
+        parser.error("--walk-threads cannot be used with --checkpoint or --sample/--sample-count")
+    sink_spec = sinks.parse_sink_spec(args.output) if args.output else None
+    if sink_spec is not None:
+        if args.json or args.ndjson or args.tsv:
+            parser.error(f"--json/--ndjson/--tsv cannot be used with --output {sink_spec[0]}:")
+        if args.checkpoint:
+            parser.error("--checkpoint requires a plain --output file")
+        if args.batch_size < 1:
+            parser.error("--batch-size must be at least 1")
+    if args.checkpoint:
+        if args.json:
+            parser.error("--checkpoint cannot be used with --json; use --ndjson")
+        if not args.output:
+            parser.error("--checkpoint requires --output")
 
-        payload = {
-            "ok": False,
-            "path": path,
-            "error": {
-                "code": problem.code,
-                "message": str(problem),
-            },
-        }
-        if problem.details is not None:
-            payload["error"]["details"] = problem.details
+    try:
+        limiter = _setup_throttle(args)
+    except FtcheckError as e:
+        print(reporting.format_human_error(None, e.code, str(e)), file=sys.stderr)
+        return 2
 
-        items.append(payload)
+    args.err = sys.stderr
+    args.error_groups = reporting.ErrorGroups() if args.collapse_errors else None
+    try:
+        signatures = (
+            detector.load_signatures(args.signatures_file) if args.signatures_file else None
+        )
+    except FtcheckError as e:
+        print(reporting.format_human_error(args.signatures_file, e.code, str(e)), file=sys.stderr)
+        return e.exit_code
+    try:
+        args.policy = policy.load_policy(args.policy_file) if args.policy_file else None
+    except FtcheckError as e:
+        print(reporting.format_human_error(args.policy_file, e.code, str(e)), file=sys.stderr)
+        return e.exit_code
+    try:
+        args.metrics = _setup_metrics(args)
+    except OSError as e:
+        print(
+            reporting.format_human_error(None, "EIO", f"Cannot start metrics server: {e}"),
+            file=sys.stderr,
+        )
+        return 2
+    # Raw-descriptor header reads, where the platform has preadv and dir_fd opens
+    args.reader = detector.HeaderReader() if detector.HeaderReader.supported() else None
+    args.watchdog = _start_watchdog(args, limiter) if args.file_timeout is not None else None
+    previous = detector.install_signatures(signatures) if signatures is not None else None
+    try:
+        return _run_main(args, limiter, sink_spec, sampled)
+    finally:
+        if previous is not None:
+            detector.install_signatures(previous)
+        if args.reader is not None:
+            args.reader.close()
+        if args.watchdog is not None:
+            args.watchdog.close()
+        if args.metrics is not None:
+            args.metrics.close()
+
+
+def _run_main(args, limiter: throttle.Throttle, sink_spec, sampled: bool) -> int:
+    if args.checkpoint:
+        return _run_checkpointed(args, limiter)
+
+    # Batch result and error lines into large writes; terminals still see every line at once
+    interval = args.flush_interval
+    if interval is None:
+        interval = 0.0 if sys.stdout.isatty() else 1.0
+    stdout = reporting.LineWriter(sys.stdout, flush_interval=interval)
+    args.err = reporting.LineWriter(sys.stderr, flush_interval=interval)
+    try:
+        return _run_output(args, limiter, sink_spec, sampled, stdout)
+    finally:
+        try:
+            stdout.close()
+            args.err.close()
+        except BrokenPipeError:
+            _discard_stdout()
+
+
+# Point stdout at /dev/null after a broken pipe so the final flush at exit stays quiet
+def _discard_stdout() -> None:
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+    except (OSError, ValueError):
+        pass
 
-        if not args.json:
+
+def _run_output(args, limiter: throttle.Throttle, sink_spec, sampled: bool, stdout) -> int:
+    out = stdout
+    if args.output:
+        try:
+            if sink_spec is not None:
+                out = sinks.open_sink(*sink_spec, batch_size=args.batch_size)
+            else:
+                out = open(args.output, "w", encoding="utf-8", newline="\n")
+        except (OSError, ImportError, sqlite3.Error) as e:
             print(
-                reporting.format_human_error(
-                    path,
-                    payload["error"]["code"],
-                    payload["error"]["message"],
-                ),
+                reporting.format_human_error(args.output, "EIO", f"Cannot open output: {e}"),
                 file=sys.stderr,
             )
+            return 2
 
-    # Perform detection
+    if args.tsv:
+        out.write(reporting.TSV_HEADER)
     try:
-        for file in files:
-            try:
-                file_report = detector.detect(file)
-                ext, mismatch = get_ext_and_mismatch(
-                    file_report["path"], file_report["file_type"], file_report["magic"]["matched"]
-                )
-                file_report["ext"] = ext
-                file_report["mismatch"] = mismatch
-                items.append(file_report)
-
-                if not args.json:
-                    print(reporting.format_human_success(file_report))
-            except FtcheckError as e:
-                err_path = (e.details or {}).get("path") or file
-                payload = {
-                    "ok": False,
-                    "path": err_path,
-                    "error": {
-                        "code": e.code,
-                        "message": str(e),
-                    },
-                }
-                if e.details is not None:
-                    payload["error"]["details"] = e.details
-
-                items.append(payload)
-
-                if not args.json:
-                    print(reporting.format_human_error(err_path, e.code, str(e)), file=sys.stderr)
-                continue
-            except OSError as e:
-                payload = {
-                    "ok": False,
-                    "path": file,
-                    "error": {
-                        "code": "EIO",
-                        "message": f"Error reading file: {file}",
-                        "details": {"path": file, "os_error": str(e)},
-                    },
-                }
-                items.append(payload)
-                if not args.json:
-                    print(
-                        reporting.format_human_error(file, "EIO", payload["error"]["message"]),
-                        file=sys.stderr,
-                    )
-    except BrokenPipeError:
-        return 0
+        try:
+            if sampled:
+                return _run_sampled(args, out, limiter)
+            if args.from_file is not None:
+                return _run_listed(args, out, limiter)
+            return _run(args, out, limiter)
+        finally:
+            if out is not stdout:
+                out.close()
+    except SinkWriteError as e:
+        print(reporting.format_human_error(args.output, e.code, str(e)), file=sys.stderr)
+        return e.exit_code
 
-    files_scanned = sum(1 for file in items if file.get("ok") is True)
-    matched = sum(
-        1
-        for file in items
-        if file.get("ok") is True and file.get("magic", {}).get("matched") is True
+
+# Items for each path in order, detected in worker processes when --workers > 1
+def _iter_detected(paths: Iterable[str], args, limiter: throttle.Throttle):
+    if args.watchdog is not None:
+        yield from _iter_watched(paths, args)
+        return
+    if args.workers <= 1:
+        for path in paths:
+            yield _scan_file(path, args, limiter)
+        return
+
+    def before_batch(batch: list[str]) -> None:
+        for _ in batch:
+            limiter.before_file()
+
+    window = detector.read_window(args.classify_text)
+    results = parallel.iter_results(
+        paths,
+        args.workers,
+        classify_text=args.classify_text,
+        before_batch=before_batch if limiter.enabled else None,
+        timed=True,
     )
-    errors = sum(1 for er in items if not er.get("ok", False))
-    unknown = sum(
-        1 for er in items if er.get("ok") is True and er.get("magic", {}).get("matched") is False
+    for result, rule, seconds in results:
+        if args.metrics is not None:
+            args.metrics.observe_detection(result, seconds)
+        if isinstance(result, ErrorRecord):
+            yield result
+            continue
+        limiter.after_read(min(result["size_bytes"], window))
+        yield report_item(result, rule)
+
+
+# Watchdog for --file-timeout, shared by detection, hard-link retries and archive member reads
+def _start_watchdog(args, limiter: throttle.Throttle) -> watchdog.Watchdog:
+    local = threading.local()
+
+    def detect(path: str) -> tuple[dict, float]:
+        # HeaderReader is not thread-safe, so each thread gets its own
+        if not hasattr(local, "reader"):
+            local.reader = detector.HeaderReader() if detector.HeaderReader.supported() else None
+        start = time.perf_counter()
+        item = _scan_file_unmetered(path, args, limiter, local.reader)
+        return item, time.perf_counter() - start
+
+    return watchdog.Watchdog(detect, args.file_timeout)
+
+
+# Turn a watchdog result into an item, recording its detection time
+def _watched_item(result, args) -> dict:
+    if isinstance(result, FtcheckError):
+        return problem_item(result)
+    item, seconds = result
+    if args.metrics is not None:
+        args.metrics.observe_detection(item, seconds)
+    return item
+
+
+# Detect on watchdog threads so a hung open() or read() costs one file, not the whole scan
+def _iter_watched(paths: Iterable[str], args):
+    for _, result in args.watchdog.map(paths):
+        yield _watched_item(result, args)
+
+
+# Reuse a detection result for another path to the same file
+def _relink_item(item: dict, path: str) -> dict:
+    linked = {**item, "path": path}
+    linked["ext"], linked["mismatch"] = get_ext_and_mismatch(
+        path, item["file_type"], item["magic"]["matched"]
+    )
+    return linked
+
+
+# Items for every file; paths sharing a file id (hard links, followed symlinks) are read once
+def _iter_file_items(files: list[tuple], args, limiter: throttle.Throttle):
+    uses: Counter = Counter()
+    firsts = []
+    for path, file_id in files:
+        if file_id is None or file_id not in uses:
+            firsts.append(path)
+        if file_id is not None:
+            uses[file_id] += 1
+
+    detected = _iter_detected(firsts, args, limiter)
+    started = set()
+    hung = set()
+    shared: dict = {}
+    for path, file_id in files:
+        if file_id is None:
+            item = next(detected)
+        elif file_id in shared:
+            item = _relink_item(shared[file_id], path)
+        elif file_id not in started:
+            started.add(file_id)
+            item = next(detected)
+        elif file_id in hung:
+            # Another path to this file already timed out; do not block on it again
+            item = problem_item(FileTimeoutError(path, args.file_timeout))
+        else:
+            # The first path failed, so try this one on its own
+            item = _scan_file(path, args, limiter)
+
+        if file_id is not None:
+            uses[file_id] -= 1
+            if not uses[file_id]:
+                shared.pop(file_id, None)
+                started.discard(file_id)
+                hung.discard(file_id)
+                del uses[file_id]
+            elif item["ok"]:
+                shared[file_id] = item
+            elif error_code(item) == "ETIMEDOUT":
+                hung.add(file_id)
+        yield from _with_members(item, args, limiter)
+
+
+# Items for files already in order; each path is detected on its own, so memory stays flat
+def _iter_stream_items(files: Iterable[tuple], args, limiter: throttle.Throttle):
+    for item in _iter_detected((path for path, _ in files), args, limiter):
+        yield from _with_members(item, args, limiter)
+
+
+def _run(args, out, limiter: throttle.Throttle) -> int:
+    if args.memory_limit is None:
+        files, problems = scanner.scan_paths(
+            args.paths,
+            args.recursive,
+            args.follow_symlinks,
+            args.one_file_system,
+            args.walk_threads,
+        )
+        return _run_files(args, out, limiter, problems, _iter_file_items(files, args, limiter))
+
+    sorter, problems = extsort.sorted_scan(
+        args.paths,
+        args.recursive,
+        args.memory_limit,
+        args.follow_symlinks,
+        args.one_file_system,
+        args.walk_threads,
     )
+    with sorter:
+        return _run_files(args, out, limiter, problems, _iter_stream_items(sorter, args, limiter))
+
+
+# Scan paths from --from-file/--stdin as they are read, keeping memory flat
+def _run_listed(args, out, limiter: throttle.Throttle) -> int:
+    if args.from_file == "-":
+        return _run_path_list(args, out, limiter, scanner.PathList(sys.stdin.buffer, args.null))
+    try:
+        stream = open(args.from_file, "rb")
+    except OSError as e:
+        print(
+            reporting.format_human_error(args.from_file, "EIO", f"Cannot open path list: {e}"),
+            file=sys.stderr,
+        )
+        return 2
+    with stream:
+        return _run_path_list(args, out, limiter, scanner.PathList(stream, args.null))
+
+
+def _run_path_list(args, out, limiter: throttle.Throttle, path_list: scanner.PathList) -> int:
+    items = _iter_listed_items(path_list, args, limiter)
+    return _run_files(args, out, limiter, [], items, inputs=path_list)
+
+
+# Items in list order; directories are expanded as they come up and problems keep their place
+def _iter_listed_items(path_list: scanner.PathList, args, limiter: throttle.Throttle):
+    # Problems found while expanding, keyed by how many files came before them
+    held: deque = deque()
+    listed = 0
+
+    def files():
+        nonlocal listed
+        for path in path_list:
+            for found, problems in scanner.iter_scan_path(
+                path, args.recursive, args.follow_symlinks, args.one_file_system, args.walk_threads
+            ):
+                held.extend((listed, problem) for problem in problems)
+                for file_path, _ in sorted(found):
+                    listed += 1
+                    yield file_path
+
+    emitted = 0
+    for item in _iter_detected(files(), args, limiter):
+        while held and held[0][0] <= emitted:
+            yield problem_item(held.popleft()[1])
+        emitted += 1
+        yield from _with_members(item, args, limiter)
+    while held:
+        yield problem_item(held.popleft()[1])
+
+
+def _run_files(
+    args,
+    out,
+    limiter: throttle.Throttle,
+    problems: list,
+    file_items,
+    inputs: scanner.PathList | None = None,
+) -> int:
+    items = []
+    counts = _new_counts()
+
+    try:
+        # Report errors encountered during path expansion, then perform detection
+        for problem in problems:
+            item = problem_item(problem)
+            _count(counts, item, args.metrics)
+            _deliver(item, args, out, items)
+
+        for item in file_items:
+            _count(counts, item, args.metrics)
+            _deliver(item, args, out, items)
+    except BrokenPipeError:
+        return 0
 
     if args.json:
-        summary = {
-            "inputs": len(args.paths),
-            "files_scanned": files_scanned,
-            "matched": matched,
-            "unknown": unknown,
-            "errors": errors,
-        }
+        summary = _summary(args, counts)
+        if limiter.enabled:
+            summary["throttled_seconds"] = round(limiter.throttled_seconds, 3)
         final_doc = {
-            "ok": errors == 0,
+            "ok": counts["errors"] == 0,
             "summary": summary,
             "results": items,
         }
 
-        print(reporting.format_json(final_doc))
-    else:
-        print(
-            f"Scanned: {files_scanned} files "
-            f"(matched: {matched}, unknown: {unknown}, errors: {errors})",
-            file=sys.stderr,
-        )
-
-    if errors > 0:
-        exit_code = 2
-    elif unknown > 0:
-        exit_code = 1
+        print(reporting.format_json(final_doc), file=out)
     else:
-        exit_code = 0
+        _write_sink_summary(out, _summary(args, counts, inputs.count if inputs else None))
+        _print_summary(args, counts, limiter)
 
-    return exit_code
+    return _exit_code(counts)
 
 
 if __name__ == "__main__":
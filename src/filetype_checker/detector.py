@@ -1,12 +1,26 @@
 # Helper module to detect file types based on magic numbers
+import errno
+import hashlib
+import json
 import os
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional, Union
 
 from filetype_checker.error import (
-    FileReadError,
-    PathIsDirectoryError,
-    PathNotFoundError,
-    PermissionDeniedError,
+    ErrorRecord,
+    SignatureDatabaseError,
+    SignatureParseError,
 )
+from filetype_checker.extensions import expected_extensions
+from filetype_checker.textclass import TEXT_WINDOW
+from filetype_checker.textclass import classify_text as classify_text_header
+
+# NumPy is optional; batch matching falls back to pure Python without it
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover - depends on the environment
+    _np = None
 
 # Define a simple magic number database
 MAGIC_DB = [
@@ -20,75 +34,466 @@ MAGIC_DB = [
     (0, b"\x50\x4b\x07\x08", "ZIP Archive", 60),
 ]
 
-# Define the maximum number of bytes to read for magic number detection
+# Maximum number of bytes to read for the built-in MAGIC_DB; a loaded SignatureSet
+# may need more (see SignatureSet.max_bytes)
 MAX_MAGIC_BYTES = max(offset + len(magic) for offset, magic, _, _priority in MAGIC_DB)
 
+# Size of HeaderReader's reused buffer; larger windows get a buffer of their own
+SMALL_FILE_BYTES = 4096
+
+UNKNOWN_FILE_TYPE = "Unknown File Type"
+
+# Shared "magic" section for unmatched files; treat as read-only
+UNKNOWN_MAGIC_REPORT = {"matched": False, "offset": None, "signature": None}
+
+
+# A signature compiled once at load time, with everything a report needs precomputed
+@dataclass(frozen=True, slots=True)
+class MagicRule:
+    """Immutable, precompiled form of one MAGIC_DB entry."""
+
+    index: int
+    offset: int
+    magic: bytes
+    label: str
+    priority: int
+    signature: str
+    extensions: Optional[FrozenSet[str]]
+    # Shared "magic" section for every file matching this rule; treat as read-only
+    report: Dict[str, Any] = field(compare=False, hash=False, repr=False)
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.magic)
+
+
+def compile_rules(db, version: Optional[str] = None) -> tuple[MagicRule, ...]:
+    """Compile ``(offset, magic, label, priority)`` entries into ``MagicRule`` objects.
+
+    With a ``version``, each rule's shared report also carries it as ``db_version``.
+    """
+    rules = []
+    for index, (offset, magic, label, priority) in enumerate(db):
+        signature = magic.hex().upper()
+        report = {"matched": True, "offset": offset, "signature": signature}
+        if version is not None:
+            report["db_version"] = version
+        rules.append(
+            MagicRule(
+                index=index,
+                offset=offset,
+                magic=magic,
+                label=label,
+                priority=priority,
+                signature=signature,
+                extensions=expected_extensions(label),
+                report=report,
+            )
+        )
+    return tuple(rules)
+
+
+def _check_entry(index: int, entry) -> tuple:
+    try:
+        offset, magic, label, priority = entry
+    except (TypeError, ValueError):
+        raise SignatureParseError(
+            f"Signature {index}: expected (offset, magic, label, priority)"
+        ) from None
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise SignatureParseError(f"Signature {index}: offset must be a non-negative integer")
+    if not isinstance(magic, bytes) or not magic:
+        raise SignatureParseError(f"Signature {index}: magic must be non-empty bytes")
+    if not isinstance(label, str) or not label:
+        raise SignatureParseError(f"Signature {index}: label must be a non-empty string")
+    if isinstance(priority, bool) or not isinstance(priority, int):
+        raise SignatureParseError(f"Signature {index}: priority must be an integer")
+    return offset, magic, label, priority
+
+
+class SignatureSet:
+    """A compiled, immutable signature database.
+
+    Build a new set away from the hot path (``load_signatures`` or
+    ``SignatureSet(db)``) and make it live with ``install_signatures``; the swap
+    is a single reference assignment. Detection takes one snapshot of the active
+    set per file, so readers take no lock and never see a half-built index.
+    ``version`` is a hash of the entries: equal databases give equal versions,
+    and every report carries it as ``magic["db_version"]``.
+    """
+
+    __slots__ = ("db", "rules", "ranked", "max_bytes", "version", "unknown_report")
+
+    def __init__(self, db) -> None:
+        entries = tuple(_check_entry(i, entry) for i, entry in enumerate(db))
+        if not entries:
+            raise SignatureDatabaseError("Signature database is empty")
+        digest = hashlib.sha256()
+        for offset, magic, label, priority in entries:
+            digest.update(f"{offset}\0{magic.hex()}\0{label}\0{priority}\n".encode("utf-8"))
+
+        self.db = entries
+        self.version = digest.hexdigest()[:16]
+        self.rules = compile_rules(entries, self.version)
+        # Ranked from most to least preferred match
+        self.ranked = tuple(
+            sorted(self.rules, key=lambda r: (r.priority, len(r.magic), -r.index), reverse=True)
+        )
+        self.max_bytes = max(rule.end for rule in self.rules)
+        # Shared "magic" section for unmatched files; treat as read-only
+        self.unknown_report = {**UNKNOWN_MAGIC_REPORT, "db_version": self.version}
+
+    def __repr__(self) -> str:
+        return f"SignatureSet(version={self.version!r}, rules={len(self.rules)})"
+
+    # Return the best matching rule for a header, or None when nothing matches
+    def match(self, magic_number: bytes) -> Optional[MagicRule]:
+        for rule in self.ranked:
+            if magic_number.startswith(rule.magic, rule.offset):
+                return rule
+        return None
+
+    # Number of header bytes read per file
+    def read_window(self, classify_text: bool = False) -> int:
+        return max(self.max_bytes, TEXT_WINDOW) if classify_text else self.max_bytes
+
+
+# (MAGIC_DB list, active set), swapped as one reference so readers never see a set paired
+# with another list; assigning a new list to MAGIC_DB directly still works and replaces the
+# active set on the next lookup
+_published = (MAGIC_DB, SignatureSet(MAGIC_DB))
+
+
+def current_signatures() -> SignatureSet:
+    """Return the active signature set; hold on to it for a consistent view."""
+    global _published
+    db = MAGIC_DB
+    seen, active = _published
+    if db is not seen:
+        # Built before it is published; threads racing here build equal sets and one wins
+        active = SignatureSet(db)
+        _published = (db, active)
+    return active
+
+
+def install_signatures(signatures: SignatureSet) -> SignatureSet:
+    """Make ``signatures`` the active set for new detections and return the previous one.
+
+    Detections already running finish with the set they started with.
+    """
+    global _published
+    previous = current_signatures()
+    _published = (MAGIC_DB, signatures)
+    return previous
+
+
+def load_signatures(path: str) -> SignatureSet:
+    """Load and compile a JSON signature file without installing it.
+
+    The file holds ``{"signatures": [{"offset": 0, "magic": "89504E47",
+    "label": "PNG Image", "priority": 100}, ...]}`` with ``magic`` in hex.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+    except OSError as e:
+        raise SignatureDatabaseError(f"Cannot read signature file {path}: {e}") from e
+    except ValueError as e:
+        raise SignatureParseError(f"Invalid signature JSON in {path}: {e}") from e
+
+    if not isinstance(doc, dict) or not isinstance(doc.get("signatures"), list):
+        raise SignatureParseError(f'{path}: expected an object with a "signatures" list')
+    db = []
+    for index, spec in enumerate(doc["signatures"]):
+        if not isinstance(spec, dict) or set(spec) != {"offset", "magic", "label", "priority"}:
+            raise SignatureParseError(
+                f"{path}: signature {index} needs exactly offset, magic, label and priority"
+            )
+        try:
+            magic = bytes.fromhex(spec["magic"])
+        except (TypeError, ValueError):
+            raise SignatureParseError(f"{path}: signature {index}: magic must be hex") from None
+        db.append((spec["offset"], magic, spec["label"], spec["priority"]))
+    return SignatureSet(db)
+
+
+def get_rules() -> tuple[MagicRule, ...]:
+    """Return the compiled rules of the active set in database order."""
+    return current_signatures().rules
+
+
+# Return the best matching rule for a header, or None when nothing matches
+def match_rule(magic_number: bytes) -> Optional[MagicRule]:
+    return current_signatures().match(magic_number)
+
 
 # Match the magic number against the database
 def match_magic(magic_number: bytes) -> dict:
-    best = None
-
-    for index, (offset, magic, label, priority) in enumerate(MAGIC_DB):
-        end = offset + len(magic)
-        if len(magic_number) >= end and magic_number[offset:end] == magic:
-            candidate = (priority, len(magic), -index, offset, magic, label)
-            if best is None or candidate > best:
-                best = candidate
+    rule = match_rule(magic_number)
 
-    if best is None:
+    if rule is None:
         return {
-            "file_type": "Unknown File Type",
+            "file_type": UNKNOWN_FILE_TYPE,
             "matched": False,
             "offset": None,
             "signature": None,
         }
 
-    _, _, _, offset, magic, label = best
     return {
-        "file_type": label,
+        "file_type": rule.label,
         "matched": True,
-        "offset": offset,
-        "signature": magic.hex().upper(),
+        "offset": rule.offset,
+        "signature": rule.signature,
         "rule": {
-            "priority": best[0],
-            "length": best[1],
+            "priority": rule.priority,
+            "length": len(rule.magic),
         },
     }
 
 
-def detect(path: str) -> dict:
-    file_report = {
-        "ok": False,
-        "path": path,
-        "file_type": None,
-        "size_bytes": None,
-        "magic": {
-            "matched": False,
-            "offset": None,
-            "signature": None,
-        },
-    }
+# Check a contiguous buffer of fixed-width records and view it as unsigned bytes
+def _record_buffer(headers, width: int) -> memoryview:
+    buf = memoryview(headers).cast("B")
+    if len(buf) % width:
+        raise ValueError(f"Buffer length {len(buf)} is not a multiple of header width {width}")
+    return buf
+
+
+def _match_batch_python(headers: list[bytes], ranked: tuple[MagicRule, ...]) -> array:
+    rules = [(r.index, r.offset, r.magic) for r in ranked]
+    out = array("i", bytes(4 * len(headers)))
+
+    for n, header in enumerate(headers):
+        result = -1
+        for index, offset, magic in rules:
+            if header.startswith(magic, offset):
+                result = index
+                break
+        out[n] = result
+
+    return out
+
+
+def _match_batch_numpy(headers: list[bytes], ranked: tuple[MagicRule, ...]) -> array:
+    width = max((len(h) for h in headers), default=0)
+    lengths = _np.fromiter((len(h) for h in headers), dtype=_np.intp, count=len(headers))
+    matrix = _np.zeros((len(headers), width), dtype=_np.uint8)
+    for n, header in enumerate(headers):
+        matrix[n, : len(header)] = _np.frombuffer(header, dtype=_np.uint8)
+    return _match_matrix(matrix, lengths, ranked)
+
+
+# Match one header per matrix row; lengths is None when every row is a full header
+def _match_matrix(matrix, lengths, ranked: tuple[MagicRule, ...]) -> array:
+    width = matrix.shape[1]
+    result = _np.full(len(matrix), -1, dtype=_np.int32)
+    # Assign least preferred rules first so better matches overwrite them
+    for rule in reversed(ranked):
+        end = rule.end
+        if end > width:
+            continue
+        expected = _np.frombuffer(rule.magic, dtype=_np.uint8)
+        hits = (matrix[:, rule.offset : end] == expected).all(axis=1)
+        if lengths is not None:
+            hits &= lengths >= end
+        result[hits] = rule.index
+
+    out = array("i")
+    out.frombytes(result.tobytes())
+    return out
+
+
+# Match many headers at once and return the database index of each match (-1 for unknown)
+def match_magic_batch(
+    headers, width: int | None = None, signatures: Optional[SignatureSet] = None
+) -> array:
+    """Match a batch of headers; results agree with ``match_magic`` per header.
+
+    ``headers`` is either a contiguous buffer of fixed-width records (``width``
+    defaults to the signature set's ``max_bytes``) or an iterable of individual
+    headers. Indices refer to ``signatures`` (default: the active set).
+    """
+    signatures = signatures or current_signatures()
+    ranked = signatures.ranked
+
+    if isinstance(headers, (bytes, bytearray, memoryview)):
+        width = width or signatures.max_bytes
+        buf = _record_buffer(headers, width)
+        if _np is not None and len(buf):
+            # The buffer already is the header matrix, so match it without copying
+            return _match_matrix(_np.frombuffer(buf, _np.uint8).reshape(-1, width), None, ranked)
+        records = [buf[i : i + width].tobytes() for i in range(0, len(buf), width)]
+        return _match_batch_python(records, ranked)
+
+    records = [bytes(h) for h in headers]
+    if _np is not None and records:
+        return _match_batch_numpy(records, ranked)
+    return _match_batch_python(records, ranked)
+
+
+# Detect a file and also return the matched rule (None for unknown files)
+# With classify_text, unmatched headers are checked by the text classifier (one larger read)
+# A HeaderReader, when given, reads through raw descriptors instead of a file object
+# signatures pins the set to use; by default the active set is taken once per file
+def detect_with_rule(
+    path: str,
+    classify_text: bool = False,
+    reader: Optional["HeaderReader"] = None,
+    signatures: Optional[SignatureSet] = None,
+) -> tuple[dict, Optional[MagicRule]]:
+    result = detect_or_error(path, classify_text, reader, signatures)
+    if isinstance(result, ErrorRecord):
+        raise result.to_error()
+    return result
+
 
+# Like detect_with_rule, but a file that cannot be read gives an ErrorRecord instead of
+# raising, so scans of mostly unreadable trees build no exception objects of their own
+# A size already known from a stat call is reported as is, skipping the fstat
+def detect_or_error(
+    path: str,
+    classify_text: bool = False,
+    reader: Optional["HeaderReader"] = None,
+    signatures: Optional[SignatureSet] = None,
+    size: Optional[int] = None,
+) -> Union[tuple[dict, Optional[MagicRule]], ErrorRecord]:
+    signatures = signatures or current_signatures()
+    window = signatures.read_window(classify_text)
     try:
-        with open(path, "rb") as f:
-            size_bytes = os.fstat(f.fileno()).st_size
-            magic_number = f.read(MAX_MAGIC_BYTES)
-    except FileNotFoundError as e:
-        raise PathNotFoundError(path) from e
-    except IsADirectoryError as e:
-        raise PathIsDirectoryError(path) from e
-    except PermissionError as e:
-        raise PermissionDeniedError(path) from e
+        if reader is not None:
+            size_bytes, magic_number = reader.read(path, window, size)
+        else:
+            # Unbuffered, so only window bytes are read rather than a whole buffer
+            with open(path, "rb", buffering=0) as f:
+                size_bytes = os.fstat(f.fileno()).st_size if size is None else size
+                magic_number = f.read(window)
+    except FileNotFoundError:
+        return ErrorRecord("ENOENT", path)
+    except IsADirectoryError:
+        return ErrorRecord("EISDIR", path)
+    except PermissionError:
+        return ErrorRecord("EACCES", path)
     except OSError as e:
-        raise FileReadError(path, os_error=str(e)) from e
+        return ErrorRecord("EIO", path, str(e))
 
-    magic_report = match_magic(magic_number)
+    rule = signatures.match(magic_number)
+    report = build_report(path, size_bytes, rule, signatures)
+    if rule is None and classify_text:
+        text = classify_text_header(magic_number)
+        if text is not None:
+            report["file_type"] = text.pop("file_type")
+            report["text"] = text
+    return report, rule
+
+
+class HeaderReader:
+    """Read header windows for many small files with as few system calls as possible.
+
+    Files are opened with ``os.open`` (adding ``O_NOATIME`` where the kernel
+    allows it), relative to a cached descriptor for their directory, and read
+    with a single ``os.preadv`` of exactly ``window`` bytes into a reused buffer
+    of ``SMALL_FILE_BYTES``, so rate limits and metrics charge what was read.
+    The size comes from ``fstat`` unless the caller already knows it; a short
+    read is not taken as the size, which is wrong for special files. Not
+    thread-safe; use one reader per thread.
+    """
+
+    def __init__(self) -> None:
+        self._buf = bytearray(SMALL_FILE_BYTES)
+        self._view = memoryview(self._buf)
+        self._flags = os.O_RDONLY | getattr(os, "O_CLOEXEC", 0)
+        self._noatime = getattr(os, "O_NOATIME", 0)
+        self._dir_path: Optional[str] = None
+        self._dir_fd: Optional[int] = None
+
+    @staticmethod
+    def supported() -> bool:
+        return hasattr(os, "preadv") and os.open in os.supports_dir_fd
+
+    def read(self, path: str, window: int, size: Optional[int] = None) -> tuple[int, bytes]:
+        """Return ``(size, header)`` for ``path``; a known ``size`` skips the fstat."""
+        fd = self._open(path)
+        try:
+            buf = self._view[:window] if window <= len(self._buf) else bytearray(window)
+            n = os.preadv(fd, [buf], 0)
+            if size is None:
+                size = os.fstat(fd).st_size
+            return size, bytes(buf[:n])
+        finally:
+            os.close(fd)
+
+    def _open(self, path: str) -> int:
+        dir_path, name = os.path.split(path)
+        dir_fd = self._directory(dir_path) if name else None
+        target = name if dir_fd is not None else path
+        if self._noatime:
+            try:
+                return os.open(target, self._flags | self._noatime, dir_fd=dir_fd)
+            except PermissionError as e:
+                # O_NOATIME needs file ownership (EPERM); fall back for everyone else's files
+                if e.errno != errno.EPERM:
+                    raise
+                self._noatime = 0
+        return os.open(target, self._flags, dir_fd=dir_fd)
+
+    # Descriptor for the most recent directory; sorted input keeps it warm
+    def _directory(self, dir_path: str) -> Optional[int]:
+        if dir_path != self._dir_path:
+            self._close_directory()
+            self._dir_path = dir_path
+            try:
+                self._dir_fd = os.open(
+                    dir_path or ".", os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | self._flags
+                )
+            except OSError:
+                self._dir_fd = None
+        return self._dir_fd
+
+    def _close_directory(self) -> None:
+        if self._dir_fd is not None:
+            os.close(self._dir_fd)
+        self._dir_path = None
+        self._dir_fd = None
+
+    def close(self) -> None:
+        self._close_directory()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Number of header bytes read per file with the active signature set
+def read_window(classify_text: bool = False) -> int:
+    return current_signatures().read_window(classify_text)
+
+
+# Build a success report; the "magic" section is shared with the rule, not copied
+# Unknown files get the unmatched section of signatures (default: the active set)
+def build_report(
+    path: str,
+    size_bytes: int,
+    rule: Optional[MagicRule],
+    signatures: Optional[SignatureSet] = None,
+) -> dict:
+    if rule is None:
+        return {
+            "ok": True,
+            "path": path,
+            "file_type": UNKNOWN_FILE_TYPE,
+            "size_bytes": size_bytes,
+            "magic": (signatures or current_signatures()).unknown_report,
+        }
+    return {
+        "ok": True,
+        "path": path,
+        "file_type": rule.label,
+        "size_bytes": size_bytes,
+        "magic": rule.report,
+    }
 
-    file_report["ok"] = True
-    file_report["file_type"] = magic_report["file_type"]
-    file_report["size_bytes"] = size_bytes
-    file_report["magic"]["matched"] = magic_report["matched"]
-    file_report["magic"]["offset"] = magic_report["offset"]
-    file_report["magic"]["signature"] = magic_report["signature"]
 
-    return file_report
+def detect(path: str, classify_text: bool = False) -> dict:
+    return detect_with_rule(path, classify_text)[0]
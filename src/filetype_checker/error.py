@@ -21,6 +21,16 @@ class FtcheckError(Exception):
         return self.message
 
 
+# Messages of the per-path errors, shared with ErrorRecord
+PATH_ERROR_MESSAGES = {
+    "ENOENT": "File not found",
+    "EACCES": "Permission denied",
+    "EISDIR": "Path is a directory",
+    "ENOTFILE": "Not a regular file",
+    "EIO": "Error reading file",
+}
+
+
 # Path related errors
 class PathNotFoundError(FtcheckError):
     """Exception raised when the specified path is not found."""
@@ -28,7 +38,7 @@ class PathNotFoundError(FtcheckError):
     def __init__(self, path: str, message: Optional[str] = None) -> None:
         super().__init__(
             code="ENOENT",
-            message=message or f"File not found: {path}",
+            message=message or f"{PATH_ERROR_MESSAGES['ENOENT']}: {path}",
             exit_code=3,
             details={"path": path},
         )
@@ -40,7 +50,7 @@ class PermissionDeniedError(FtcheckError):
     def __init__(self, path: str, message: Optional[str] = None) -> None:
         super().__init__(
             code="EACCES",
-            message=message or f"Permission denied: {path}",
+            message=message or f"{PATH_ERROR_MESSAGES['EACCES']}: {path}",
             exit_code=4,
             details={"path": path},
         )
@@ -52,7 +62,7 @@ class PathIsDirectoryError(FtcheckError):
     def __init__(self, path: str, message: Optional[str] = None) -> None:
         super().__init__(
             code="EISDIR",
-            message=message or f"Path is a directory: {path}",
+            message=message or f"{PATH_ERROR_MESSAGES['EISDIR']}: {path}",
             exit_code=5,
             details={"path": path},
         )
@@ -64,7 +74,7 @@ class NotARegularFileError(FtcheckError):
     def __init__(self, path: str, message: Optional[str] = None) -> None:
         super().__init__(
             code="ENOTFILE",
-            message=message or f"Not a regular file: {path}",
+            message=message or f"{PATH_ERROR_MESSAGES['ENOTFILE']}: {path}",
             exit_code=5,
             details={"path": path},
         )
@@ -85,7 +95,7 @@ class FileReadError(FtcheckError):
             details["os_error"] = os_error
         super().__init__(
             code="EIO",
-            message=message or f"Error reading file: {path}",
+            message=message or f"{PATH_ERROR_MESSAGES['EIO']}: {path}",
             exit_code=1,
             details=details,
         )
@@ -175,6 +185,197 @@ class OutputWriteError(FtcheckError):
             details=None,
         )
 
+
+class SinkWriteError(FtcheckError):
+    """Exception raised when an ``--output`` sink cannot be written."""
+
+    def __init__(self, path: str, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="SINK",
+            message=message or f"Cannot write output: {path}",
+            exit_code=2,
+            details={"path": path},
+        )
+
+
+# Archive related errors
+class ArchiveReadError(FtcheckError):
+    """Exception raised when an archive or one of its members cannot be read."""
+
+    def __init__(
+        self,
+        path: str,
+        message: Optional[str] = None,
+        *,
+        os_error: Optional[str] = None,
+    ) -> None:
+        details = {"path": path}
+        if os_error:
+            details["os_error"] = os_error
+        super().__init__(
+            code="EARCHIVE",
+            message=message or f"Error reading archive: {path}",
+            exit_code=1,
+            details=details,
+        )
+
+
+class ArchiveLimitError(FtcheckError):
+    """Exception raised when an archive exceeds a configured scanning limit."""
+
+    def __init__(self, path: str, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="ARCHIVE_LIMIT",
+            message=message or f"Archive limit exceeded: {path}",
+            exit_code=1,
+            details={"path": path},
+        )
+
+
+class CheckpointError(FtcheckError):
+    """Exception raised when a scan checkpoint cannot be read or does not fit the scan."""
+
+    def __init__(self, path: str, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="CHECKPOINT",
+            message=message or f"Invalid checkpoint: {path}",
+            exit_code=2,
+            details={"path": path},
+        )
+
+
+class PrioritySettingError(FtcheckError):
+    """Exception raised when the requested CPU or I/O priority cannot be applied."""
+
+    def __init__(self, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="PRIORITY",
+            message=message or "Cannot change process priority",
+            exit_code=2,
+            details=None,
+        )
+
+
+class FileTimeoutError(FtcheckError):
+    """Exception raised when detecting a file takes longer than --file-timeout."""
+
+    def __init__(self, path: str, timeout: float, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="ETIMEDOUT",
+            message=message or f"Timed out after {timeout:g}s: {path}",
+            exit_code=1,
+            details={"path": path, "timeout_seconds": timeout},
+        )
+
+
+class PolicyError(FtcheckError):
+    """Exception raised when a policy file cannot be read or has invalid rules."""
+
+    def __init__(self, path: str, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="POLICY",
+            message=message or f"Invalid policy file: {path}",
+            exit_code=2,
+            details={"path": path},
+        )
+
+
+class ScanDiffError(FtcheckError):
+    """Exception raised when a scan output given to ``ftcheck diff`` cannot be read."""
+
+    def __init__(self, path: str, message: Optional[str] = None) -> None:
+        super().__init__(
+            code="DIFF_INPUT",
+            message=message or f"Invalid scan output: {path}",
+            exit_code=2,
+            details={"path": path},
+        )
+
+
+class ErrorRecord:
+    """Compact error item for a file that could not be read: an error code and a path.
+
+    Detection returns these instead of raising, so a tree full of unreadable
+    files does not build an exception, message and ``details`` dict per file.
+    The message and the usual error item dict are built only on output
+    (``item()``); ``record["ok"]``, ``["path"]`` and ``["error"]`` also work as
+    on an error item dict, and ``record["error"]`` is built once. ``code`` is one
+    of ``PATH_ERROR_MESSAGES``.
+    """
+
+    __slots__ = ("code", "path", "os_error", "_error")
+
+    def __init__(self, code: str, path: str, os_error: Optional[str] = None) -> None:
+        self.code = code
+        self.path = path
+        self.os_error = os_error
+        # record["error"], kept once looked up; item() builds its own, so records held
+        # until output (--json) do not keep a dict each
+        self._error: Optional[Dict[str, Any]] = None
+
+    @property
+    def message(self) -> str:
+        return f"{PATH_ERROR_MESSAGES[self.code]}: {self.path}"
+
+    @property
+    def details(self) -> Dict[str, Any]:
+        details = {"path": self.path}
+        if self.os_error:
+            details["os_error"] = self.os_error
+        return details
+
+    def item(self) -> Dict[str, Any]:
+        """Return the error item dict for this record."""
+        return {"ok": False, "path": self.path, "error": self._error or self._error_dict()}
+
+    def _error_dict(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": self.message, "details": self.details}
+
+    def to_error(self) -> FtcheckError:
+        """Return the ``FtcheckError`` that detection would have raised."""
+        if self.code == "EIO":
+            return FileReadError(self.path, os_error=self.os_error)
+        return _RECORD_ERRORS[self.code](self.path)
+
+    def __getitem__(self, key: str):
+        if key == "ok":
+            return False
+        if key == "path":
+            return self.path
+        if key == "error":
+            if self._error is None:
+                self._error = self._error_dict()
+            return self._error
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ErrorRecord):
+            return NotImplemented
+        return (self.code, self.path, self.os_error) == (other.code, other.path, other.os_error)
+
+    def __repr__(self) -> str:
+        return f"ErrorRecord({self.code!r}, {self.path!r})"
+
+
+_RECORD_ERRORS = {
+    "ENOENT": PathNotFoundError,
+    "EACCES": PermissionDeniedError,
+    "EISDIR": PathIsDirectoryError,
+    "ENOTFILE": NotARegularFileError,
+}
+
+
+def error_code(item) -> str:
+    """Return the error code of an error item dict or ``ErrorRecord``."""
+    return item.code if isinstance(item, ErrorRecord) else item["error"]["code"]
+
+
 __all__ = [
     "FtcheckError",
     "PathNotFoundError",
@@ -189,4 +390,13 @@ __all__ = [
     "InternalDetectionError",
     "JsonSerializationError",
     "OutputWriteError",
+    "SinkWriteError",
+    "ArchiveReadError",
+    "ArchiveLimitError",
+    "CheckpointError",
+    "PrioritySettingError",
+    "FileTimeoutError",
+    "PolicyError",
+    "ScanDiffError",
+    "ErrorRecord",
 ]
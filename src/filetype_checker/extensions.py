@@ -13,6 +13,22 @@ EXTENSION_DB: dict[str, set[str]] = {
 }
 
 
+def expected_extensions(file_type: str | None) -> frozenset[str] | None:
+    key = file_type.strip() if file_type else None
+    expected_exts = EXTENSION_DB.get(key) if key else None
+    return frozenset(expected_exts) if expected_exts is not None else None
+
+
+# Same result as get_ext_and_mismatch, with the expected extensions already resolved
+def check_extension(path: str, expected_exts: frozenset[str] | None) -> tuple[str, bool]:
+    ext = Path(path).suffix.lower()
+
+    if ext == "" or expected_exts is None:
+        return ext, False
+
+    return ext, ext not in expected_exts
+
+
 def get_ext_and_mismatch(path: str, file_type: str | None, matched: bool) -> tuple[str, bool]:
     ext = Path(path).suffix.lower()
 
@@ -22,8 +38,7 @@ def get_ext_and_mismatch(path: str, file_type: str | None, matched: bool) -> tup
     if not matched:
         return ext, False  # Only report mismatch when magic matched
 
-    key = file_type.strip() if file_type else None
-    expected_exts = EXTENSION_DB.get(key) if key else None
+    expected_exts = expected_extensions(file_type)
     if expected_exts is None:
         return ext, False  # No expected extensions for unknown file types
 
@@ -0,0 +1,189 @@
+# Memory-bounded ordering of scan results for --memory-limit
+# Paths are buffered up to the limit, spilled to temporary files as sorted runs and
+# k-way merged lazily, so sorted output no longer needs the whole path list in RAM
+
+import heapq
+import os
+import re
+import struct
+import tempfile
+from operator import itemgetter
+from typing import Callable, Iterator, Optional
+
+from filetype_checker import scanner
+from filetype_checker.error import FtcheckError
+
+# Rough bytes per buffered (path, file_id) pair on top of the encoded path itself
+ENTRY_OVERHEAD = 200
+# Most runs merged at once. Every MAX_MERGE_FANIN runs of one level are merged into one run
+# of the next level, so each record is rewritten once per level, log(runs) times in all
+MAX_MERGE_FANIN = 64
+
+# Run record: path length, has-file-id flag, st_dev, st_ino, then the encoded path
+_RECORD = struct.Struct("<IBQQ")
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """Parse ``"512M"``, ``"2G"``, ``"65536"`` and similar into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*", text.upper())
+    if match is None:
+        raise ValueError(f"invalid size: {text!r}")
+    size = int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+    if size <= 0:
+        raise ValueError("size must be positive")
+    return size
+
+
+def _write_record(f, path: str, file_id: Optional[scanner.FileId]) -> None:
+    encoded = os.fsencode(path)
+    dev, ino = file_id if file_id is not None else (0, 0)
+    f.write(_RECORD.pack(len(encoded), file_id is not None, dev, ino))
+    f.write(encoded)
+
+
+def _read_run(f) -> Iterator[tuple]:
+    f.seek(0)
+    while True:
+        header = f.read(_RECORD.size)
+        if not header:
+            return
+        length, has_id, dev, ino = _RECORD.unpack(header)
+        path = os.fsdecode(f.read(length))
+        yield path, ((dev, ino) if has_id else None)
+
+
+class ExternalSorter:
+    """Collect ``(path, file_id)`` pairs and give them back sorted by path, without duplicates.
+
+    At most about ``memory_limit`` bytes of pairs are held in memory; the rest live
+    in sorted runs in anonymous temporary files under ``tmpdir``. Other
+    ``(path, value)`` pairs can be sorted by passing ``write_record(f, path, value)``
+    and ``read_run(f)`` functions for the run format.
+    """
+
+    def __init__(
+        self,
+        memory_limit: int,
+        tmpdir: Optional[str] = None,
+        write_record: Callable = _write_record,
+        read_run: Callable = _read_run,
+    ) -> None:
+        self.memory_limit = memory_limit
+        self.tmpdir = tmpdir
+        self._write_record = write_record
+        self._read_run = read_run
+        # Runs by level; a level-k run holds about MAX_MERGE_FANIN ** k spills
+        self._levels: list[list] = []
+        self._buffer: list[tuple] = []
+        self._buffered_bytes = 0
+
+    def add(self, path: str, file_id: Optional[scanner.FileId]) -> None:
+        self._buffer.append((path, file_id))
+        self._buffered_bytes += len(path) + ENTRY_OVERHEAD
+        if self._buffered_bytes >= self.memory_limit:
+            self._spill()
+
+    @property
+    def runs(self) -> list:
+        """The run files, smallest level first."""
+        return [run for level in self._levels for run in level]
+
+    def _new_run(self):
+        return tempfile.TemporaryFile(dir=self.tmpdir)
+
+    def _spill(self) -> None:
+        self._buffer.sort(key=itemgetter(0))
+        run = self._new_run()
+        for path, file_id in self._buffer:
+            self._write_record(run, path, file_id)
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._add_run(0, run)
+
+    def _add_run(self, level: int, run) -> None:
+        while True:
+            if level == len(self._levels):
+                self._levels.append([])
+            runs = self._levels[level]
+            runs.append(run)
+            if len(runs) < MAX_MERGE_FANIN:
+                return
+            self._levels[level] = []
+            run = self._merge_runs(runs)
+            level += 1
+
+    def _merge_runs(self, runs: list):
+        merged = self._new_run()
+        for path, file_id in self._merge([self._read_run(run) for run in runs]):
+            self._write_record(merged, path, file_id)
+        for run in runs:
+            run.close()
+        return merged
+
+    @staticmethod
+    def _merge(sources: list) -> Iterator[tuple]:
+        last = None
+        for path, file_id in heapq.merge(*sources, key=itemgetter(0)):
+            if path != last:
+                last = path
+                yield path, file_id
+
+    def __iter__(self) -> Iterator[tuple]:
+        self._buffer.sort(key=itemgetter(0))
+        runs = self.runs
+        # Merge the smallest runs first until the runs and the buffer fit one merge
+        excess = len(runs) + 1 - MAX_MERGE_FANIN
+        if excess > 0:
+            runs = [self._merge_runs(runs[: excess + 1]), *runs[excess + 1 :]]
+            self._levels = [runs]
+        sources = [self._read_run(run) for run in runs]
+        return self._merge([*sources, iter(self._buffer)])
+
+    def close(self) -> None:
+        for run in self.runs:
+            run.close()
+        self._levels = []
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def sorted_scan(
+    paths: list[str],
+    recursive: bool,
+    memory_limit: int,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    threads: int = 1,
+    tmpdir: Optional[str] = None,
+) -> tuple[ExternalSorter, list[FtcheckError]]:
+    """Scan like ``scanner.scan_paths`` with the file list kept within ``memory_limit``.
+
+    Returns the sorter (iterate it for the sorted pairs, then close it) and the
+    problems found while walking.
+    """
+    sorter = ExternalSorter(memory_limit, tmpdir)
+    problems: list[FtcheckError] = []
+    try:
+        for path in paths:
+            path_problems = []
+            for files, dir_problems in scanner.iter_scan_path(
+                path, recursive, follow_symlinks, one_file_system, threads
+            ):
+                for file_path, file_id in files:
+                    sorter.add(file_path, file_id)
+                path_problems.extend(dir_problems)
+            if threads > 1:
+                # Same order as scanner.scan_path
+                path_problems.sort(key=lambda p: (p.details or {}).get("path", ""))
+            problems.extend(path_problems)
+    except BaseException:
+        sorter.close()
+        raise
+
+    return sorter, problems
@@ -0,0 +1,205 @@
+# Prometheus metrics for long-running scans: a textfile-collector file and/or an HTTP endpoint
+# Only the detection loop writes to the counters; exporters read copies, so no lock is needed
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from filetype_checker import reporting
+from filetype_checker.error import error_code
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the detection latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 1.0)
+
+DEFAULT_INTERVAL = 10.0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ScanMetrics:
+    """Counters, per-type and per-error-code totals and a latency histogram for one scan.
+
+    ``observe`` and ``observe_detection`` are called from the detection loop only.
+    ``observe`` counts every emitted item; ``observe_detection`` is called once per
+    file actually read, so items reused for hard links add no bytes or latency.
+    ``render`` may run on another thread; it works from copies of the counters.
+    """
+
+    def __init__(
+        self,
+        read_window: int,
+        textfile: Optional[str] = None,
+        interval: float = DEFAULT_INTERVAL,
+        clock=time.monotonic,
+    ) -> None:
+        self.read_window = read_window
+        self.textfile = textfile
+        self.interval = interval
+        self._clock = clock
+        self._next_write = clock() + interval
+        self.running = 1
+        self.start_time = time.time()
+        self.counts = {"scanned": 0, "matched": 0, "unknown": 0, "text": 0, "bytes_read": 0}
+        self.by_type: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def observe(self, item: dict) -> None:
+        counts = self.counts
+        if item.get("ok") is True:
+            counts["scanned"] += 1
+            if item["magic"]["matched"] is True:
+                counts["matched"] += 1
+            elif "text" in item:
+                counts["text"] += 1
+            else:
+                counts["unknown"] += 1
+            file_type = item["file_type"]
+            self.by_type[file_type] = self.by_type.get(file_type, 0) + 1
+        else:
+            code = error_code(item)
+            self.errors[code] = self.errors.get(code, 0) + 1
+
+        if self.textfile is not None and self._clock() >= self._next_write:
+            self._write_or_warn()
+
+    # A file's header was read in ``seconds``; the reader reads min(size, window) bytes
+    def observe_detection(self, item, seconds: float) -> None:
+        if item["ok"]:
+            self.counts["bytes_read"] += min(item["size_bytes"], self.read_window)
+        self.observe_latency(seconds)
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        counts = dict(self.counts)
+        by_type = dict(self.by_type)
+        errors = dict(self.errors)
+        buckets = list(self.latency_buckets)
+        latency_sum = self.latency_sum
+
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                label_text = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{name}{suffix}{label_text} {_format_value(value)}")
+
+        counters = (
+            ("files_scanned", "scanned", "Files detected successfully."),
+            ("files_matched", "matched", "Files that matched a magic signature."),
+            ("files_unknown", "unknown", "Files that matched no signature."),
+            ("files_text", "text", "Unmatched files labelled by the text classifier."),
+            ("bytes_read", "bytes_read", "Header bytes read for detection."),
+        )
+        for name, key, help_text in counters:
+            metric(f"ftcheck_{name}_total", "counter", help_text, [("", (), counts[key])])
+        metric(
+            "ftcheck_errors_total",
+            "counter",
+            "Error items by error code.",
+            [("", (("code", code),), n) for code, n in sorted(errors.items())],
+        )
+        metric(
+            "ftcheck_files_by_type_total",
+            "counter",
+            "Successfully detected files by file type.",
+            [("", (("file_type", t),), n) for t, n in sorted(by_type.items())],
+        )
+
+        samples = []
+        cumulative = 0
+        for bound, n in zip((*map(repr, LATENCY_BUCKETS), "+Inf"), buckets, strict=True):
+            cumulative += n
+            samples.append(("_bucket", (("le", bound),), cumulative))
+        samples.append(("_sum", (), latency_sum))
+        samples.append(("_count", (), cumulative))
+        metric("ftcheck_detect_seconds", "histogram", "Time to detect one file.", samples)
+
+        metric(
+            "ftcheck_scan_start_time_seconds",
+            "gauge",
+            "Unix time the scan started.",
+            [("", (), self.start_time)],
+        )
+        metric(
+            "ftcheck_scan_running",
+            "gauge",
+            "1 while the scan is running, 0 once it has finished.",
+            [("", (), self.running)],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self) -> None:
+        """Rewrite the textfile atomically so the collector never reads a partial file."""
+        self._next_write = self._clock() + self.interval
+        tmp_path = f"{self.textfile}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.textfile)
+
+    # A failed write must not end the scan; report it and try again at the next interval
+    def _write_or_warn(self) -> None:
+        try:
+            self.write_textfile()
+        except OSError as e:
+            print(
+                reporting.format_human_error(
+                    self.textfile, "EIO", f"Cannot write metrics file: {e}"
+                ),
+                file=sys.stderr,
+            )
+
+    def serve(self, host: str, port: int) -> int:
+        """Serve ``/metrics`` from a daemon thread; return the bound port."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server naming
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        """Mark the scan finished, write the final textfile and stop the HTTP server."""
+        self.running = 0
+        if self.textfile is not None:
+            self._write_or_warn()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,256 @@
+# Process-pool scan engine that returns results through shared-memory ring buffers
+# Workers write one fixed-width record per file instead of pickling report dicts;
+# the parent turns records back into the usual report items only when emitting them
+
+import multiprocessing as mp
+import os
+import re
+import struct
+import time
+from itertools import islice
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, Iterator, Optional
+
+from filetype_checker import detector, textclass
+from filetype_checker.error import ErrorRecord, InternalDetectionError
+
+# Record layout: path index, size in bytes, rule index, status code, text kind, errno of
+# an EIO failure (0 if none), seconds the worker spent detecting the file
+RECORD = struct.Struct("<QqhBbhf")
+# Each ring starts with the producer's head counter
+_HEAD = struct.Struct("<Q")
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_RING_SLOTS = 4096
+# Seconds to wait for a record before checking that the workers are still alive
+_POLL_SECONDS = 1.0
+
+# Status codes carried in records; the parent turns them back into ErrorRecords
+STATUS_CODES = ("OK", "ENOENT", "EACCES", "EISDIR", "EIO")
+_STATUS_IDS = {code: i for i, code in enumerate(STATUS_CODES)}
+# The errno at the start of str(OSError), which EIO records keep as their os_error
+_ERRNO_PREFIX = re.compile(r"\[Errno (\d+)\]")
+
+
+# Detect one file and reduce the result to the record fields
+def encode_result(
+    path: str,
+    classify_text: bool = False,
+    reader: Optional[detector.HeaderReader] = None,
+    signatures: Optional[detector.SignatureSet] = None,
+) -> tuple[int, int, int, int, int]:
+    result = detector.detect_or_error(path, classify_text, reader, signatures)
+    if isinstance(result, ErrorRecord):
+        status = _STATUS_IDS.get(result.code, _STATUS_IDS["EIO"])
+        errno = _ERRNO_PREFIX.match(result.os_error or "")
+        return -1, -1, status, -1, int(errno.group(1)) if errno else 0
+
+    report, rule = result
+    if rule is not None:
+        return report["size_bytes"], rule.index, 0, -1, 0
+    if "text" in report:
+        return report["size_bytes"], -1, 0, textclass.text_kind_id(report["text"]), 0
+    return report["size_bytes"], -1, 0, -1, 0
+
+
+# Rebuild (report, rule) from record fields; failed files give (ErrorRecord, None)
+# Rule indices refer to signatures, which must be the set the worker detected with
+# EIO records get back the OS error's errno and message, though not the file name in it
+def decode_result(
+    path: str,
+    size: int,
+    rule_index: int,
+    status: int,
+    text_kind: int,
+    errno: int = 0,
+    signatures: Optional[detector.SignatureSet] = None,
+) -> tuple:
+    if status != 0:
+        os_error = str(OSError(errno, os.strerror(errno))) if errno else None
+        return ErrorRecord(STATUS_CODES[status], path, os_error), None
+
+    signatures = signatures or detector.current_signatures()
+    rule = signatures.rules[rule_index] if rule_index >= 0 else None
+    report = detector.build_report(path, size, rule, signatures)
+    if text_kind >= 0:
+        text = textclass.text_from_kind(text_kind)
+        report["file_type"] = text.pop("file_type")
+        report["text"] = text
+    return report, rule
+
+
+def _worker(
+    tasks, shm_name: str, slots: int, spaces, ready, classify_text: bool, db: tuple
+) -> None:
+    # Workers share the parent's resource tracker, so attaching does not transfer ownership
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # The parent's signature snapshot, so rule indices mean the same on both sides
+    signatures = detector.SignatureSet(db)
+    buf = shm.buf
+    head = 0
+    reader = detector.HeaderReader() if detector.HeaderReader.supported() else None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            start, paths = task
+            for i, path in enumerate(paths):
+                began = time.perf_counter()
+                fields = encode_result(path, classify_text, reader, signatures)
+                seconds = time.perf_counter() - began
+                spaces.acquire()
+                offset = _HEAD.size + (head % slots) * RECORD.size
+                RECORD.pack_into(buf, offset, start + i, *fields, seconds)
+                head += 1
+                _HEAD.pack_into(buf, 0, head)
+                ready.release()
+    finally:
+        if reader is not None:
+            reader.close()
+        del buf
+        shm.close()
+
+
+class _Ring:
+    def __init__(self, ctx, slots: int) -> None:
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=_HEAD.size + slots * RECORD.size)
+        _HEAD.pack_into(self.shm.buf, 0, 0)
+        self.spaces = ctx.Semaphore(slots)
+        self.tail = 0
+
+    # Read every record the worker has published since the last call
+    def drain(self) -> list[tuple]:
+        buf = self.shm.buf
+        head = _HEAD.unpack_from(buf, 0)[0]
+        records = []
+        while self.tail < head:
+            offset = _HEAD.size + (self.tail % self.slots) * RECORD.size
+            records.append(RECORD.unpack_from(buf, offset))
+            self.tail += 1
+            self.spaces.release()
+        return records
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+def iter_results(
+    paths: Iterable[str],
+    workers: int,
+    *,
+    classify_text: bool = False,
+    before_batch: Optional[Callable[[list[str]], None]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    ring_slots: int = DEFAULT_RING_SLOTS,
+    timed: bool = False,
+) -> Iterator[tuple]:
+    """Detect ``paths`` in ``workers`` processes and yield ``decode_result`` values in order.
+
+    ``paths`` may be any iterable; it is consumed one batch at a time as results
+    are emitted. ``before_batch`` is called in the parent before each batch is
+    handed out, which is where rate limits are applied. The whole run uses the
+    signature set that is active when it starts. With ``timed``, each value gets
+    a third element: the seconds the worker spent detecting the file.
+    """
+    source = iter(paths)
+    first = list(islice(source, batch_size))
+    if not first:
+        return
+
+    signatures = detector.current_signatures()
+    ctx = mp.get_context()
+    tasks = ctx.Queue()
+    ready = ctx.Semaphore(0)
+    rings = [_Ring(ctx, ring_slots) for _ in range(workers)]
+    procs = [
+        ctx.Process(
+            target=_worker,
+            args=(
+                tasks,
+                ring.shm.name,
+                ring.slots,
+                ring.spaces,
+                ready,
+                classify_text,
+                signatures.db,
+            ),
+            daemon=True,
+        )
+        for ring in rings
+    ]
+    finished = False
+    # Batches handed out but not fully emitted, by start index
+    in_flight: dict[int, list[str]] = {}
+    dispatched = 0
+
+    try:
+        for proc in procs:
+            proc.start()
+
+        def dispatch() -> None:
+            nonlocal first, dispatched
+            batch = first or list(islice(source, batch_size))
+            first = None
+            if not batch:
+                return
+            if before_batch is not None:
+                before_batch(batch)
+            in_flight[dispatched] = batch
+            tasks.put((dispatched, batch))
+            dispatched += len(batch)
+
+        # Keep a bounded number of batches in flight so reordering stays cheap
+        for _ in range(2 * workers):
+            dispatch()
+
+        pending: dict[int, tuple] = {}
+        next_index = 0
+        while next_index < dispatched:
+            if not ready.acquire(timeout=_POLL_SECONDS):
+                if any(proc.exitcode not in (None, 0) for proc in procs):
+                    raise InternalDetectionError("Scan worker process exited unexpectedly")
+                continue
+
+            received = 0
+            for ring in rings:
+                for record in ring.drain():
+                    pending[record[0]] = record
+                    received += 1
+            # One semaphore release per record; we already took one above
+            for _ in range(received - 1):
+                ready.acquire()
+
+            while next_index in pending:
+                index, size, rule_index, status, text_kind, errno, seconds = pending.pop(
+                    next_index
+                )
+                start = index - index % batch_size
+                batch = in_flight[start]
+                if index - start == len(batch) - 1:
+                    del in_flight[start]
+                    dispatch()
+                result = decode_result(
+                    batch[index - start], size, rule_index, status, text_kind, errno, signatures
+                )
+                yield (*result, seconds) if timed else result
+                next_index += 1
+        finished = True
+    finally:
+        if finished:
+            for _ in procs:
+                tasks.put(None)
+            for proc in procs:
+                proc.join()
+        else:
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+                proc.join()
+            # Unsent batches may still be buffered; do not block on flushing them
+            tasks.cancel_join_thread()
+        tasks.close()
+        for ring in rings:
+            ring.close()
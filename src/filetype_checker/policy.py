@@ -0,0 +1,207 @@
+# Mismatch policies: rules loaded from a JSON file and checked against every success item
+# Rules are compiled into a path-prefix trie whose nodes map (file type, extension) keys
+# straight to the rules that apply, so a check costs a few dict lookups per path component
+
+import json
+import os
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from filetype_checker.error import PolicyError
+
+# Each rule sets exactly one of these checks
+CHECKS = ("deny", "allow_types", "max_size", "mismatch")
+_RULE_KEYS = {"id", "prefix", "types", "extensions", "message", *CHECKS}
+
+
+@dataclass(frozen=True, slots=True)
+class PolicyRule:
+    """One compiled policy rule."""
+
+    index: int
+    id: str
+    check: str
+    prefix: Optional[str] = None
+    types: Optional[FrozenSet[str]] = None
+    extensions: Optional[FrozenSet[str]] = None
+    allowed_types: Optional[FrozenSet[str]] = None
+    max_size: Optional[int] = None
+    message: Optional[str] = None
+
+    # Return the violation message for an item in scope, or None if it passes
+    def violation(self, item: dict) -> Optional[str]:
+        check = self.check
+        if check == "deny":
+            failed = True
+        elif check == "allow_types":
+            failed = item["file_type"] not in self.allowed_types
+        elif check == "max_size":
+            failed = item["size_bytes"] > self.max_size
+        else:
+            failed = item.get("mismatch") is True
+        if not failed:
+            return None
+        return self.message or self._default_message(item)
+
+    def _default_message(self, item: dict) -> str:
+        if self.check == "allow_types":
+            where = f" under {self.prefix}" if self.prefix else ""
+            return f"{item['file_type']} is not allowed{where}"
+        if self.check == "max_size":
+            return f"{item['file_type']} of {item['size_bytes']} bytes exceeds {self.max_size}"
+        if self.check == "mismatch":
+            return f"Extension {item.get('ext')!r} does not match {item['file_type']}"
+        return f"{item['file_type']} with extension {item.get('ext')!r} is denied"
+
+
+class _Node:
+    __slots__ = ("children", "rules")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        # (file type or None, extension or None) -> rules whose scope is exactly that key
+        self.rules: dict[tuple, list[PolicyRule]] = {}
+
+
+def _components(path: str) -> list[str]:
+    return [part for part in path.split(os.sep) if part and part != "."]
+
+
+class Policy:
+    """Compiled policy; ``evaluate`` adds ``violations`` to a success item."""
+
+    def __init__(self, rules: list[PolicyRule], cwd: Optional[str] = None) -> None:
+        self.rules = tuple(rules)
+        self.hits = [0] * len(self.rules)
+        self._cwd = cwd or os.getcwd()
+        self._root = _Node()
+        for rule in self.rules:
+            node = self._root
+            if rule.prefix is not None:
+                for part in _components(rule.prefix):
+                    node = node.children.setdefault(part, _Node())
+            for file_type in rule.types or (None,):
+                for ext in rule.extensions or (None,):
+                    node.rules.setdefault((file_type, ext), []).append(rule)
+
+    def _nodes(self, path: str):
+        node = self._root
+        yield node
+        if not node.children:
+            return
+        # Normalized as prefixes are, so "uploads/../secret" is not under "uploads"
+        full = os.path.normpath(os.path.join(self._cwd, path))
+        for part in _components(full):
+            node = node.children.get(part)
+            if node is None:
+                return
+            yield node
+
+    def evaluate(self, item: dict) -> list[dict]:
+        """Check a success item, record rule hits and set ``item["violations"]``."""
+        file_type = item["file_type"]
+        ext = item.get("ext") or None
+        if ext is None:
+            keys = ((file_type, None), (None, None))
+        else:
+            keys = ((file_type, ext), (file_type, None), (None, ext), (None, None))
+        hits = []
+        for node in self._nodes(item["path"]):
+            rules_by_key = node.rules
+            if not rules_by_key:
+                continue
+            for key in keys:
+                for rule in rules_by_key.get(key, ()):
+                    message = rule.violation(item)
+                    if message is not None:
+                        self.hits[rule.index] += 1
+                        hits.append((rule.index, rule.id, message))
+        # Report in policy file order, whichever trie node a rule hangs from
+        hits.sort()
+        violations = [{"rule": rule_id, "message": message} for _, rule_id, message in hits]
+        item["violations"] = violations
+        return violations
+
+    def hit_counts(self) -> dict[str, int]:
+        """Violations per rule id, for rules that fired at least once."""
+        return {rule.id: n for rule, n in zip(self.rules, self.hits, strict=True) if n}
+
+
+def _string_set(path: str, rule_id: str, key: str, value, lower: bool = False) -> FrozenSet[str]:
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) for v in value):
+        raise PolicyError(path, f"Rule {rule_id!r}: {key} must be a non-empty list of strings")
+    if lower:
+        return frozenset(v.lower() if v.startswith(".") else f".{v.lower()}" for v in value)
+    return frozenset(value)
+
+
+def compile_rule(path: str, index: int, spec) -> PolicyRule:
+    """Validate one rule object from a policy file."""
+    if not isinstance(spec, dict):
+        raise PolicyError(path, f"Rule {index} must be an object")
+    rule_id = spec.get("id")
+    if not isinstance(rule_id, str) or not rule_id:
+        raise PolicyError(path, f"Rule {index} needs a non-empty string id")
+    unknown = set(spec) - _RULE_KEYS
+    if unknown:
+        raise PolicyError(path, f"Rule {rule_id!r}: unknown keys {sorted(unknown)}")
+    checks = [check for check in CHECKS if check in spec]
+    if len(checks) != 1:
+        raise PolicyError(path, f"Rule {rule_id!r} must set exactly one of {', '.join(CHECKS)}")
+    check = checks[0]
+
+    prefix = spec.get("prefix")
+    if prefix is not None:
+        if not isinstance(prefix, str) or not prefix:
+            raise PolicyError(path, f"Rule {rule_id!r}: prefix must be a non-empty string")
+        prefix = os.path.abspath(prefix)
+    message = spec.get("message")
+    if message is not None and not isinstance(message, str):
+        raise PolicyError(path, f"Rule {rule_id!r}: message must be a string")
+
+    fields = {}
+    value = spec[check]
+    if check in ("deny", "mismatch"):
+        if value is not True:
+            raise PolicyError(path, f"Rule {rule_id!r}: {check} must be true")
+    elif check == "allow_types":
+        fields["allowed_types"] = _string_set(path, rule_id, check, value)
+    elif isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise PolicyError(path, f"Rule {rule_id!r}: max_size must be a non-negative integer")
+    else:
+        fields["max_size"] = value
+
+    return PolicyRule(
+        index=index,
+        id=rule_id,
+        check=check,
+        prefix=prefix,
+        types=_string_set(path, rule_id, "types", spec["types"]) if "types" in spec else None,
+        extensions=(
+            _string_set(path, rule_id, "extensions", spec["extensions"], lower=True)
+            if "extensions" in spec
+            else None
+        ),
+        message=message,
+        **fields,
+    )
+
+
+def load_policy(path: str) -> Policy:
+    """Load and compile a JSON policy file of the form ``{"rules": [...]}``."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+    except OSError as e:
+        raise PolicyError(path, f"Cannot read policy file: {e}") from e
+    except ValueError as e:
+        raise PolicyError(path, f"Invalid policy JSON: {e}") from e
+
+    if not isinstance(doc, dict) or not isinstance(doc.get("rules"), list):
+        raise PolicyError(path, 'Policy file must be an object with a "rules" list')
+    rules = [compile_rule(path, i, spec) for i, spec in enumerate(doc["rules"])]
+    ids = [rule.id for rule in rules]
+    if len(set(ids)) != len(ids):
+        duplicate = next(rule_id for rule_id in ids if ids.count(rule_id) > 1)
+        raise PolicyError(path, f"Duplicate rule id {duplicate!r}")
+    return Policy(rules)
@@ -1,4 +1,38 @@
 import json
+import threading
+import time
+from typing import Optional
+
+from filetype_checker.error import ErrorRecord, FtcheckError, error_code
+from filetype_checker.extensions import check_extension
+
+
+def problem_item(problem: FtcheckError, default_path: Optional[str] = None) -> dict:
+    """Build the error item for a problem found while expanding paths."""
+    path = (problem.details or {}).get("path") or default_path or "<unknown>"
+
+    payload = {
+        "ok": False,
+        "path": path,
+        "error": {
+            "code": problem.code,
+            "message": str(problem),
+        },
+    }
+    if problem.details is not None:
+        payload["error"]["details"] = problem.details
+
+    return payload
+
+
+def report_item(file_report: dict, rule) -> dict:
+    """Add the extension check (``ext``, ``mismatch``) to a success report."""
+    ext, mismatch = check_extension(
+        file_report["path"], rule.extensions if rule is not None else None
+    )
+    file_report["ext"] = ext
+    file_report["mismatch"] = mismatch
+    return file_report
 
 
 def format_human_success(report: dict) -> str:
@@ -19,6 +53,10 @@ def format_human_success(report: dict) -> str:
     if report.get("mismatch"):
         base += f" (extension mismatch: {report.get('ext')})"
 
+    if report.get("violations"):
+        rules = ", ".join(v["rule"] for v in report["violations"])
+        base += f" [policy violation: {rules}]"
+
     return base
 
 
@@ -38,6 +76,189 @@ def format_human_error(path: str | None, code: str | None, message: str) -> str:
     return " ".join(parts)
 
 
+# ErrorRecords are turned into error item dicts only here, at output time
+def _json_default(obj):
+    if isinstance(obj, ErrorRecord):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 def format_json(obj: dict) -> str:
-    """Convert a dict into JSON text."""
-    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    """Convert a dict (or an ``ErrorRecord``) into JSON text."""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+# One line of `ftcheck diff` output: "+ path  type", "- path  type" or "~ path  field: a -> b"
+def format_human_change(change: dict) -> str:
+    kind = change["change"]
+    if kind != "changed":
+        what = change.get("file_type") or f"error {change.get('error')}"
+        return f"{'+' if kind == 'added' else '-'} {change['path']}  {what}"
+    fields = ", ".join(
+        f"{field}: {value[0]} -> {value[1]}"
+        for field, value in change.items()
+        if field not in ("change", "path")
+    )
+    return f"~ {change['path']}  {fields}"
+
+
+# Fixed --tsv columns; errors fill the last two and leave the detection columns empty
+TSV_COLUMNS = (
+    "path",
+    "ok",
+    "file_type",
+    "size_bytes",
+    "matched",
+    "offset",
+    "signature",
+    "ext",
+    "mismatch",
+    "error_code",
+    "error_message",
+)
+TSV_HEADER = "\t".join(TSV_COLUMNS) + "\n"
+
+# Backslash escapes keep every record on one line with exactly one tab per column boundary
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _tsv_escape(value: str) -> str:
+    # Plain values, the common case, skip the slower translate call
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        return value.translate(_TSV_ESCAPES)
+    return value
+
+
+def format_tsv(report: dict) -> str:
+    """Convert a success or error item into one TSV line (with its newline)."""
+    path = _tsv_escape(report["path"])
+    if not report["ok"]:
+        error = report["error"]
+        message = _tsv_escape(error["message"])
+        return f"{path}\t0\t\t\t\t\t\t\t\t{error['code']}\t{message}\n"
+
+    magic = report["magic"]
+    offset = magic["offset"]
+    return (
+        f"{path}\t1\t{report['file_type']}\t{report['size_bytes']}\t"
+        f"{1 if magic['matched'] else 0}\t{'' if offset is None else offset}\t"
+        f"{magic['signature'] or ''}\t{_tsv_escape(report.get('ext', ''))}\t"
+        f"{1 if report.get('mismatch') else 0}\t\t\n"
+    )
+
+
+class ErrorGroups:
+    """Count error items by error code for --collapse-errors, keeping the first few paths."""
+
+    def __init__(self, examples: int = 3) -> None:
+        self.examples = examples
+        # code -> [count, first paths]
+        self._groups: dict[str, list] = {}
+
+    def add(self, item) -> None:
+        code = error_code(item)
+        group = self._groups.get(code)
+        if group is None:
+            self._groups[code] = [1, [item["path"]]]
+            return
+        group[0] += 1
+        if len(group[1]) < self.examples:
+            group[1].append(item["path"])
+
+    def summary(self) -> list[dict]:
+        """Groups from most to least frequent, as ``{"code", "count", "examples"}``."""
+        groups = sorted(self._groups.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [
+            {"code": code, "count": count, "examples": list(paths)}
+            for code, (count, paths) in groups
+        ]
+
+    def format_human(self) -> list[str]:
+        """One ``format_human_error`` line per group."""
+        lines = []
+        for group in self.summary():
+            noun = "error" if group["count"] == 1 else "errors"
+            more = ", ..." if group["count"] > len(group["examples"]) else ""
+            message = f"{group['count']} {noun} ({', '.join(group['examples'])}{more})"
+            lines.append(format_human_error(None, group["code"], message))
+        return lines
+
+
+class LineWriter:
+    """Collect output text and write it to ``stream`` in large chunks.
+
+    Text is flushed once ``buffer_size`` characters are pending or
+    ``flush_interval`` seconds have passed since the last flush; an interval of
+    0 flushes every write. The interval is checked on each write and by a
+    timer thread, so a line is not held back while the scan is stuck on a slow
+    file. A write error on the timer thread is raised by the next call.
+    ``close`` stops the timer and flushes, but leaves ``stream`` open.
+    """
+
+    def __init__(
+        self,
+        stream,
+        buffer_size: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        clock=time.monotonic,
+    ) -> None:
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._parts: list[str] = []
+        self._pending = 0
+        self._deadline = clock() + flush_interval
+        self._lock = threading.Lock()
+        self._error: Optional[OSError] = None
+        self._closed = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._timer = threading.Thread(
+                target=self._flush_on_deadline, daemon=True, name="ftcheck-flush"
+            )
+            self._timer.start()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._parts.append(text)
+            self._pending += len(text)
+            if self._pending >= self.buffer_size or self._clock() >= self._deadline:
+                self._flush()
+        return len(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+
+    def _flush(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if self._parts:
+            data = "".join(self._parts)
+            self._parts = []
+            self._pending = 0
+            self.stream.write(data)
+        self.stream.flush()
+        self._deadline = self._clock() + self.flush_interval
+
+    # Text pending at the last check is due by the next deadline, so sleeping until then is enough
+    def _flush_on_deadline(self) -> None:
+        wait = self.flush_interval
+        while not self._closed.wait(wait):
+            with self._lock:
+                if self._parts and self._clock() >= self._deadline:
+                    try:
+                        self._flush()
+                    except OSError as e:
+                        self._error = e
+                        return
+                remaining = self._deadline - self._clock()
+                wait = remaining if self._parts and remaining > 0 else self.flush_interval
@@ -0,0 +1,157 @@
+# Sample files during traversal and estimate per-type proportions with confidence intervals
+# --sample RATE stratifies by directory (merging small ones); --sample-count N keeps a uniform
+# reservoir sample
+
+import math
+import random
+from collections import Counter
+from typing import Callable, Iterable, Iterator, Union
+
+from filetype_checker import scanner
+from filetype_checker.error import FtcheckError
+
+# Label used for sampled files that could not be read
+ERROR_LABEL = "<error>"
+
+# Confidence level of the reported intervals and its two-sided normal quantile
+CONFIDENCE = 0.95
+DEFAULT_Z = 1.96
+
+# Fewest files sampled from a stratum, so that every stratum has a variance estimate
+MIN_STRATUM_SAMPLE = 2
+
+
+# Files in walk order, one sorted list per listing, with problems yielded as they are found
+def iter_directories(paths: list[str], recursive: bool) -> Iterator[Union[list[str], FtcheckError]]:
+    for path in dict.fromkeys(paths):
+        for files, problems in scanner.iter_scan_path(path, recursive):
+            yield from problems
+            if files:
+                yield sorted(file for file, _ in files)
+
+
+# Merge consecutive directories into strata that each expect MIN_STRATUM_SAMPLE files at rate
+def iter_strata(directories: Iterable, rate: float) -> Iterator[Union[list[str], FtcheckError]]:
+    group: list[str] = []
+
+    for entry in directories:
+        if isinstance(entry, FtcheckError):
+            yield entry
+            continue
+        group.extend(entry)
+        if rate * len(group) >= MIN_STRATUM_SAMPLE:
+            yield group
+            group = []
+
+    if group:
+        yield group
+
+
+class StratifiedSampler:
+    """Proportional allocation of ``rate`` across strata seen one at a time.
+
+    Sizes are rounded systematically from a random start, so each stratum's
+    expected size is exactly ``rate`` times its population and the total stays
+    within one file of ``rate`` times the files seen. Strata from
+    ``iter_strata`` expect at least ``MIN_STRATUM_SAMPLE`` files; a short last
+    stratum is topped up to that, so only a one-file census has a single sample.
+    """
+
+    def __init__(self, rate: float, rng: random.Random) -> None:
+        self.rate = rate
+        self.rng = rng
+        self._start = rng.random()
+        self._population = 0
+        self._allocated = 0
+
+    # Pick this stratum's files at random, keeping their traversal order
+    def sample(self, group: list[str]) -> list[str]:
+        self._population += len(group)
+        allocated = math.floor(self.rate * self._population + self._start)
+        size = allocated - self._allocated
+        self._allocated = allocated
+        size = min(len(group), max(size, MIN_STRATUM_SAMPLE))
+        picked = sorted(self.rng.sample(range(len(group)), size))
+        return [group[i] for i in picked]
+
+
+# Algorithm R: a uniform sample of k paths from a stream of unknown length
+def reservoir_sample(
+    entries: Iterable,
+    k: int,
+    rng: random.Random,
+    on_problem: Callable[[FtcheckError], None],
+) -> tuple[int, list[str]]:
+    reservoir: list[str] = []
+    population = 0
+
+    for entry in entries:
+        if isinstance(entry, FtcheckError):
+            on_problem(entry)
+            continue
+        population += 1
+        if len(reservoir) < k:
+            reservoir.append(entry)
+        else:
+            j = rng.randrange(population)
+            if j < k:
+                reservoir[j] = entry
+
+    return population, sorted(reservoir)
+
+
+class ProportionEstimator:
+    """Stratified estimator of the share of each file type in the scanned population.
+
+    A reservoir sample is the single-stratum case. A stratum with one sampled
+    file has no variance estimate unless it is a census (population 1); any
+    other such stratum widens every interval to [0, 1].
+    """
+
+    def __init__(self) -> None:
+        self.population = 0
+        self.sampled = 0
+        self._weighted: Counter = Counter()
+        self._variance: Counter = Counter()
+        self.variance_known = True
+
+    def add_stratum(self, population: int, labels: list[str]) -> None:
+        sampled = len(labels)
+        if population == 0 or sampled == 0:
+            return
+        self.population += population
+        self.sampled += sampled
+
+        fpc = 1 - sampled / population
+        for label, count in Counter(labels).items():
+            p = count / sampled
+            self._weighted[label] += population * p
+            if sampled > 1:
+                self._variance[label] += population**2 * fpc * p * (1 - p) / (sampled - 1)
+            elif population > 1:
+                self.variance_known = False
+
+    def estimates(self, z: float = DEFAULT_Z) -> dict:
+        out = {}
+        total = self.population
+        for label, weighted in sorted(self._weighted.items(), key=lambda kv: (-kv[1], kv[0])):
+            p = weighted / total
+            half_width = 1.0
+            if self.variance_known:
+                half_width = z * math.sqrt(self._variance[label]) / total
+            out[label] = {
+                "proportion": round(p, 6),
+                "ci_low": round(max(0.0, p - half_width), 6),
+                "ci_high": round(min(1.0, p + half_width), 6),
+                "estimated_files": round(weighted),
+            }
+        return out
+
+    def report(self, method: str) -> dict:
+        return {
+            "method": method,
+            "population": self.population,
+            "sampled": self.sampled,
+            "confidence": CONFIDENCE,
+            "estimates": self.estimates(),
+        }
@@ -0,0 +1,263 @@
+# Comparison of two scan outputs for `ftcheck diff OLD NEW`
+# Both outputs are streamed (NDJSON lines or a --json document) and reduced to the compared
+# fields of each path, put in path order with extsort's bounded-memory sorter and merge-joined
+
+import json
+import re
+import struct
+from typing import Iterable, Iterator, Optional
+
+from filetype_checker import extsort
+from filetype_checker.error import ScanDiffError
+
+DEFAULT_MEMORY_LIMIT = 256 << 20
+# Fields compared per path; error items carry only their error code
+FIELDS = ("file_type", "size_bytes", "mismatch", "error")
+CHANGE_COUNTS = (
+    "added",
+    "removed",
+    "changed",
+    "unchanged",
+    "type_changes",
+    "size_changes",
+    "new_mismatches",
+)
+
+# Spilled entry: path length, label (file type or error code) length, size, flag;
+# flag is the index of mismatch in _MISMATCH_VALUES or _ERROR for error items
+_ENTRY = struct.Struct("<IHqb")
+_MISMATCH_VALUES = (False, True, None)
+_MISMATCH_FLAGS = {value: i for i, value in enumerate(_MISMATCH_VALUES)}
+_ERROR = -1
+
+# Characters read from a --json document at a time
+_CHUNK = 1 << 20
+# Largest single value a --json document may hold before it is treated as corrupt
+_MAX_VALUE = 64 << 20
+# A --json document starts {"ok":...,"summary" (NDJSON items start {"ok":...,"path")
+_DOCUMENT_START = re.compile(r'\s*\{\s*"ok"\s*:\s*(?:true|false)\s*,\s*"(?:summary|results)"')
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _DocumentReader:
+    """Stream the ``results`` array of a JSON document without loading the document."""
+
+    def __init__(self, path: str, f) -> None:
+        self.path = path
+        self._f = f
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self._f.read(_CHUNK)
+        if not chunk:
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos : self._pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            found = repr(char) if char else "end of file"
+            raise ScanDiffError(self.path, f"{self.path}: expected {chars!r}, found {found}")
+        self._pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # The value may continue in the next chunk
+                if len(self._buf) - self._pos < _MAX_VALUE and self._fill():
+                    continue
+                raise ScanDiffError(self.path, f"{self.path}: invalid JSON: {e}") from e
+            # A number that ends the buffer may also continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _results(self) -> Iterator:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(",]") == "]":
+                return
+
+    def __iter__(self) -> Iterator:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "results":
+                yield from self._results()
+            else:
+                # Only the small summary and ok values are skipped this way
+                self._value()
+            if self._expect(",}") == "}":
+                return
+
+
+def _iter_lines(path: str, f) -> Iterator:
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ScanDiffError(path, f"{path}:{number}: invalid JSON: {e}") from e
+
+
+def iter_items(path: str) -> Iterator[dict]:
+    """Yield the result items of an ``ftcheck --ndjson`` or ``--json`` output file."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            is_document = _DOCUMENT_START.match(f.read(256)) is not None
+            f.seek(0)
+            yield from _DocumentReader(path, f) if is_document else _iter_lines(path, f)
+    except (OSError, UnicodeDecodeError) as e:
+        raise ScanDiffError(path, f"Cannot read scan output {path}: {e}") from e
+
+
+# The compared fields of one item, in FIELDS order; TypeError if the fields are malformed
+def item_state(item: dict) -> tuple:
+    if not isinstance(item["path"], str):
+        raise TypeError("path")
+    if item["ok"]:
+        file_type, size, mismatch = item["file_type"], item["size_bytes"], item.get("mismatch")
+        valid = isinstance(file_type, str) and type(size) is int and mismatch in _MISMATCH_FLAGS
+        if not valid:
+            raise TypeError("success item")
+        return file_type, size, mismatch, None
+    code = item["error"]["code"]
+    if not isinstance(code, str):
+        raise TypeError("error code")
+    return None, None, None, code
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _write_entry(f, path: str, state: tuple) -> None:
+    file_type, size, mismatch, code = state
+    encoded = _encode(path)
+    if code is not None:
+        label = _encode(code)
+        f.write(_ENTRY.pack(len(encoded), len(label), -1, _ERROR) + encoded + label)
+        return
+    label = _encode(file_type)
+    flag = _MISMATCH_FLAGS[mismatch]
+    f.write(_ENTRY.pack(len(encoded), len(label), size, flag) + encoded + label)
+
+
+def _read_entries(f) -> Iterator[tuple]:
+    f.seek(0)
+    while True:
+        header = f.read(_ENTRY.size)
+        if not header:
+            return
+        path_length, label_length, size, flag = _ENTRY.unpack(header)
+        data = f.read(path_length + label_length)
+        path = data[:path_length].decode("utf-8", "surrogatepass")
+        label = data[path_length:].decode("utf-8", "surrogatepass")
+        if flag == _ERROR:
+            yield path, (None, None, None, label)
+        else:
+            yield path, (label, size, _MISMATCH_VALUES[flag], None)
+
+
+def sorted_entries(
+    path: str, memory_limit: int = DEFAULT_MEMORY_LIMIT, tmpdir: Optional[str] = None
+) -> extsort.ExternalSorter:
+    """Read a scan output into a sorter of ``(path, state)`` entries.
+
+    Iterate the returned sorter for the entries in path order, then close it.
+    Entries beyond ``memory_limit`` bytes are spilled to temporary files.
+    """
+    sorter = extsort.ExternalSorter(memory_limit, tmpdir, _write_entry, _read_entries)
+    try:
+        for number, item in enumerate(iter_items(path), 1):
+            try:
+                sorter.add(item["path"], item_state(item))
+            except (KeyError, TypeError):
+                raise ScanDiffError(path, f"{path}: item {number} is not a scan result") from None
+    except BaseException:
+        sorter.close()
+        raise
+    return sorter
+
+
+def new_counts() -> dict:
+    return dict.fromkeys(CHANGE_COUNTS, 0)
+
+
+def _describe(change: str, path: str, state: tuple) -> dict:
+    record = {"change": change, "path": path}
+    if state[3] is not None:
+        record["error"] = state[3]
+    else:
+        record.update(zip(FIELDS[:3], state[:3], strict=True))
+    return record
+
+
+def diff_entries(
+    old: Iterable[tuple], new: Iterable[tuple], counts: Optional[dict] = None
+) -> Iterator[dict]:
+    """Merge-join two path-sorted ``(path, state)`` streams and yield one record per change.
+
+    Records have ``change`` set to ``added``, ``removed`` or ``changed``; a
+    changed record maps each differing field to ``[old, new]``. ``counts``
+    (from ``new_counts``) is updated as records are produced.
+    """
+    counts = counts if counts is not None else new_counts()
+    old_entries = iter(old)
+    new_entries = iter(new)
+    old_entry = next(old_entries, None)
+    new_entry = next(new_entries, None)
+
+    while old_entry is not None or new_entry is not None:
+        if new_entry is None or (old_entry is not None and old_entry[0] < new_entry[0]):
+            counts["removed"] += 1
+            yield _describe("removed", *old_entry)
+            old_entry = next(old_entries, None)
+            continue
+        if old_entry is None or new_entry[0] < old_entry[0]:
+            counts["added"] += 1
+            if new_entry[1][2] is True:
+                counts["new_mismatches"] += 1
+            yield _describe("added", *new_entry)
+            new_entry = next(new_entries, None)
+            continue
+
+        path, before = old_entry
+        after = new_entry[1]
+        if before == after:
+            counts["unchanged"] += 1
+        else:
+            counts["changed"] += 1
+            record = {"change": "changed", "path": path}
+            for field, a, b in zip(FIELDS, before, after, strict=True):
+                if a != b:
+                    record[field] = [a, b]
+            counts["type_changes"] += "file_type" in record
+            counts["size_changes"] += "size_bytes" in record
+            counts["new_mismatches"] += after[2] is True and before[2] is not True
+            yield record
+        old_entry = next(old_entries, None)
+        new_entry = next(new_entries, None)
@@ -3,7 +3,11 @@
 # Handle recursion flag for directories
 # Collect "problems" without crashing
 
+import heapq
 import os
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from operator import itemgetter
 
 from filetype_checker.error import (
     FtcheckError,
@@ -12,92 +16,471 @@ from filetype_checker.error import (
     PermissionDeniedError,
 )
 
+# Identity of a file's data: (st_dev, st_ino); hard links and followed symlinks share it
+FileId = tuple[int, int]
 
-def expand_path(path: str, recursive: bool) -> tuple[list[str], list[FtcheckError]]:
-    file_paths = []
-    problems = []
 
-    def _on_walk_error(e: OSError) -> None:
-        code = "EACCES" if isinstance(e, PermissionError) else "EIO"
-        problems.append(
-            FtcheckError(
-                code=code,
-                message=f"Error accessing path: {path}",
-                details={"path": path, "os_error": str(e)},
-            )
-        )
+def _access_error(path: str, e: OSError) -> FtcheckError:
+    if isinstance(e, PermissionError):
+        return PermissionDeniedError(path, message=f"Permission denied: {path}")
+    return FtcheckError(
+        code="EIO",
+        message=f"Error accessing path: {path}",
+        details={"path": path, "os_error": str(e)},
+    )
+
+
+def scan_path(
+    path: str,
+    recursive: bool,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    threads: int = 1,
+) -> tuple[list[tuple[str, FileId | None]], list[FtcheckError]]:
+    """Like ``expand_path`` but returns ``(path, file_id)`` pairs.
 
+    By default directory symlinks are never entered; recursive scans list every
+    non-directory entry (as ``os.walk`` does) and non-recursive scans list regular
+    files only. With ``follow_symlinks`` symlinked files and directories are
+    followed and broken links are reported. A directory reached through several
+    links is listed under each of them; only a directory that is its own
+    ancestor is skipped, which breaks cycles. ``one_file_system`` stays on the
+    device of ``path``. With ``threads`` > 1 directories are listed
+    concurrently; the files and problems found are the same but files come back
+    in no particular order. Problems are sorted by path in both cases.
+    """
+    files: list[tuple[str, FileId | None]] = []
+    problems: list[FtcheckError] = []
+    for dir_files, dir_problems in iter_scan_path(
+        path, recursive, follow_symlinks, one_file_system, threads
+    ):
+        files.extend(dir_files)
+        problems.extend(dir_problems)
+
+    problems.sort(key=lambda p: (p.details or {}).get("path", ""))
+    return files, problems
+
+
+def iter_scan_path(
+    path: str,
+    recursive: bool,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    threads: int = 1,
+):
+    """Yield ``(files, problems)`` for each directory listed under ``path``.
+
+    The generator form of ``scan_path``: only the listing in hand and the
+    directories still to be listed are kept in memory. Unless ``threads`` > 1,
+    the files come out in sorted path order across the whole walk; a
+    directory's files may be split over several listings to allow this.
+    """
     try:
-        os.lstat(path)
+        root_stat = os.lstat(path)
     except FileNotFoundError:
-        problems.append(PathNotFoundError(path))
-        return file_paths, problems
+        yield [], [PathNotFoundError(path)]
+        return
     except PermissionError:
-        problems.append(PermissionDeniedError(path))
-        return file_paths, problems
+        yield [], [PermissionDeniedError(path)]
+        return
     except OSError as e:
-        problems.append(
+        yield [], [
             FtcheckError(
                 code="EIO",
                 message=f"Error accessing path: {path}",
                 details={"path": path, "os_error": str(e)},
             )
-        )
-        return file_paths, problems
+        ]
+        return
+
     if os.path.isfile(path):
-        file_paths.append(path)
-        return file_paths, problems
-    elif os.path.isdir(path):
-        try:
-            if recursive:
-                for root, _, files in os.walk(path, onerror=_on_walk_error):
-                    for name in files:
-                        file_paths.append(os.path.join(root, name))
-            else:
-                with os.scandir(path) as entries:
-                    for entry in entries:
-                        try:
-                            if entry.is_file(follow_symlinks=False):
-                                file_paths.append(entry.path)
-                        except PermissionError:
-                            problems.append(
-                                PermissionDeniedError(
-                                    entry.path,
-                                    message=f"Permission denied: {entry.path}",
-                                )
-                            )
-                        except OSError as e:
-                            problems.append(
-                                FtcheckError(
-                                    code="EIO",
-                                    message=f"Error accessing path: {entry.path}",
-                                    details={"path": entry.path, "os_error": str(e)},
-                                )
-                            )
-        except PermissionError:
-            problems.append(PermissionDeniedError(path, message=f"Permission denied: {path}"))
-        except OSError as e:
+        yield [(path, _file_id(path, root_stat))], []
+        return
+    if not os.path.isdir(path):
+        yield [], [NotARegularFileError(path)]
+        return
+
+    try:
+        top = os.stat(path)
+    except OSError as e:
+        yield [], [_access_error(path, e)]
+        return
+
+    options = (recursive, follow_symlinks, top.st_dev if one_file_system else None)
+    root = ((top.st_dev, top.st_ino), None)
+    if threads > 1 and recursive:
+        yield from _walk_threaded(path, top.st_dev, root, options, threads)
+        return
+
+    # Directories still to list, and 1-tuples holding the files of a listed directory that
+    # sort after one of its subdirectories, so files come out in sorted path order
+    stack: list = [(path, top.st_dev, root)]
+    while stack:
+        entry = stack.pop()
+        if len(entry) == 1:
+            yield entry[0], []
+            continue
+        dir_path, dir_dev, chain = entry
+        files: list = []
+        problems: list = []
+        subdirs = _list_dir(dir_path, dir_dev, options, files, problems)
+        files.sort(key=itemgetter(0))
+        # Walk subdirectories in the order of their contents' paths ("d/m/" < "d/m-x/"), so
+        # the walk order does not depend on scandir's
+        subdirs.sort(key=lambda sub: sub[0] + os.sep)
+        # Split the files around each subdirectory: files[:end] sort before its contents
+        chunks: list = []
+        start = 0
+        for sub in _descend(subdirs, chain):
+            end = bisect_right(files, sub[0] + os.sep, lo=start, key=itemgetter(0))
+            chunks += [(files[start:end],), sub]
+            start = end
+        chunks.append((files[start:],))
+        stack.extend(chunk for chunk in reversed(chunks[1:]) if len(chunk) > 1 or chunk[0])
+        yield chunks[0][0], problems
+
+
+# Ancestor chains are linked (key, parent) pairs, so each queued directory costs one tuple
+def _on_chain(key: FileId, chain: tuple | None) -> bool:
+    while chain is not None:
+        if chain[0] == key:
+            return True
+        chain = chain[1]
+    return False
+
+
+# Subdirectories to list next, skipping any that is its own ancestor (a link cycle)
+def _descend(subdirs: list, chain: tuple) -> list:
+    return [
+        (sub_path, sub_dev, (key, chain))
+        for sub_path, sub_dev, key in subdirs
+        if not _on_chain(key, chain)
+    ]
+
+
+# List one directory into files/problems and return the subdirectories to descend into
+def _list_dir(dir_path: str, dir_dev: int, options: tuple, files: list, problems: list) -> list:
+    recursive, follow_symlinks, only_dev = options
+    subdirs: list[tuple[str, int, FileId]] = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                try:
+                    _scan_entry(
+                        entry,
+                        dir_dev,
+                        recursive,
+                        follow_symlinks,
+                        files,
+                        problems,
+                        subdirs if recursive else None,
+                        only_dev,
+                    )
+                except OSError as e:
+                    problems.append(_access_error(entry.path, e))
+    except OSError as e:
+        problems.append(_access_error(dir_path, e))
+    return subdirs
+
+
+# List directories on a thread pool; each finished listing queues its new subdirectories,
+# so idle threads pick up work from wherever the tree is widest
+# Each directory carries its own ancestor chain, so what is listed never depends on timing
+def _walk_threaded(path: str, dev: int, root: tuple, options: tuple, threads: int):
+    def list_one(dir_path: str, dir_dev: int) -> tuple[list, list, list]:
+        files: list = []
+        problems: list = []
+        subdirs = _list_dir(dir_path, dir_dev, options, files, problems)
+        return files, problems, subdirs
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = {pool.submit(list_one, path, dev): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chain = pending.pop(future)
+                files, problems, subdirs = future.result()
+                for sub_path, sub_dev, sub_chain in _descend(subdirs, chain):
+                    pending[pool.submit(list_one, sub_path, sub_dev)] = sub_chain
+                yield files, problems
+
+
+# Follow a symlink so its id names the target; other files get their own inode
+def _file_id(path: str, lstat_result: os.stat_result) -> FileId | None:
+    if not os.path.islink(path):
+        return lstat_result.st_dev, lstat_result.st_ino
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _scan_entry(
+    entry: os.DirEntry,
+    dir_dev: int,
+    recursive: bool,
+    follow_symlinks: bool,
+    files: list,
+    problems: list,
+    subdirs: list | None,
+    only_dev: int | None,
+) -> None:
+    is_link = entry.is_symlink()
+
+    if is_link and not follow_symlinks:
+        # os.walk lists symlinks to files (and broken links) but never enters linked dirs
+        if recursive and not entry.is_dir():
+            try:
+                st = entry.stat()
+                files.append((entry.path, (st.st_dev, st.st_ino)))
+            except OSError:
+                files.append((entry.path, None))
+        return
+
+    if entry.is_dir():
+        if subdirs is None:
+            return
+        st = entry.stat() if is_link else entry.stat(follow_symlinks=False)
+        if only_dev is not None and st.st_dev != only_dev:
+            return
+        subdirs.append((entry.path, st.st_dev, (st.st_dev, st.st_ino)))
+        return
+
+    if is_link:
+        if entry.is_file():
+            st = entry.stat()
+            files.append((entry.path, (st.st_dev, st.st_ino)))
+        elif not os.path.exists(entry.path):
             problems.append(
-                FtcheckError(
-                    code="EIO",
-                    message=f"Error accessing path: {path}",
-                    details={"path": path, "os_error": str(e)},
-                )
+                PathNotFoundError(entry.path, message=f"Broken symlink: {entry.path}")
             )
-    else:
-        problems.append(NotARegularFileError(path))
+        return
+
+    if recursive or entry.is_file(follow_symlinks=False):
+        # Entries share their directory's device, so the id needs no stat call
+        files.append((entry.path, (dir_dev, entry.inode())))
 
-    return file_paths, problems
 
+def expand_path(
+    path: str,
+    recursive: bool,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    threads: int = 1,
+) -> tuple[list[str], list[FtcheckError]]:
+    files, problems = scan_path(path, recursive, follow_symlinks, one_file_system, threads)
+    return [file_path for file_path, _ in files], problems
 
-def expand_paths(paths: list[str], recursive: bool) -> tuple[list[str], list[FtcheckError]]:
-    all_file_paths = []
+
+# Scan every input, dropping repeated paths and sorting the result
+def scan_paths(
+    paths: list[str],
+    recursive: bool,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    threads: int = 1,
+) -> tuple[list[tuple[str, FileId | None]], list[FtcheckError]]:
+    all_files: dict[str, FileId | None] = {}
     all_problems = []
 
     for path in paths:
-        file_paths, problems = expand_path(path, recursive)
-        all_file_paths.extend(file_paths)
+        files, problems = scan_path(path, recursive, follow_symlinks, one_file_system, threads)
+        all_files.update(files)
         all_problems.extend(problems)
 
-    all_file_paths = sorted(set(all_file_paths))
-    return all_file_paths, all_problems
+    return sorted(all_files.items()), all_problems
+
+
+class PathList:
+    """Iterate paths read incrementally from a binary stream, e.g. ``find -print0`` output.
+
+    Paths are newline-separated, or NUL-terminated with ``null``; empty entries are
+    skipped. ``count`` is the number of paths yielded so far.
+    """
+
+    def __init__(self, stream, null: bool = False, chunk_size: int = 64 * 1024) -> None:
+        self.stream = stream
+        self.separator = b"\0" if null else b"\n"
+        self.chunk_size = chunk_size
+        self.count = 0
+
+    def __iter__(self):
+        separator = self.separator
+        pending = b""
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                break
+            *complete, pending = (pending + chunk).split(separator)
+            for raw in complete:
+                if raw:
+                    self.count += 1
+                    yield os.fsdecode(raw)
+        if pending:
+            self.count += 1
+            yield os.fsdecode(pending)
+
+
+def expand_paths(
+    paths: list[str],
+    recursive: bool,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    threads: int = 1,
+) -> tuple[list[str], list[FtcheckError]]:
+    files, problems = scan_paths(paths, recursive, follow_symlinks, one_file_system, threads)
+    return [file_path for file_path, _ in files], problems
+
+
+# Sort key that makes a depth-first walk emit paths in plain string order
+def _entry_key(name: str, is_dir: bool) -> str:
+    return name + os.sep if is_dir else name
+
+
+# Resumable depth-first traversal that only keeps the open directories in memory
+class TreeWalker:
+    """Yield file paths (and ``FtcheckError`` problems) for ``paths`` one at a time.
+
+    Files come in ``expand_paths`` order: sorted, and each path once even when
+    roots overlap. Each root is walked depth-first in sorted order and the walks
+    are merged, so only the chains of directories currently being visited are
+    kept. A problem is yielded where the path it concerns sorts. ``state()``
+    holds only the sort key of the last item yielded, and
+    ``TreeWalker(..., state=...)`` resumes after it.
+    """
+
+    def __init__(self, paths: list[str], recursive: bool, state: dict | None = None) -> None:
+        self.paths = list(dict.fromkeys(paths))
+        self.recursive = recursive
+        self._after = state["after"] if state is not None else None
+
+    def state(self) -> dict:
+        return {"after": self._after}
+
+    def __iter__(self):
+        after = self._after
+        walks = [self._walk_root(path, after) for path in self.paths]
+        previous = None
+        for key, item in heapq.merge(*walks, key=itemgetter(0)):
+            # Overlapping roots give the same key one after another
+            if key == previous:
+                continue
+            previous = key
+            if self._after is None or key > self._after:
+                self._after = key
+            yield item
+
+    # (sort key, item) pairs for one root, skipping keys up to and including after
+    def _walk_root(self, path: str, after: str | None):
+        problem = None
+        try:
+            os.lstat(path)
+        except FileNotFoundError:
+            problem = PathNotFoundError(path)
+        except PermissionError:
+            problem = PermissionDeniedError(path)
+        except OSError as e:
+            problem = FtcheckError(
+                code="EIO",
+                message=f"Error accessing path: {path}",
+                details={"path": path, "os_error": str(e)},
+            )
+
+        if problem is None and os.path.isdir(path):
+            prefix = os.path.join(path, "")
+            if after is None or after < prefix:
+                yield from self._walk_dir(path, prefix, None)
+            elif after != prefix and after.startswith(prefix):
+                yield from self._walk_dir(path, prefix, after[len(prefix) :])
+            return
+
+        if after is not None and path <= after:
+            return
+        if problem is not None:
+            yield path, problem
+        elif os.path.isfile(path):
+            yield path, path
+        else:
+            yield path, NotARegularFileError(path)
+
+    # Pairs for everything under a directory; rest is the key to resume after, relative to it
+    def _walk_dir(self, dir_path: str, prefix: str, rest: str | None):
+        frames: list[list] = []
+        # Reopen the chain of directories leading to the resume point
+        while True:
+            entries, problem = self._list_dir(dir_path)
+            if problem is not None:
+                yield prefix, problem
+                break
+            if rest is None:
+                frames.append([prefix, entries, 0])
+                break
+            name, sep, rest = rest.partition(os.sep)
+            key = name + sep
+            pos = bisect_right([e[0] for e in entries], key)
+            frames.append([prefix, entries, pos])
+            if not (sep and rest and pos and entries[pos - 1][0] == key):
+                break
+            dir_path = entries[pos - 1][1]
+            prefix += key
+
+        while frames:
+            frame = frames[-1]
+            prefix, entries, pos = frame
+            if pos >= len(entries):
+                frames.pop()
+                continue
+
+            key, item, is_dir = entries[pos]
+            frame[2] = pos + 1
+            if not is_dir:
+                yield prefix + key, item
+                continue
+
+            sub_entries, problem = self._list_dir(item)
+            if problem is not None:
+                yield prefix + key, problem
+            else:
+                frames.append([prefix + key, sub_entries, 0])
+
+    def _list_dir(self, dir_path: str) -> tuple[list, FtcheckError | None]:
+        entries = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    entries.append(self._classify(entry))
+        except PermissionError:
+            return [], PermissionDeniedError(dir_path, message=f"Permission denied: {dir_path}")
+        except OSError as e:
+            return [], FtcheckError(
+                code="EIO",
+                message=f"Error accessing path: {dir_path}",
+                details={"path": dir_path, "os_error": str(e)},
+            )
+
+        entries = [e for e in entries if e is not None]
+        entries.sort(key=lambda e: e[0])
+        return entries, None
+
+    # Mirror expand_path: os.walk semantics when recursive, regular files only otherwise
+    def _classify(self, entry: os.DirEntry) -> tuple | None:
+        try:
+            if self.recursive:
+                if entry.is_dir():
+                    if entry.is_symlink():
+                        return None
+                    return (_entry_key(entry.name, True), entry.path, True)
+                return (_entry_key(entry.name, False), entry.path, False)
+            if entry.is_file(follow_symlinks=False):
+                return (_entry_key(entry.name, False), entry.path, False)
+            return None
+        except PermissionError:
+            problem = PermissionDeniedError(entry.path, message=f"Permission denied: {entry.path}")
+        except OSError as e:
+            problem = FtcheckError(
+                code="EIO",
+                message=f"Error accessing path: {entry.path}",
+                details={"path": entry.path, "os_error": str(e)},
+            )
+        return (_entry_key(entry.name, False), problem, False)
@@ -0,0 +1,256 @@
+# Library scan sessions: state that repeated scans share instead of rebuilding on every call
+# A Session pins a signature set and keeps HeaderReaders (with their read buffers), a thread
+# pool, an optional result cache keyed by file identity and running counts between scans
+
+import os
+import stat
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Union
+
+from filetype_checker import detector, scanner
+from filetype_checker.error import ErrorRecord
+from filetype_checker.reporting import problem_item, report_item
+
+# Keys of Session.stats()
+STATS = ("files_scanned", "matched", "unknown", "text", "errors", "cache_hits")
+
+
+class Session:
+    """Scan paths repeatedly without paying setup costs on every call.
+
+    The session keeps its signature set (``signatures``, default the active
+    set), ``HeaderReader`` objects and their read buffers, a pool of
+    ``threads`` detection threads and, with ``cache_size`` > 0, the results of
+    up to that many files. Cached results are keyed by device and inode, and
+    reused while the size, mtime and signature version are unchanged. Hard
+    links therefore share one entry. ``scan`` may be called from several
+    threads at once. Assigning ``signatures`` affects scans started afterwards.
+    """
+
+    def __init__(
+        self,
+        recursive: bool = False,
+        follow_symlinks: bool = False,
+        one_file_system: bool = False,
+        classify_text: bool = False,
+        signatures: Optional[detector.SignatureSet] = None,
+        threads: int = 1,
+        walk_threads: int = 1,
+        cache_size: int = 0,
+    ) -> None:
+        if threads < 1 or walk_threads < 1:
+            raise ValueError("threads and walk_threads must be at least 1")
+        if cache_size < 0:
+            raise ValueError("cache_size must not be negative")
+        self.recursive = recursive
+        self.follow_symlinks = follow_symlinks
+        self.one_file_system = one_file_system
+        self.classify_text = classify_text
+        self.signatures = signatures or detector.current_signatures()
+        self.threads = threads
+        self.walk_threads = walk_threads
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # (st_dev, st_ino) -> ((size, mtime_ns, db_version), report, rule), least recent first
+        self._cache: OrderedDict = OrderedDict()
+        self._counts = dict.fromkeys(STATS, 0)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        # Every reader made, for close(); readers not lent to a scan are also in _idle, and
+        # readers lent to inline scans are in _lent until they come back
+        self._readers: list[detector.HeaderReader] = []
+        self._idle: list[detector.HeaderReader] = []
+        self._lent: set[detector.HeaderReader] = set()
+        self._closed = False
+
+    def scan(self, paths: Union[str, Iterable[str]]) -> Iterator[Union[dict, ErrorRecord]]:
+        """Yield an item for every file under ``paths`` (a path or an iterable of paths).
+
+        Success items match ``ftcheck --json`` results. Files that cannot be read
+        give an ``ErrorRecord``, and problems found while expanding paths give
+        error item dicts. Each path's files are yielded in sorted path order
+        (unless ``walk_threads`` > 1), after the problems of their directory.
+        Items are new dicts, but their ``magic`` and ``text`` sections are shared
+        with the signature rules and the cache; treat those as read-only.
+        """
+        if self._closed:
+            raise ValueError("Session is closed")
+        if isinstance(paths, str):
+            paths = [paths]
+        if self.threads == 1:
+            return self._scan_inline(paths, self.signatures)
+        return self._scan_pooled(paths, self.signatures)
+
+    def stats(self) -> dict:
+        """Counts over every scan so far, keyed by ``STATS``."""
+        with self._lock:
+            return dict(self._counts)
+
+    def close(self) -> None:
+        """Stop the thread pool and close the readers; further ``scan`` calls fail.
+
+        Readers still lent to inline scans are closed when those scans finish.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pool, self._pool = self._pool, None
+            self._cache.clear()
+        # Pool threads may be reading with their readers until the pool has drained
+        if pool is not None:
+            pool.shutdown(wait=True)
+        with self._lock:
+            readers = [reader for reader in self._readers if reader not in self._lent]
+            self._readers, self._idle = [], []
+        for reader in readers:
+            reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # Files and problem items in scan order
+    def _entries(self, paths: Iterable[str]) -> Iterator[Union[str, dict]]:
+        for path in map(os.fspath, paths):
+            for files, problems in scanner.iter_scan_path(
+                path, self.recursive, self.follow_symlinks, self.one_file_system, self.walk_threads
+            ):
+                for problem in problems:
+                    yield problem_item(problem)
+                for file_path, _ in sorted(files):
+                    yield file_path
+
+    def _scan_inline(self, paths: Iterable[str], signatures: detector.SignatureSet):
+        reader = self._borrow_reader()
+        try:
+            for entry in self._entries(paths):
+                if isinstance(entry, str):
+                    entry = self._detect(entry, signatures, reader)
+                yield self._count(entry)
+        finally:
+            self._return_reader(reader)
+
+    # Detect on the session's pool, keeping at most 2 * threads files in flight
+    def _scan_pooled(self, paths: Iterable[str], signatures: detector.SignatureSet):
+        pool = self._executor()
+        pending: deque = deque()
+        window = 2 * self.threads
+        try:
+            for entry in self._entries(paths):
+                if isinstance(entry, str):
+                    entry = pool.submit(self._detect_pooled, entry, signatures)
+                pending.append(entry)
+                if len(pending) >= window:
+                    yield self._count(self._resolve(pending.popleft()))
+            while pending:
+                yield self._count(self._resolve(pending.popleft()))
+        finally:
+            for entry in pending:
+                if isinstance(entry, Future):
+                    entry.cancel()
+
+    @staticmethod
+    def _resolve(entry):
+        return entry.result() if isinstance(entry, Future) else entry
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._closed:
+                raise ValueError("Session is closed")
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix="ftcheck-session")
+            return self._pool
+
+    # Pool threads each keep one reader for the life of the session
+    def _detect_pooled(self, path: str, signatures: detector.SignatureSet):
+        try:
+            reader = self._local.reader
+        except AttributeError:
+            reader = self._local.reader = self._new_reader()
+        return self._detect(path, signatures, reader)
+
+    def _new_reader(self, lent: bool = False) -> Optional[detector.HeaderReader]:
+        if not detector.HeaderReader.supported():
+            return None
+        reader = detector.HeaderReader()
+        with self._lock:
+            self._readers.append(reader)
+            if lent:
+                self._lent.add(reader)
+        return reader
+
+    # Inline scans lend a reader for their duration, so callers' threads hold none afterwards
+    def _borrow_reader(self) -> Optional[detector.HeaderReader]:
+        with self._lock:
+            if self._idle:
+                reader = self._idle.pop()
+                self._lent.add(reader)
+                return reader
+        return self._new_reader(lent=True)
+
+    def _return_reader(self, reader: Optional[detector.HeaderReader]) -> None:
+        if reader is None:
+            return
+        with self._lock:
+            self._lent.discard(reader)
+            if not self._closed:
+                self._idle.append(reader)
+                return
+        reader.close()
+
+    def _detect(self, path: str, signatures: detector.SignatureSet, reader):
+        if not self.cache_size:
+            result = detector.detect_or_error(path, self.classify_text, reader, signatures)
+            return result if isinstance(result, ErrorRecord) else report_item(*result)
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            # Let detection report the error, and never cache devices or FIFOs
+            result = detector.detect_or_error(path, self.classify_text, reader, signatures)
+            return result if isinstance(result, ErrorRecord) else report_item(*result)
+
+        key = (st.st_dev, st.st_ino)
+        stamp = (st.st_size, st.st_mtime_ns, signatures.version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._cache.move_to_end(key)
+                self._counts["cache_hits"] += 1
+                # A new top-level dict; nested sections stay shared and read-only
+                return report_item({**cached[1], "path": path}, cached[2])
+
+        result = detector.detect_or_error(
+            path, self.classify_text, reader, signatures, st.st_size
+        )
+        if isinstance(result, ErrorRecord):
+            return result
+        report, rule = result
+        with self._lock:
+            self._cache[key] = (stamp, report, rule)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return report_item(dict(report), rule)
+
+    def _count(self, item):
+        counts = self._counts
+        with self._lock:
+            if item["ok"]:
+                counts["files_scanned"] += 1
+                if item["magic"]["matched"] is True:
+                    counts["matched"] += 1
+                elif "text" in item:
+                    counts["text"] += 1
+                else:
+                    counts["unknown"] += 1
+            else:
+                counts["errors"] += 1
+        return item
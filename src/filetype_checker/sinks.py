@@ -0,0 +1,246 @@
+# Structured output sinks that load results straight into SQLite, CSV or Parquet
+# Rows are buffered and written in batches (one transaction per batch for SQLite),
+# so a scan can feed a database without producing and re-parsing a JSON document
+
+import csv
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Optional
+
+from filetype_checker.error import SinkWriteError
+
+# Parquet support is optional and needs pyarrow
+try:
+    import pyarrow as _pa
+    import pyarrow.parquet as _pq
+except ImportError:  # pragma: no cover - depends on the environment
+    _pa = None
+    _pq = None
+
+DEFAULT_BATCH_SIZE = 1000
+
+# One row per success or error item: (column, SQLite type)
+COLUMNS = (
+    ("path", "TEXT"),
+    ("ok", "INTEGER"),
+    ("file_type", "TEXT"),
+    ("size_bytes", "INTEGER"),
+    ("magic_matched", "INTEGER"),
+    ("magic_offset", "INTEGER"),
+    ("magic_signature", "TEXT"),
+    ("magic_db_version", "TEXT"),
+    ("ext", "TEXT"),
+    ("mismatch", "INTEGER"),
+    ("text_encoding", "TEXT"),
+    ("error_code", "TEXT"),
+    ("error_message", "TEXT"),
+    ("error_details", "TEXT"),
+    ("violations", "TEXT"),
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+# SQLite tables the sink owns and replaces on every run
+RESULTS_TABLE = "ftcheck_results"
+SUMMARY_TABLE = "ftcheck_summary"
+
+
+# Flatten a success or error item into a row matching COLUMNS
+def item_row(item: dict) -> tuple:
+    if not item["ok"]:
+        error = item["error"]
+        details = error.get("details")
+        return (
+            item["path"],
+            0,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            error["code"],
+            error["message"],
+            json.dumps(details, ensure_ascii=False) if details is not None else None,
+            None,
+        )
+
+    magic = item["magic"]
+    text = item.get("text")
+    violations = item.get("violations")
+    return (
+        item["path"],
+        1,
+        item["file_type"],
+        item["size_bytes"],
+        int(magic["matched"]),
+        magic["offset"],
+        magic["signature"],
+        magic.get("db_version"),
+        item.get("ext"),
+        int(item["mismatch"]) if "mismatch" in item else None,
+        text["encoding"] if text else None,
+        None,
+        None,
+        None,
+        json.dumps([v["rule"] for v in violations]) if violations else None,
+    )
+
+
+class Sink(ABC):
+    """Buffer result rows and hand them to ``_write_batch`` every ``batch_size`` items.
+
+    Every output starts empty, as a fresh file would. ``sqlite3.Error`` and
+    ``OSError`` from writing or closing are raised as ``SinkWriteError``.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._rows: list[tuple] = []
+
+    @contextmanager
+    def _errors(self):
+        try:
+            yield
+        except (sqlite3.Error, OSError) as e:
+            raise SinkWriteError(self.path, f"Cannot write output {self.path}: {e}") from e
+
+    def write(self, item: dict) -> None:
+        self._rows.append(item_row(item))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            rows, self._rows = self._rows, []
+            with self._errors():
+                self._write_batch(rows)
+
+    def write_summary(self, summary: dict) -> None:
+        """Record the scan summary; sinks without a summary table only flush."""
+        self.flush()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._errors():
+                self._close()
+
+    @abstractmethod
+    def _write_batch(self, rows: list[tuple]) -> None:
+        """Write one batch of rows."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Release the underlying file or connection."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SqliteSink(Sink):
+    """Insert rows into a ``RESULTS_TABLE`` table and counts into a ``SUMMARY_TABLE`` table.
+
+    Both tables are dropped and recreated on open, so a database written by an
+    older version with fewer columns is replaced rather than appended to. The
+    names are ftcheck's own, so other tables in the database are left alone.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        super().__init__(path, batch_size)
+        self._conn = sqlite3.connect(path)
+        columns = ", ".join(f"{name} {sql_type}" for name, sql_type in COLUMNS)
+        try:
+            with self._conn:
+                self._conn.execute(f"DROP TABLE IF EXISTS {RESULTS_TABLE}")
+                self._conn.execute(f"DROP TABLE IF EXISTS {SUMMARY_TABLE}")
+                self._conn.execute(f"CREATE TABLE {RESULTS_TABLE} ({columns})")
+                self._conn.execute(
+                    f"CREATE TABLE {SUMMARY_TABLE} (key TEXT PRIMARY KEY, value INTEGER)"
+                )
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        self._insert = (
+            f"INSERT INTO {RESULTS_TABLE} ({', '.join(COLUMN_NAMES)}) VALUES ({placeholders})"
+        )
+
+    def _write_batch(self, rows: list[tuple]) -> None:
+        with self._conn:
+            self._conn.executemany(self._insert, rows)
+
+    def write_summary(self, summary: dict) -> None:
+        self.flush()
+        with self._errors(), self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {SUMMARY_TABLE} (key, value) VALUES (?, ?)",
+                [(k, v) for k, v in summary.items() if isinstance(v, (int, float))],
+            )
+
+    def _close(self) -> None:
+        self._conn.close()
+
+
+class CsvSink(Sink):
+    """Write a header row followed by one CSV row per item."""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        super().__init__(path, batch_size)
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMN_NAMES)
+
+    def _write_batch(self, rows: list[tuple]) -> None:
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(Sink):
+    """Write each batch as a Parquet row group (requires pyarrow)."""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        if _pa is None:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        super().__init__(path, batch_size)
+        types = {"TEXT": _pa.string(), "INTEGER": _pa.int64()}
+        self._schema = _pa.schema([(name, types[sql_type]) for name, sql_type in COLUMNS])
+        self._writer = _pq.ParquetWriter(path, self._schema)
+
+    def _write_batch(self, rows: list[tuple]) -> None:
+        columns = zip(*rows, strict=True)
+        arrays = [
+            _pa.array(column, type=field.type)
+            for column, field in zip(columns, self._schema, strict=True)
+        ]
+        self._writer.write_table(_pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+SINKS = {"sqlite": SqliteSink, "csv": CsvSink, "parquet": ParquetSink}
+
+
+# Parse "sqlite:PATH", "csv:PATH" or "parquet:PATH"; plain paths return None
+def parse_sink_spec(spec: str) -> Optional[tuple[str, str]]:
+    scheme, sep, path = spec.partition(":")
+    if sep and scheme in SINKS and path:
+        return scheme, path
+    return None
+
+
+def open_sink(scheme: str, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Sink:
+    return SINKS[scheme](path, batch_size)
@@ -0,0 +1,148 @@
+# Cheap text/binary classifier for headers that matched no magic signature
+# Uses a 256-entry byte-class table with bytes.translate/count, BOM checks and a
+# UTF-8 validity check, all over a bounded window of the file's first bytes
+
+import codecs
+from typing import Optional
+
+# Maximum number of bytes the classifier looks at per file
+TEXT_WINDOW = 512
+
+# Byte classes
+_TEXT = 0
+_NUL = 1
+_CONTROL = 2
+_HIGH = 3
+
+_ALLOWED_CONTROLS = b"\t\n\r\f\b\x1b"
+BYTE_CLASSES = bytes(
+    _NUL if b == 0
+    else _TEXT if 0x20 <= b < 0x7F or b in _ALLOWED_CONTROLS
+    else _HIGH if b >= 0x80
+    else _CONTROL
+    for b in range(256)
+)
+
+ENCODING_LABELS = {
+    "ascii": "ASCII Text",
+    "utf-8": "UTF-8 Text",
+    "utf-16-le": "UTF-16LE Text",
+    "utf-16-be": "UTF-16BE Text",
+    "utf-32-le": "UTF-32LE Text",
+    "utf-32-be": "UTF-32BE Text",
+}
+
+# Longest BOMs first so UTF-32LE is not mistaken for UTF-16LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# Fraction of non-whitespace control bytes tolerated in text
+MAX_CONTROL_RATIO = 0.01
+
+
+def _text_format(text: str) -> Optional[str]:
+    start = text.lstrip()[:5]
+    if start.startswith("<?xml"):
+        return "xml"
+    if start[:1] in ("{", "["):
+        return "json"
+    return None
+
+
+_FORMAT_LABELS = {"xml": "XML Document", "json": "JSON Text"}
+
+# Every possible classifier result as (encoding, bom, format), so results fit in a small int
+TEXT_KINDS = tuple(
+    (encoding, bom, fmt)
+    for encoding in ENCODING_LABELS
+    for bom in (False, True)
+    for fmt in (None, "json", "xml")
+)
+_KIND_IDS = {kind: i for i, kind in enumerate(TEXT_KINDS)}
+
+
+def _describe(encoding: str, bom: bool, fmt: Optional[str]) -> dict:
+    return {
+        "file_type": _FORMAT_LABELS.get(fmt, ENCODING_LABELS[encoding]),
+        "encoding": encoding,
+        "bom": bom,
+        "format": fmt,
+    }
+
+
+def _result(encoding: str, bom: bool, text: str) -> dict:
+    return _describe(encoding, bom, _text_format(text))
+
+
+def text_kind_id(text: dict) -> int:
+    """Index of a classifier result (or a report's ``text`` section) in ``TEXT_KINDS``."""
+    return _KIND_IDS[(text["encoding"], text["bom"], text["format"])]
+
+
+def text_from_kind(kind_id: int) -> dict:
+    """Rebuild the ``classify_text`` result for a ``TEXT_KINDS`` index."""
+    return _describe(*TEXT_KINDS[kind_id])
+
+
+# Decode a window that may end in the middle of a multi-byte character
+def _decode_prefix(data: bytes, encoding: str) -> Optional[str]:
+    try:
+        return codecs.getincrementaldecoder(encoding)().decode(data, final=False)
+    except UnicodeDecodeError:
+        return None
+
+
+# UTF-16 without a BOM: ASCII-range text puts NULs in every other byte
+def _guess_utf16(window: bytes) -> Optional[str]:
+    if len(window) < 4:
+        return None
+    half = len(window) // 2
+    even_nuls = window[0::2].count(0)
+    odd_nuls = window[1::2].count(0)
+    if odd_nuls >= 0.9 * half and even_nuls <= 0.1 * half:
+        return "utf-16-le"
+    if even_nuls >= 0.9 * half and odd_nuls <= 0.1 * half:
+        return "utf-16-be"
+    return None
+
+
+def classify_text(header: bytes) -> Optional[dict]:
+    """Return text details for ``header`` or ``None`` if it looks binary or is empty.
+
+    The result holds ``file_type`` (e.g. ``"UTF-8 Text"`` or ``"JSON Text"``),
+    ``encoding``, ``bom`` and ``format`` (``"json"``, ``"xml"`` or ``None``).
+    """
+    window = header[:TEXT_WINDOW]
+    if not window:
+        return None
+
+    for bom, encoding in _BOMS:
+        if window.startswith(bom):
+            text = _decode_prefix(window[len(bom):], encoding)
+            return None if text is None else _result(encoding, True, text)
+
+    classes = window.translate(BYTE_CLASSES)
+    if classes.count(_NUL):
+        encoding = _guess_utf16(window)
+        if encoding is None:
+            return None
+        text = _decode_prefix(window, encoding)
+        if text is None:
+            return None
+        return _result(encoding, False, text)
+
+    if classes.count(_CONTROL) > MAX_CONTROL_RATIO * len(window):
+        return None
+
+    if not classes.count(_HIGH):
+        return _result("ascii", False, window.decode("ascii"))
+
+    text = _decode_prefix(window, "utf-8")
+    if text is None:
+        return None
+    return _result("utf-8", False, text)
@@ -0,0 +1,123 @@
+# Token-bucket rate limiting and process priority controls for scanning busy storage
+# Limiters are thread-safe: each caller reserves tokens under a lock and sleeps outside it
+
+import ctypes
+import os
+import platform
+import threading
+import time
+
+from filetype_checker.error import PrioritySettingError
+
+# ioprio_set(2) syscall numbers; Linux has no stdlib wrapper for it
+_IOPRIO_SET_SYSCALLS = {"x86_64": 251, "aarch64": 30, "arm64": 30, "riscv64": 30}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+IONICE_CLASSES = {"best-effort": 2, "idle": 3}
+
+
+class TokenBucket:
+    """Allow ``rate`` units per second with bursts of up to ``capacity`` units."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(self.rate, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens, sleeping until they are available; return seconds slept."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve now (the balance may go negative) so concurrent callers queue up fairly
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class Throttle:
+    """Files-per-second and bytes-per-second limits shared by all scanning workers."""
+
+    def __init__(
+        self,
+        files_per_sec: float | None = None,
+        bytes_per_sec: float | None = None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ) -> None:
+        self._files = None
+        self._bytes = None
+        if files_per_sec:
+            self._files = TokenBucket(files_per_sec, clock=clock, sleep=sleep)
+        if bytes_per_sec:
+            self._bytes = TokenBucket(bytes_per_sec, clock=clock, sleep=sleep)
+        self._lock = threading.Lock()
+        self.throttled_seconds = 0.0
+        self.throttled_count = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._files is not None or self._bytes is not None
+
+    # Call before opening a file
+    def before_file(self) -> None:
+        if self._files is not None:
+            self._record(self._files.acquire(1))
+
+    # Call with the number of bytes read from a file
+    def after_read(self, nbytes: int) -> None:
+        if self._bytes is not None and nbytes > 0:
+            self._record(self._bytes.acquire(nbytes))
+
+    def _record(self, waited: float) -> None:
+        if waited > 0:
+            with self._lock:
+                self.throttled_seconds += waited
+                self.throttled_count += 1
+
+
+def apply_nice(increment: int) -> None:
+    try:
+        os.nice(increment)
+    except (AttributeError, OSError) as e:
+        raise PrioritySettingError(f"Cannot change CPU priority: {e}") from e
+
+
+# Parse "idle", "best-effort" or "best-effort:LEVEL" into (class, level)
+def parse_ionice(spec: str) -> tuple[int, int]:
+    name, _, level = spec.partition(":")
+    if name not in IONICE_CLASSES:
+        raise ValueError(f"unknown I/O class {name!r} (choose from idle, best-effort)")
+    if not level:
+        return IONICE_CLASSES[name], 4 if name == "best-effort" else 0
+    if name != "best-effort" or not level.isdigit() or not 0 <= int(level) <= 7:
+        raise ValueError("only best-effort takes a level, which must be 0-7")
+    return IONICE_CLASSES[name], int(level)
+
+
+def apply_ionice(io_class: int, level: int) -> None:
+    syscall_nr = _IOPRIO_SET_SYSCALLS.get(platform.machine().lower())
+    if platform.system() != "Linux" or syscall_nr is None:
+        raise PrioritySettingError("I/O priority is only supported on Linux (x86_64, arm64)")
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    ioprio = (io_class << _IOPRIO_CLASS_SHIFT) | level
+    if libc.syscall(syscall_nr, _IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+        err = ctypes.get_errno()
+        raise PrioritySettingError(f"Cannot change I/O priority: {os.strerror(err)}")
@@ -0,0 +1,231 @@
+# Per-file deadlines for detection on mounts that can hang (--file-timeout)
+# Files are detected on a small pool of daemon threads. A file that overruns its deadline is
+# reported as timed out and its thread is abandoned and replaced: a thread blocked in open()
+# or read() on a hung mount cannot be interrupted, but it no longer holds up the scan.
+# After several timeouts in a row in one directory, the rest of that directory is reported
+# at once; once too many threads are stuck, hung threads are no longer replaced
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Iterator, Optional
+
+from filetype_checker.error import FileTimeoutError
+
+DEFAULT_THREADS = 4
+# Consecutive timeouts in one directory after which its other files are not read
+DEFAULT_MAX_CONSECUTIVE = 3
+# Hung threads that get a replacement; each may stay blocked until its call returns
+DEFAULT_MAX_ABANDONED = 16
+# How long to wait for an idle thread to pick up the next file before checking again
+_POLL_SECONDS = 0.1
+
+# Outcomes of waiting for a task
+_DONE = "done"
+_TIMED_OUT = "timed out"
+_GIVEN_UP = "given up"
+
+
+class _Task:
+    __slots__ = (
+        "fn",
+        "path",
+        "directory",
+        "started",
+        "result",
+        "error",
+        "done",
+        "abandoned",
+        "replaced",
+    )
+
+    def __init__(self, fn: Callable[[str], object], path: str) -> None:
+        self.fn = fn
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self.started: Optional[float] = None
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+        self.abandoned = False
+        # Whether a new thread took over from the one stuck on this task
+        self.replaced = False
+
+
+class Watchdog:
+    """Run ``fn(path)`` on daemon threads and give up on calls that take over ``timeout``.
+
+    ``map`` yields ``(path, result)`` in input order, with a ``FileTimeoutError``
+    as the result for files that timed out. At most ``2 * threads`` files are
+    queued ahead of the one being waited on. ``call`` runs one call on the same
+    threads.
+
+    After ``max_consecutive`` timeouts in a row in one directory, files there
+    that have not started get a ``FileTimeoutError`` at once and are not read;
+    files elsewhere still are. A stuck thread is replaced while at most
+    ``max_abandoned`` threads are stuck, so no more than ``threads +
+    max_abandoned`` threads exist at once. A stuck thread whose call returns
+    goes back to work. The watchdog is ``dead`` while every thread is stuck; no
+    file is read until one comes back.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[str], object],
+        timeout: float,
+        threads: int = DEFAULT_THREADS,
+        clock=time.monotonic,
+        max_consecutive: int = DEFAULT_MAX_CONSECUTIVE,
+        max_abandoned: int = DEFAULT_MAX_ABANDONED,
+    ) -> None:
+        self.fn = fn
+        self.timeout = timeout
+        self.threads = threads
+        self.max_consecutive = max_consecutive
+        self.max_abandoned = max_abandoned
+        self._clock = clock
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # Timeouts over the life of the watchdog, and threads stuck in a call right now
+        self.abandoned = 0
+        self.hung = 0
+        # Threads taking tasks from the queue
+        self._workers = threads
+        # Timeouts in a row per directory, and why directories were given up on
+        self._consecutive: dict[str, int] = {}
+        self._dead_dirs: dict[str, str] = {}
+        for _ in range(threads):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        threading.Thread(target=self._work, daemon=True, name="ftcheck-watchdog").start()
+
+    def _work(self) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            with self._lock:
+                if task.abandoned or task.directory in self._dead_dirs:
+                    # Given up on before it started
+                    continue
+                task.started = self._clock()
+            try:
+                result, error = task.fn(task.path), None
+            except BaseException as e:  # handed to the caller of map()
+                result, error = None, e
+            with self._lock:
+                if task.abandoned:
+                    self.hung -= 1
+                    if task.replaced:
+                        # A replacement thread took over while this one was stuck
+                        return
+                    self._workers += 1
+                    continue
+                task.result = result
+                task.error = error
+                task.done.set()
+
+    @property
+    def dead(self) -> bool:
+        return self._workers == 0
+
+    # Why files in directory are no longer read, or None if they still are
+    def _given_up(self, directory: str) -> Optional[str]:
+        reason = self._dead_dirs.get(directory)
+        if reason is None and self._workers == 0:
+            reason = f"{self.hung} reads are still hung"
+        return reason
+
+    # Wait for a task: (DONE, None), (TIMED_OUT, None) past its deadline, or (GIVEN_UP, reason)
+    # for a task not started when its directory was given up on or every thread got stuck
+    def _wait(self, task: _Task) -> tuple[str, Optional[str]]:
+        directory = task.directory
+        while not task.done.is_set():
+            started = task.started
+            if started is None:
+                reason = self._given_up(directory)
+                if reason is None:
+                    task.done.wait(_POLL_SECONDS)
+                    continue
+                with self._lock:
+                    if task.started is None:
+                        task.abandoned = True
+                        return _GIVEN_UP, reason
+                continue
+            remaining = started + self.timeout - self._clock()
+            if remaining <= 0:
+                with self._lock:
+                    if task.done.is_set():
+                        break
+                    task.abandoned = True
+                    self.hung += 1
+                    task.replaced = self.hung <= self.max_abandoned
+                    if not task.replaced:
+                        self._workers -= 1
+                    count = self._consecutive.get(directory, 0) + 1
+                    self._consecutive[directory] = count
+                    if count >= self.max_consecutive:
+                        self._dead_dirs[directory] = (
+                            f"{count} files in a row timed out in {directory}"
+                        )
+                self.abandoned += 1
+                if task.replaced:
+                    self._spawn()
+                return _TIMED_OUT, None
+            task.done.wait(remaining)
+        self._consecutive.pop(directory, None)
+        return _DONE, None
+
+    # The task's result, or a FileTimeoutError if it timed out or was given up on
+    def _finish(self, task: _Task):
+        outcome, reason = self._wait(task)
+        if outcome == _TIMED_OUT:
+            return FileTimeoutError(task.path, self.timeout)
+        if outcome == _GIVEN_UP:
+            return FileTimeoutError(
+                task.path, self.timeout, message=f"Not read: {reason}: {task.path}"
+            )
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def _submit(self, fn: Callable[[str], object], path: str) -> _Task:
+        task = _Task(fn, path)
+        if self._given_up(task.directory) is None:
+            self._tasks.put(task)
+        return task
+
+    def call(self, path: str, fn: Optional[Callable[[str], object]] = None):
+        """Return ``fn(path)`` (default: the watchdog's function) or a ``FileTimeoutError``."""
+        return self._finish(self._submit(fn or self.fn, path))
+
+    def map(self, paths: Iterable[str]) -> Iterator[tuple[str, object]]:
+        pending: deque[_Task] = deque()
+        source = iter(paths)
+        window = 2 * self.threads
+
+        def submit() -> None:
+            for path in source:
+                pending.append(self._submit(self.fn, path))
+                if len(pending) >= window:
+                    return
+
+        submit()
+        while pending:
+            task = pending.popleft()
+            yield task.path, self._finish(task)
+            submit()
+
+    def close(self) -> None:
+        """Stop the idle threads; abandoned ones exit whenever their call returns."""
+        for _ in range(self.threads):
+            self._tasks.put(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,116 @@
+# Performance regression support for tests marked @pytest.mark.perf
+# Perf tests only run with --perf; results are compared against a JSON baseline file
+# Baselines are machine-specific, so they live in the pytest cache unless a path is given
+
+import gc
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+DEFAULT_TOLERANCE = 0.25
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf", "performance regression tests")
+    group.addoption("--perf", action="store_true", help="Run tests marked @pytest.mark.perf.")
+    group.addoption(
+        "--perf-baseline",
+        default=None,
+        help="JSON file with baseline throughput and allocation counts "
+        "(default: perf/baseline.json in the pytest cache directory).",
+    )
+    group.addoption(
+        "--perf-tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed fractional regression before a perf test fails (default: 0.25).",
+    )
+    group.addoption(
+        "--perf-update", action="store_true", help="Overwrite baselines with this run's results."
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--perf"):
+        return
+    skip = pytest.mark.skip(reason="perf test: run with --perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+
+class PerfRecorder:
+    def __init__(self, config) -> None:
+        path = config.getoption("--perf-baseline")
+        self.path = Path(path) if path else config.cache.mkdir("perf") / "baseline.json"
+        self.tolerance = config.getoption("--perf-tolerance")
+        self.update = config.getoption("--perf-update")
+        self.baselines = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.dirty = False
+
+    def measure(self, name: str, func, items: int, repeat: int = 5) -> dict:
+        """Time ``func`` (best of ``repeat``), count its allocations and check the baseline.
+
+        Allocations are the traced blocks still live after one call, including its
+        return value. Unlike timings and peak bytes, the count is the same on
+        every run. Without a baseline for ``name`` the test is skipped, unless
+        ``--perf-update`` is given to record one.
+        """
+        baseline = self.baselines.get(name)
+        if baseline is None and not self.update:
+            pytest.skip(f"{name}: no baseline in {self.path}; record one with --perf-update")
+
+        func()  # warm caches and imports
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            gc.collect()
+            before = tracemalloc.take_snapshot()
+            kept = func()  # Live until the second snapshot, so its blocks are counted
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+            del kept
+        finally:
+            tracemalloc.stop()
+        own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(own).compare_to(before.filter_traces(own), "filename")
+        blocks = sum(stat.count_diff for stat in stats)
+
+        result = {"items_per_sec": items / best, "blocks": blocks}
+        if self.update:
+            self.baselines[name] = result
+            self.dirty = True
+            return result
+
+        floor = baseline["items_per_sec"] * (1 - self.tolerance)
+        ceiling = baseline["blocks"] * (1 + self.tolerance)
+        assert result["items_per_sec"] >= floor, (
+            f"{name}: throughput {result['items_per_sec']:.0f}/s regressed below "
+            f"{floor:.0f}/s (baseline {baseline['items_per_sec']:.0f}/s)"
+        )
+        assert result["blocks"] <= ceiling, (
+            f"{name}: {result['blocks']} allocated blocks exceed "
+            f"{ceiling:.0f} (baseline {baseline['blocks']})"
+        )
+        return result
+
+    def save(self) -> None:
+        if self.dirty:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.baselines, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def perf(request):
+    recorder = PerfRecorder(request.config)
+    yield recorder
+    recorder.save()
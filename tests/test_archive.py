@@ -0,0 +1,179 @@
+import io
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+
+from filetype_checker import archive, cli
+from filetype_checker.error import FtcheckError
+
+PNG = b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a" + b"\x00" * 32
+PDF = b"%PDF-1.7\n" + b"x" * 5000
+
+
+def zip_bytes(members: dict, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def make_upload(tmp_path: Path) -> Path:
+    inner = zip_bytes({"deep/photo.png": PNG})
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("stored.png", PNG, compress_type=zipfile.ZIP_STORED)
+        zf.writestr("docs/report.pdf", PDF, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("docs/", b"")
+        zf.writestr("notes.txt", b"hello", compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("inner.zip", inner, compress_type=zipfile.ZIP_STORED)
+    path = tmp_path / "upload.zip"
+    path.write_bytes(buf.getvalue())
+    return path
+
+
+def test_iter_zip_members_reads_headers_and_nested_archives(tmp_path):
+    path = make_upload(tmp_path)
+
+    entries = list(archive.iter_zip_members(str(path)))
+
+    names = [name for name, _, _ in entries]
+    assert names == [
+        f"{path}!stored.png",
+        f"{path}!docs/report.pdf",
+        f"{path}!notes.txt",
+        f"{path}!inner.zip",
+        f"{path}!inner.zip!deep/photo.png",
+    ]
+    sizes = {name: size for name, size, _ in entries}
+    assert sizes[f"{path}!docs/report.pdf"] == len(PDF)
+    headers = {name: header for name, _, header in entries}
+    assert headers[f"{path}!docs/report.pdf"] == PDF[:8]
+
+
+def test_iter_zip_members_respects_depth_limit(tmp_path):
+    path = make_upload(tmp_path)
+
+    entries = list(archive.iter_zip_members(str(path), archive.ArchiveLimits(max_depth=1)))
+
+    assert all("!deep/" not in entry[0] for entry in entries)
+
+
+def test_iter_zip_members_stops_at_member_limit(tmp_path):
+    path = tmp_path / "many.zip"
+    path.write_bytes(zip_bytes({f"{i}.bin": b"x" for i in range(10)}))
+
+    entries = list(archive.iter_zip_members(str(path), archive.ArchiveLimits(max_members=3)))
+
+    assert len(entries) == 4
+    assert isinstance(entries[-1], FtcheckError)
+    assert entries[-1].code == "ARCHIVE_LIMIT"
+
+
+def test_iter_zip_members_caps_expanded_bytes_for_nested_archives(tmp_path):
+    bomb = zip_bytes({"zeros.bin": b"\x00" * 1_000_000})
+    path = tmp_path / "outer.zip"
+    path.write_bytes(zip_bytes({"bomb.zip": bomb}, compression=zipfile.ZIP_DEFLATED))
+
+    limits = archive.ArchiveLimits(max_expanded_bytes=len(bomb) - 1)
+    entries = list(archive.iter_zip_members(str(path), limits))
+
+    assert entries[0][0] == f"{path}!bomb.zip"
+    assert isinstance(entries[1], FtcheckError)
+    assert entries[1].code == "ARCHIVE_LIMIT"
+    assert len(entries) == 2
+
+
+def test_deflated_nested_archive_is_inflated_once(tmp_path, monkeypatch):
+    inner = zip_bytes({f"{i}.png": PNG for i in range(50)}, compression=zipfile.ZIP_STORED)
+    path = tmp_path / "outer.zip"
+    path.write_bytes(zip_bytes({"inner.zip": inner}, compression=zipfile.ZIP_DEFLATED))
+    seeks = []
+    original_seek = zipfile.ZipExtFile.seek
+
+    def seek(self, *args):
+        seeks.append(args)
+        return original_seek(self, *args)
+
+    monkeypatch.setattr(zipfile.ZipExtFile, "seek", seek)
+
+    entries = list(archive.iter_zip_members(str(path)))
+
+    assert len(entries) == 51
+    assert entries[-1][0] == f"{path}!inner.zip!49.png"
+    assert seeks == []
+
+
+def test_large_nested_archive_is_not_written_to_disk(tmp_path, monkeypatch):
+    inner = zip_bytes({"big.bin": b"\x00" * 4_000_000, "z.png": PNG}, zipfile.ZIP_STORED)
+    path = tmp_path / "outer.zip"
+    path.write_bytes(zip_bytes({"inner.zip": inner}, compression=zipfile.ZIP_STORED))
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("nested archive written to disk")
+
+    monkeypatch.setattr(tempfile, "TemporaryFile", no_disk)
+    monkeypatch.setattr(tempfile, "SpooledTemporaryFile", no_disk)
+
+    entries = list(archive.iter_zip_members(str(path)))
+
+    assert [entry[0] for entry in entries] == [
+        f"{path}!inner.zip",
+        f"{path}!inner.zip!big.bin",
+        f"{path}!inner.zip!z.png",
+    ]
+
+
+def test_member_reads_are_charged_to_the_limiter(tmp_path):
+    class Recorder:
+        enabled = True
+
+        def __init__(self):
+            self.charged = []
+
+        def after_read(self, nbytes):
+            self.charged.append(nbytes)
+
+    path = make_upload(tmp_path)
+    limiter = Recorder()
+
+    entries = list(archive.iter_zip_members(str(path), limiter=limiter))
+
+    assert entries == list(archive.iter_zip_members(str(path)))
+    assert sum(limiter.charged) >= path.stat().st_size
+
+
+def test_iter_zip_members_reports_corrupt_archive(tmp_path):
+    path = tmp_path / "broken.zip"
+    path.write_bytes(b"\x50\x4b\x03\x04" + b"\x00" * 20)
+
+    entries = list(archive.iter_zip_members(str(path)))
+
+    assert len(entries) == 1
+    assert entries[0].code == "EARCHIVE"
+
+
+def test_cli_scan_archives_reports_members(tmp_path, capsys):
+    path = make_upload(tmp_path)
+
+    exit_code = cli.main([str(path), "--json", "--scan-archives"])
+    doc = json.loads(capsys.readouterr().out)
+
+    by_path = {r["path"]: r for r in doc["results"]}
+    assert exit_code == 1  # notes.txt is unknown
+    assert by_path[str(path)]["file_type"] == "ZIP Archive"
+    assert by_path[f"{path}!docs/report.pdf"]["file_type"] == "PDF Document"
+    assert by_path[f"{path}!docs/report.pdf"]["ext"] == ".pdf"
+    assert by_path[f"{path}!inner.zip!deep/photo.png"]["file_type"] == "PNG Image"
+    assert doc["summary"]["files_scanned"] == 6
+    assert doc["summary"]["unknown"] == 1
+
+
+def test_cli_without_scan_archives_ignores_members(tmp_path, capsys):
+    path = make_upload(tmp_path)
+
+    cli.main([str(path), "--json"])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert [r["path"] for r in doc["results"]] == [str(path)]
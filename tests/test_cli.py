@@ -1,11 +1,15 @@
+import io
 import json
+import os
 import stat
 import sys
+import threading
 from pathlib import Path
 
 import pytest
 
-from filetype_checker import cli
+from filetype_checker import cli, detector
+from filetype_checker.error import FileReadError
 
 
 def get_result(doc: dict, path: Path) -> dict:
@@ -272,3 +276,490 @@ def test_json_permission_denied_file(tmp_path: Path, capsys) -> None:
         assert out["error"]["code"] == "EACCES"
     finally:
         p.chmod(stat.S_IRUSR | stat.S_IWUSR)
+
+
+def _make_scan_tree(root: Path) -> None:
+    for i in range(6):
+        sub = root / f"dir{i % 3}"
+        sub.mkdir(parents=True, exist_ok=True)
+        (sub / f"f{i}.png").write_bytes(b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a")
+    (root / "mystery.bin").write_bytes(b"\x00\x01\x02")
+
+
+def test_checkpoint_resume_does_not_duplicate_records(tmp_path: Path, capsys, monkeypatch) -> None:
+    tree = tmp_path / "tree"
+    _make_scan_tree(tree)
+    full_out = tmp_path / "full.ndjson"
+    out = tmp_path / "out.ndjson"
+    ck = tmp_path / "scan.ck"
+
+    assert cli.main([str(tree), "-r", "--ndjson", "-o", str(full_out)]) == 1
+    capsys.readouterr()
+
+    real_detect = cli.detector.detect_or_error
+    calls = {"n": 0}
+
+    def flaky_detect(path, *args):
+        calls["n"] += 1
+        if calls["n"] == 4:
+            raise KeyboardInterrupt
+        return real_detect(path, *args)
+
+    monkeypatch.setattr(cli.detector, "detect_or_error", flaky_detect)
+    args = [str(tree), "-r", "--ndjson", "-o", str(out), "--checkpoint", str(ck)]
+    with pytest.raises(KeyboardInterrupt):
+        cli.main([*args, "--checkpoint-interval", "0"])
+    assert ck.exists()
+
+    monkeypatch.setattr(cli.detector, "detect_or_error", real_detect)
+    exit_code = cli.main([*args, "--resume"])
+    captured = capsys.readouterr()
+
+    assert exit_code == 1
+    assert out.read_text() == full_out.read_text()
+    assert not ck.exists()
+    assert "Scanned: 7 files (matched: 6, unknown: 1, errors: 0)" in captured.err
+
+
+def test_checkpoint_scan_of_overlapping_roots_matches_plain_scan(tmp_path: Path, capsys) -> None:
+    tree = tmp_path / "tree"
+    _make_scan_tree(tree)
+    subdirs = sorted(p for p in tree.rglob("*") if p.is_dir())
+    roots = [str(subdirs[0]), str(tree), str(tree) + os.sep]
+    plain_out = tmp_path / "plain.ndjson"
+    out = tmp_path / "out.ndjson"
+
+    cli.main([*roots, "-r", "--ndjson", "-o", str(plain_out)])
+    cli.main([*roots, "-r", "--ndjson", "-o", str(out), "--checkpoint", str(tmp_path / "ck")])
+    capsys.readouterr()
+
+    assert out.read_text() == plain_out.read_text()
+    paths = [json.loads(line)["path"] for line in out.read_text().splitlines()]
+    assert len(paths) == len(set(paths)) == 7
+
+
+def test_checkpoint_resume_rejects_different_scan(tmp_path: Path, capsys) -> None:
+    tree = tmp_path / "tree"
+    _make_scan_tree(tree)
+    ck = tmp_path / "scan.ck"
+    out = tmp_path / "out.txt"
+    checkpoint_args = ["-o", str(out), "--checkpoint", str(ck)]
+    cli.checkpoint.save_checkpoint(
+        str(ck),
+        {
+            "fingerprint": {"paths": ["other"], "recursive": True},
+            "walker": {"root_index": 0, "frames": []},
+            "counts": cli._new_counts(),
+            "output_offset": 0,
+        },
+    )
+
+    exit_code = cli.main([str(tree), "-r", *checkpoint_args, "--resume"])
+    captured = capsys.readouterr()
+
+    assert exit_code == 2
+    assert "[CHECKPOINT]" in captured.err
+
+
+def test_checkpoint_requires_output(tmp_path: Path) -> None:
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main([str(tmp_path), "--checkpoint", str(tmp_path / "ck")])
+    assert excinfo.value.code == 2
+
+
+def test_ndjson_streams_one_item_per_line(tmp_path: Path, capsys) -> None:
+    tree = tmp_path / "tree"
+    _make_scan_tree(tree)
+
+    exit_code = cli.main([str(tree), "-r", "--ndjson"])
+    captured = capsys.readouterr()
+
+    lines = [json.loads(line) for line in captured.out.splitlines()]
+    assert exit_code == 1
+    assert len(lines) == 7
+    assert all(item["ok"] is True for item in lines)
+
+
+def test_json_classify_text_counts_text_as_known(tmp_path: Path, capsys) -> None:
+    (tmp_path / "data.csv").write_bytes(b"a,b\n1,2\n")
+    (tmp_path / "blob.bin").write_bytes(b"\x00\x11\x22\x33")
+
+    exit_code = cli.main([str(tmp_path), "--json", "--classify-text"])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert exit_code == 1  # blob.bin is still unknown
+    assert doc["summary"]["text"] == 1
+    assert doc["summary"]["unknown"] == 1
+    assert get_result(doc, tmp_path / "data.csv")["file_type"] == "ASCII Text"
+
+
+def test_hard_linked_files_are_detected_once(tmp_path: Path, capsys, monkeypatch) -> None:
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8
+    (tmp_path / "a.png").write_bytes(png)
+    os.link(tmp_path / "a.png", tmp_path / "b.jpg")
+    (tmp_path / "c.png").write_bytes(png)
+
+    calls = []
+    real_detect = cli.detector.detect_or_error
+
+    def counting_detect(path, *args):
+        calls.append(path)
+        return real_detect(path, *args)
+
+    monkeypatch.setattr(cli.detector, "detect_or_error", counting_detect)
+
+    code = cli.main(["--json", str(tmp_path)])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert code == 0
+    assert calls == [str(tmp_path / "a.png"), str(tmp_path / "c.png")]
+    linked = get_result(doc, tmp_path / "b.jpg")
+    assert linked["file_type"] == "PNG Image"
+    assert linked["ext"] == ".jpg"
+    assert linked["mismatch"] is True
+    assert get_result(doc, tmp_path / "a.png")["mismatch"] is False
+    assert doc["summary"]["files_scanned"] == 3
+
+
+def test_follow_symlinks_lists_files_under_every_linked_dir(
+    tmp_path: Path, capsys, monkeypatch
+) -> None:
+    (tmp_path / "real").mkdir()
+    (tmp_path / "real" / "a.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    os.symlink(tmp_path / "real", tmp_path / "alias")
+
+    calls = []
+    real_detect = cli.detector.detect_or_error
+
+    def counting_detect(path, *args):
+        calls.append(path)
+        return real_detect(path, *args)
+
+    monkeypatch.setattr(cli.detector, "detect_or_error", counting_detect)
+
+    cli.main(["--json", "-r", "-L", str(tmp_path)])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert [item["path"] for item in doc["results"]] == [
+        str(tmp_path / "alias" / "a.png"),
+        str(tmp_path / "real" / "a.png"),
+    ]
+    assert calls == [str(tmp_path / "alias" / "a.png")]
+
+
+def test_follow_symlinks_rejects_checkpoint(tmp_path: Path) -> None:
+    with pytest.raises(SystemExit):
+        cli.main(
+            ["-L", "--ndjson", "--checkpoint", str(tmp_path / "c"), "-o", str(tmp_path / "o"), "."]
+        )
+
+
+def test_memory_limit_output_matches_default(tmp_path: Path, capsys) -> None:
+    _make_scan_tree(tmp_path)
+
+    assert cli.main(["--ndjson", "-r", str(tmp_path)]) in (0, 1)
+    expected = capsys.readouterr().out
+    assert cli.main(["--ndjson", "-r", "--memory-limit", "1", str(tmp_path)]) in (0, 1)
+
+    assert capsys.readouterr().out == expected
+
+
+def test_metrics_file_written_at_end_of_scan(tmp_path: Path, capsys) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+    prom = tmp_path / "out.prom"
+
+    code = cli.main(["--json", "--metrics-file", str(prom), str(tmp_path / "a.pdf")])
+    capsys.readouterr()
+
+    text = prom.read_text()
+    assert code == 0
+    assert 'ftcheck_files_by_type_total{file_type="PDF Document"} 1\n' in text
+    assert "ftcheck_detect_seconds_count 1\n" in text
+    assert "ftcheck_scan_running 0\n" in text
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_metrics_count_each_file_read_once(tmp_path: Path, capsys, workers) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4 and more than one header window")
+    (tmp_path / "b.pdf").hardlink_to(tmp_path / "a.pdf")
+    (tmp_path / "c.gif").write_bytes(b"GIF89a")
+    prom = tmp_path.parent / f"{tmp_path.name}.prom"
+
+    code = cli.main(["--json", "--workers", workers, "--metrics-file", str(prom), str(tmp_path)])
+    capsys.readouterr()
+
+    text = prom.read_text()
+    window = detector.read_window(False)
+    assert code == 0
+    assert "ftcheck_files_scanned_total 3\n" in text
+    assert f"ftcheck_bytes_read_total {window + 6}\n" in text
+    assert "ftcheck_detect_seconds_count 2\n" in text
+
+
+def test_stdin_null_delimited_streams_in_list_order(tmp_path: Path, capsys, monkeypatch) -> None:
+    (tmp_path / "b.pdf").write_bytes(b"%PDF-1.4")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "z.gif").write_bytes(b"GIF89a")
+    (tmp_path / "dir" / "y.bin").write_bytes(b"\x00")
+    listed = [tmp_path / "b.pdf", tmp_path / "missing", tmp_path / "dir"]
+    data = b"".join(bytes(p) + b"\0" for p in listed)
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(data)))
+
+    code = cli.main(["--stdin", "-0", "--ndjson"])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert code == 2
+    assert [item["path"] for item in lines] == [
+        str(tmp_path / "b.pdf"),
+        str(tmp_path / "missing"),
+        str(tmp_path / "dir" / "y.bin"),
+        str(tmp_path / "dir" / "z.gif"),
+    ]
+    assert lines[1]["error"]["code"] == "ENOENT"
+
+
+def test_from_file_expands_recursive_directory_in_sorted_order(tmp_path: Path, capsys) -> None:
+    for rel in ["a.pdf", "m/b.pdf", "m-x.pdf", "m/n/c.pdf", "z.pdf"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(b"%PDF-1.4")
+    listing = tmp_path / "paths.txt"
+    listing.write_text(str(tmp_path) + "\n")
+
+    cli.main(["--from-file", str(listing), "--ndjson", "-r"])
+    paths = [json.loads(line)["path"] for line in capsys.readouterr().out.splitlines()]
+
+    assert paths == sorted(paths)
+    assert len(paths) == 6
+
+
+def test_from_file_with_workers_matches_serial(tmp_path: Path, capsys) -> None:
+    for i in range(40):
+        (tmp_path / f"{i:02}.pdf").write_bytes(b"%PDF-1.4" if i % 3 else b"\x00")
+    names = [str(tmp_path / f"{i:02}.pdf") for i in range(40)]
+    names.insert(7, str(tmp_path / "gone.pdf"))
+    listing = tmp_path / "paths.txt"
+    listing.write_text("\n".join(names) + "\n")
+
+    cli.main(["--from-file", str(listing), "--ndjson"])
+    serial = capsys.readouterr().out
+    cli.main(["--from-file", str(listing), "--ndjson", "--workers", "2"])
+
+    assert capsys.readouterr().out == serial
+    assert len(serial.splitlines()) == 41
+
+
+def test_from_file_rejects_json(tmp_path: Path) -> None:
+    with pytest.raises(SystemExit):
+        cli.main(["--from-file", str(tmp_path / "list"), "--json"])
+
+
+def test_policy_violations_set_exit_code_4(tmp_path: Path, capsys) -> None:
+    (tmp_path / "a.png").write_bytes(b"%PDF-1.4")
+    (tmp_path / "b.pdf").write_bytes(b"%PDF-1.4")
+    rules = {"rules": [{"id": "no-disguise", "mismatch": True}]}
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text(json.dumps(rules))
+
+    paths = [str(tmp_path / "a.png"), str(tmp_path / "b.pdf")]
+    code = cli.main(["--json", "--policy", str(policy_file), *paths])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert code == 4
+    assert get_result(doc, tmp_path / "a.png")["violations"][0]["rule"] == "no-disguise"
+    assert get_result(doc, tmp_path / "b.pdf")["violations"] == []
+    assert doc["summary"]["violations"] == 1
+    assert doc["summary"]["policy_hits"] == {"no-disguise": 1}
+
+
+def test_invalid_policy_file_exits_2(tmp_path: Path, capsys) -> None:
+    policy_file = tmp_path / "policy.json"
+    policy_file.write_text('{"rules": [{"id": "x"}]}')
+
+    assert cli.main(["--policy", str(policy_file), str(tmp_path)]) == 2
+    assert "[POLICY]" in capsys.readouterr().err
+
+
+def test_tsv_output_has_header_and_error_rows(tmp_path: Path, capsys) -> None:
+    (tmp_path / "a.gif").write_bytes(b"GIF89a")
+
+    code = cli.main(["--tsv", str(tmp_path / "a.gif"), str(tmp_path / "missing")])
+    lines = capsys.readouterr().out.splitlines()
+
+    assert code == 2
+    assert lines[0].split("\t") == list(cli.reporting.TSV_COLUMNS)
+    rows = {line.split("\t")[0]: line.split("\t") for line in lines[1:]}
+    assert rows[str(tmp_path / "a.gif")][1:5] == ["1", "GIF Image", "6", "1"]
+    assert rows[str(tmp_path / "missing")][-2] == "ENOENT"
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+def test_file_timeout_reports_hung_file_and_finishes(tmp_path: Path, capsys) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+    (tmp_path / "c.gif").write_bytes(b"GIF89a")
+    # Opening a FIFO with no writer blocks, like a read on a hung network mount
+    fifo = tmp_path / "b.fifo"
+    os.mkfifo(fifo)
+    try:
+        code = cli.main(["--ndjson", "-r", "--file-timeout", "0.3", str(tmp_path)])
+    finally:
+        # Release the abandoned detection thread
+        os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert code == 2
+    assert [item["path"] for item in lines] == [
+        str(tmp_path / "a.pdf"),
+        str(tmp_path / "b.fifo"),
+        str(tmp_path / "c.gif"),
+    ]
+    assert lines[1]["error"]["code"] == "ETIMEDOUT"
+    assert lines[0]["ok"] is True and lines[2]["ok"] is True
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+def test_file_timeout_keeps_reading_other_directories(tmp_path: Path, capsys) -> None:
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    fifos = [tmp_path / "a" / f"{i}.fifo" for i in range(3)]
+    for fifo in fifos:
+        os.mkfifo(fifo)
+    for i in range(32):
+        (tmp_path / "b" / f"{i:02}.pdf").write_bytes(b"%PDF-1.4")
+    try:
+        code = cli.main(["--ndjson", "-r", "--file-timeout", "0.3", str(tmp_path)])
+    finally:
+        for fifo in fifos:
+            os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert code == 2
+    assert [item["error"]["code"] for item in lines[:3]] == ["ETIMEDOUT"] * 3
+    assert [item["file_type"] for item in lines[3:]] == ["PDF Document"] * 32
+
+
+def test_file_timeout_covers_hard_link_retries(tmp_path: Path, capsys, monkeypatch) -> None:
+    (tmp_path / "a1.pdf").write_bytes(b"%PDF-1.4")
+    (tmp_path / "a2.pdf").hardlink_to(tmp_path / "a1.pdf")
+    release = threading.Event()
+    scan_file = cli._scan_file_unmetered
+
+    def flaky(file, args, limiter, reader):
+        if file.endswith("a1.pdf"):
+            return cli.problem_item(FileReadError(file))
+        release.wait(5)
+        return scan_file(file, args, limiter, reader)
+
+    monkeypatch.setattr(cli, "_scan_file_unmetered", flaky)
+    try:
+        cli.main(["--ndjson", "--file-timeout", "0.2", str(tmp_path)])
+    finally:
+        release.set()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert [item["error"]["code"] for item in lines] == ["EIO", "ETIMEDOUT"]
+    assert lines[1]["path"] == str(tmp_path / "a2.pdf")
+
+
+def test_file_timeout_covers_archive_member_reads(tmp_path: Path, capsys, monkeypatch) -> None:
+    (tmp_path / "a.zip").write_bytes(b"PK\x03\x04" + b"\x00" * 26)
+    release = threading.Event()
+
+    def hung_members(path, *args):
+        release.wait(5)
+        yield from ()
+
+    monkeypatch.setattr(cli.archive, "iter_zip_members", hung_members)
+    try:
+        cli.main(["--ndjson", "--scan-archives", "--file-timeout", "0.2", str(tmp_path)])
+    finally:
+        release.set()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    assert lines[0]["file_type"] == "ZIP Archive"
+    assert lines[1]["error"]["code"] == "ETIMEDOUT"
+    assert lines[1]["path"] == str(tmp_path / "a.zip")
+
+
+def test_file_timeout_rejects_workers(tmp_path: Path) -> None:
+    with pytest.raises(SystemExit):
+        cli.main(["--file-timeout", "1", "--workers", "2", str(tmp_path)])
+
+
+def test_signatures_file_replaces_builtin_database(tmp_path: Path, capsys) -> None:
+    (tmp_path / "clip.mp4").write_bytes(b"\x00\x00\x00\x18ftypmp42")
+    sig_file = tmp_path / "sigs.json"
+    sig_file.write_text(
+        json.dumps(
+            {"signatures": [{"offset": 4, "magic": "66747970", "label": "MP4", "priority": 5}]}
+        )
+    )
+
+    code = cli.main(["--json", "--signatures", str(sig_file), str(tmp_path / "clip.mp4")])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert code == 0
+    item = get_result(doc, tmp_path / "clip.mp4")
+    assert item["file_type"] == "MP4"
+    assert item["magic"]["db_version"] == doc["summary"]["db_version"]
+    assert doc["summary"]["db_version"] != cli.detector.current_signatures().version
+
+
+def test_collapse_errors_summarizes_errors_by_code(tmp_path: Path, capsys) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+    missing = [str(tmp_path / f"missing{i}") for i in range(4)]
+
+    exit_code = cli.main(["--json", "--collapse-errors", str(tmp_path / "a.pdf"), *missing])
+    doc = json.loads(capsys.readouterr().out)
+
+    assert exit_code == 2
+    assert [item["ok"] for item in doc["results"]] == [True]
+    assert doc["summary"]["errors"] == 4
+    assert doc["summary"]["error_groups"] == [
+        {"code": "ENOENT", "count": 4, "examples": missing[:3]}
+    ]
+
+    cli.main(["--collapse-errors", *missing])
+    err = capsys.readouterr().err.splitlines()
+    assert err[0] == f"ftcheck: error: [ENOENT] 4 errors ({', '.join(missing[:3])}, ...)"
+
+
+def test_collapse_errors_rejects_checkpoint(tmp_path: Path) -> None:
+    with pytest.raises(SystemExit):
+        cli.main(
+            [
+                "--collapse-errors",
+                "--ndjson",
+                "--checkpoint",
+                str(tmp_path / "c"),
+                "-o",
+                str(tmp_path / "o"),
+                ".",
+            ]
+        )
+
+
+def test_diff_compares_scan_outputs(tmp_path: Path, capsys) -> None:
+    scan = tmp_path / "scan"
+    scan.mkdir()
+    (scan / "a.pdf").write_bytes(b"%PDF-1.4")
+    (scan / "b.pdf").write_bytes(b"%PDF-1.4")
+    old = tmp_path / "old.json"
+    new = tmp_path / "new.ndjson"
+    cli.main(["--json", "-o", str(old), "-r", str(scan)])
+    (scan / "b.pdf").write_bytes(b"GIF89a")
+    (scan / "c.gif").write_bytes(b"GIF89a")
+    cli.main(["--ndjson", "-o", str(new), "-r", str(scan)])
+    capsys.readouterr()
+
+    code = cli.main(["diff", "--ndjson", str(old), str(new)])
+    captured = capsys.readouterr()
+    changes = [json.loads(line) for line in captured.out.splitlines()]
+
+    assert code == 1
+    assert [(c["change"], Path(c["path"]).name) for c in changes] == [
+        ("changed", "b.pdf"),
+        ("added", "c.gif"),
+    ]
+    assert changes[0]["file_type"] == ["PDF Document", "GIF Image"]
+    assert "unchanged: 1" in captured.err
+    assert cli.main(["diff", str(old), str(old)]) == 0
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from filetype_checker import extsort, scanner
+
+
+def write_bytes(path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_parse_size_accepts_units():
+    assert extsort.parse_size("65536") == 65536
+    assert extsort.parse_size("4k") == 4096
+    assert extsort.parse_size("1.5M") == 3 << 19
+    assert extsort.parse_size("2GiB") == 2 << 30
+
+
+@pytest.mark.parametrize("text", ["", "M", "-1", "0", "12Q"])
+def test_parse_size_rejects_bad_values(text):
+    with pytest.raises(ValueError):
+        extsort.parse_size(text)
+
+
+def test_external_sorter_merges_spilled_runs_in_order(monkeypatch):
+    monkeypatch.setattr(extsort, "MAX_MERGE_FANIN", 4)
+    names = [f"/data/{(i * 7919) % 1000:04}é.bin" for i in range(1000)]
+    writes = []
+
+    def write_record(f, path, file_id):
+        writes.append(path)
+        extsort._write_record(f, path, file_id)
+
+    limit = extsort.ENTRY_OVERHEAD * 25
+    with extsort.ExternalSorter(limit, write_record=write_record) as sorter:
+        for i, name in enumerate(names):
+            sorter.add(name, (1, i) if i % 3 else None)
+        sorter.add(names[0], (1, 0))
+        # 41 spills = 2 * 16 + 2 * 4 + 1, so each record is rewritten at most twice
+        assert [len(level) for level in sorter._levels] == [1, 2, 2]
+        assert len(writes) <= 3 * len(names)
+        merged = list(sorter)
+        assert len(sorter.runs) < 4
+
+    assert [path for path, _ in merged] == sorted(set(names))
+    ids = dict(merged)
+    assert ids[names[1]] == (1, 1)
+    assert ids[names[3]] is None
+
+
+def test_sorted_scan_matches_scan_paths(tmp_path):
+    for i in range(30):
+        write_bytes(tmp_path / f"d{i % 4}" / f"{i:02}.bin", b"x")
+    missing = str(tmp_path / "missing")
+    paths = [str(tmp_path / "d1"), missing, str(tmp_path)]
+
+    expected = scanner.scan_paths(paths, recursive=True)
+    sorter, problems = extsort.sorted_scan(paths, True, memory_limit=extsort.ENTRY_OVERHEAD * 5)
+    with sorter:
+        assert len(sorter.runs) > 1
+        assert list(sorter) == expected[0]
+    assert problems == expected[1]
+    assert [p.code for p in problems] == ["ENOENT"]
+
+
+def test_sorter_close_removes_runs(tmp_path):
+    sorter = extsort.ExternalSorter(memory_limit=1, tmpdir=str(tmp_path))
+    sorter.add("a", None)
+    sorter.add("b", None)
+    assert len(sorter.runs) == 2
+    sorter.close()
+    assert sorter.runs == []
+    assert os.listdir(tmp_path) == []
@@ -1,7 +1,18 @@
+import json
+import os
+import threading
+
 import pytest
 
-from filetype_checker import detector
-from filetype_checker.error import PathNotFoundError
+from filetype_checker import detector, textclass
+from filetype_checker.error import (
+    ErrorRecord,
+    FileReadError,
+    PathIsDirectoryError,
+    PathNotFoundError,
+    SignatureDatabaseError,
+    SignatureParseError,
+)
 
 
 def write_bytes(path, data: bytes) -> None:
@@ -72,6 +83,30 @@ def test_missing_file(tmp_path):
         detector.detect(str(file_path))
 
 
+def test_detect_or_error_returns_record_with_same_item_as_raised_error(tmp_path):
+    missing = str(tmp_path / "missing")
+
+    record = detector.detect_or_error(missing)
+
+    assert record == ErrorRecord("ENOENT", missing)
+    with pytest.raises(PathNotFoundError) as raised:
+        detector.detect_with_rule(missing)
+    error = raised.value
+    expected = {"code": error.code, "message": error.message, "details": error.details}
+    assert record["error"] == expected
+    assert record.item() == {"ok": False, "path": missing, "error": expected}
+    assert record["error"] is record["error"]
+    assert record.get("ok") is False and record.get("size_bytes") is None
+
+
+def test_error_record_to_error_keeps_os_error():
+    error = ErrorRecord("EIO", "/x", "boom").to_error()
+
+    assert isinstance(error, FileReadError)
+    expected = {"code": error.code, "message": error.message, "details": error.details}
+    assert expected == ErrorRecord("EIO", "/x", "boom")["error"]
+
+
 def test_match_magic_prefers_longer_signature_when_priority_ties(monkeypatch):
     db = [
         (0, b"AB", "SHORT", 10),
@@ -94,3 +129,366 @@ def test_match_magic_prefers_higher_priority_over_length(monkeypatch):
     out = detector.match_magic(b"ABCDE")
     assert out["matched"] is True
     assert out["file_type"] == "HIGH"
+
+
+BATCH_HEADERS = [
+    b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a",
+    b"\xff\xd8\xff\x00\x00\x00\x00\x00",
+    b"GIF89a\x00\x00",
+    b"%PDF-1.7",
+    b"\x50\x4b\x05\x06\x00\x00\x00\x00",
+    b"\x00\x11\x22\x33\x44\x55\x66\x77",
+    b"\xff\xd8",
+]
+
+
+def _expected_label(index):
+    return "Unknown File Type" if index < 0 else detector.MAGIC_DB[index][2]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_match_magic_batch_agrees_with_match_magic(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(detector, "_np", None)
+
+    out = detector.match_magic_batch(BATCH_HEADERS)
+
+    assert len(out) == len(BATCH_HEADERS)
+    for header, index in zip(BATCH_HEADERS, out, strict=True):
+        expected = detector.match_magic(header)
+        assert _expected_label(index) == expected["file_type"]
+        assert (index >= 0) is expected["matched"]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_match_magic_batch_contiguous_buffer(monkeypatch, use_numpy):
+    headers = [h for h in BATCH_HEADERS if len(h) == 8]
+    expected = list(detector.match_magic_batch(headers))
+    if use_numpy:
+        pytest.importorskip("numpy")
+        # A buffer is matched as one matrix, never split into per-header bytes
+        monkeypatch.setattr(detector, "_match_batch_numpy", None)
+    else:
+        monkeypatch.setattr(detector, "_np", None)
+
+    out = detector.match_magic_batch(b"".join(headers), width=8)
+
+    assert list(out) == expected
+
+
+def test_match_magic_batch_respects_priority(monkeypatch):
+    db = [
+        (0, b"ABCDE", "LONG", 10),
+        (0, b"AB", "HIGH", 99),
+        (0, b"ABC", "LONGER", 99),
+    ]
+    monkeypatch.setattr(detector, "MAGIC_DB", db, raising=True)
+    monkeypatch.setattr(detector, "_np", None)
+
+    assert list(detector.match_magic_batch([b"ABCDE", b"ABX", b"XX"])) == [2, 1, -1]
+
+
+def test_match_magic_batch_rejects_ragged_buffer():
+    with pytest.raises(ValueError):
+        detector.match_magic_batch(b"\x00" * 10, width=8)
+
+
+def test_compiled_rules_precompute_signature_and_extensions():
+    rules = detector.get_rules()
+
+    assert [r.label for r in rules] == [label for _, _, label, _ in detector.MAGIC_DB]
+    jpeg = next(r for r in rules if r.label == "JPEG Image")
+    assert jpeg.signature == "FFD8FF"
+    assert jpeg.extensions == frozenset({".jpg", ".jpeg", ".jpe"})
+    assert jpeg.report == {
+        "matched": True,
+        "offset": 0,
+        "signature": "FFD8FF",
+        "db_version": detector.current_signatures().version,
+    }
+
+
+def test_detect_reports_share_rule_template(tmp_path):
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.pdf"
+    write_bytes(a, b"%PDF-1.4")
+    write_bytes(b, b"%PDF-1.7")
+
+    report_a, rule = detector.detect_with_rule(str(a))
+    report_b = detector.detect(str(b))
+
+    assert rule is not None and rule.label == "PDF Document"
+    assert report_a["magic"] is rule.report
+    assert report_b["magic"] is rule.report
+
+
+def test_match_rule_recompiles_when_db_replaced(monkeypatch):
+    monkeypatch.setattr(detector, "MAGIC_DB", [(2, b"ZZ", "ZED", 1)], raising=True)
+
+    rule = detector.match_rule(b"..ZZ")
+    assert rule is not None
+    assert (rule.label, rule.signature, rule.extensions) == ("ZED", "5A5A", None)
+    assert detector.match_rule(b"ZZ") is None
+
+
+def test_signature_set_version_is_a_content_hash():
+    a = detector.SignatureSet(detector.MAGIC_DB)
+    b = detector.SignatureSet(list(detector.MAGIC_DB))
+    c = detector.SignatureSet([*detector.MAGIC_DB, (4, b"ftyp", "MP4 Video", 50)])
+
+    assert a.version == b.version == detector.current_signatures().version
+    assert c.version != a.version
+    assert c.max_bytes == 8
+
+
+def test_install_signatures_swaps_active_set(tmp_path):
+    path = tmp_path / "clip.mp4"
+    write_bytes(path, b"\x00\x00\x00\x18ftypmp42")
+    mp4 = detector.SignatureSet([(4, b"ftyp", "MP4 Video", 50)])
+
+    previous = detector.install_signatures(mp4)
+    try:
+        report = detector.detect(str(path))
+    finally:
+        assert detector.install_signatures(previous) is mp4
+
+    assert report["file_type"] == "MP4 Video"
+    assert report["magic"]["db_version"] == mp4.version
+    after = detector.detect(str(path))
+    assert after["file_type"] == "Unknown File Type"
+    assert after["magic"]["db_version"] == previous.version
+
+
+def test_reader_during_rebuild_never_gets_the_old_set(monkeypatch):
+    new_db = [(0, b"ZZZZ", "Zed", 1)]
+    build = detector.SignatureSet
+    during = []
+
+    # Stands in for a thread that looks up the active set while the new one is being built
+    def build_and_look(db, *args, **kwargs):
+        if not during:
+            during.append(None)
+            during[0] = detector.current_signatures()
+        return build(db, *args, **kwargs)
+
+    monkeypatch.setattr(detector, "SignatureSet", build_and_look)
+    monkeypatch.setattr(detector, "MAGIC_DB", new_db)
+
+    active = detector.current_signatures()
+
+    assert [rule.label for rule in during[0].rules] == ["Zed"]
+    assert [rule.label for rule in active.rules] == ["Zed"]
+
+
+def test_detect_with_pinned_signatures_ignores_swaps(tmp_path):
+    path = tmp_path / "a.gif"
+    write_bytes(path, b"GIF89a")
+    pinned = detector.current_signatures()
+    previous = detector.install_signatures(detector.SignatureSet([(0, b"ZZ", "ZED", 1)]))
+    try:
+        report, rule = detector.detect_with_rule(str(path), signatures=pinned)
+    finally:
+        detector.install_signatures(previous)
+
+    assert rule is not None and rule.label == "GIF Image"
+    assert report["magic"]["db_version"] == pinned.version
+
+
+def test_concurrent_swaps_give_consistent_results(tmp_path):
+    path = tmp_path / "a.gif"
+    write_bytes(path, b"GIF89a")
+    builtin = detector.current_signatures()
+    other = detector.SignatureSet([(0, b"GIF8", "Old GIF", 1)])
+    expected = {builtin.version: "GIF Image", other.version: "Old GIF"}
+    seen = []
+    stop = threading.Event()
+
+    def swap():
+        while not stop.is_set():
+            detector.install_signatures(other)
+            detector.install_signatures(builtin)
+
+    swapper = threading.Thread(target=swap)
+    swapper.start()
+    try:
+        for _ in range(2000):
+            report = detector.detect(str(path))
+            seen.append((report["magic"]["db_version"], report["file_type"]))
+    finally:
+        stop.set()
+        swapper.join()
+        detector.install_signatures(builtin)
+
+    assert all(expected[version] == file_type for version, file_type in seen)
+
+
+def test_load_signatures_reads_hex_magic(tmp_path):
+    sig_file = tmp_path / "sigs.json"
+    sig_file.write_text(
+        json.dumps(
+            {"signatures": [{"offset": 4, "magic": "66747970", "label": "MP4", "priority": 5}]}
+        )
+    )
+
+    signatures = detector.load_signatures(str(sig_file))
+
+    assert [(r.offset, r.magic, r.label) for r in signatures.rules] == [(4, b"ftyp", "MP4")]
+    assert signatures.match(b"\x00\x00\x00\x18ftyp").label == "MP4"
+
+
+@pytest.mark.parametrize(
+    "doc",
+    [
+        {"signatures": [{"offset": 0, "magic": "zz", "label": "X", "priority": 1}]},
+        {"signatures": [{"offset": -1, "magic": "00", "label": "X", "priority": 1}]},
+        {"signatures": [{"offset": 0, "magic": "00", "label": "X"}]},
+        {"rules": []},
+    ],
+)
+def test_load_signatures_rejects_bad_entries(tmp_path, doc):
+    sig_file = tmp_path / "sigs.json"
+    sig_file.write_text(json.dumps(doc))
+
+    with pytest.raises(SignatureParseError):
+        detector.load_signatures(str(sig_file))
+
+
+def test_load_signatures_rejects_empty_and_missing(tmp_path):
+    empty = tmp_path / "empty.json"
+    empty.write_text('{"signatures": []}')
+
+    with pytest.raises(SignatureDatabaseError):
+        detector.load_signatures(str(empty))
+    with pytest.raises(SignatureDatabaseError):
+        detector.load_signatures(str(tmp_path / "missing.json"))
+
+
+@pytest.mark.parametrize(
+    "payload, label, encoding, bom",
+    [
+        (b"name,size\na,1\n", "ASCII Text", "ascii", False),
+        ("café\n".encode(), "UTF-8 Text", "utf-8", False),
+        ("héllo".encode("utf-16"), "UTF-16LE Text", "utf-16-le", True),
+        ("hello there".encode("utf-16-be"), "UTF-16BE Text", "utf-16-be", False),
+        (b'  {"a": [1, 2]}', "JSON Text", "ascii", False),
+        (b'\xef\xbb\xbf<?xml version="1.0"?>', "XML Document", "utf-8", True),
+    ],
+)
+def test_classify_text_labels_encodings(payload, label, encoding, bom):
+    out = textclass.classify_text(payload)
+
+    assert out is not None
+    assert (out["file_type"], out["encoding"], out["bom"]) == (label, encoding, bom)
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b"", b"\x00\x11\x22\x33\x44\x55", b"\xc3\x28 invalid utf-8", b"abc\x01\x02\x03\x04"],
+)
+def test_classify_text_rejects_binary(payload):
+    assert textclass.classify_text(payload) is None
+
+
+def test_classify_text_ignores_multibyte_char_cut_at_window_end():
+    payload = "é".encode() * textclass.TEXT_WINDOW
+
+    assert textclass.classify_text(payload)["file_type"] == "UTF-8 Text"
+
+
+def test_detect_classify_text_only_for_unmatched(tmp_path):
+    text_file = tmp_path / "notes.txt"
+    write_bytes(text_file, b"plain text\n")
+    pdf_file = tmp_path / "doc.pdf"
+    write_bytes(pdf_file, b"%PDF-1.4 plain text")
+
+    text_report = detector.detect(str(text_file), classify_text=True)
+    pdf_report = detector.detect(str(pdf_file), classify_text=True)
+
+    assert text_report["file_type"] == "ASCII Text"
+    assert text_report["magic"]["matched"] is False
+    assert text_report["text"] == {"encoding": "ascii", "bom": False, "format": None}
+    assert pdf_report["file_type"] == "PDF Document"
+    assert "text" not in pdf_report
+    assert "text" not in detector.detect(str(text_file))
+
+
+needs_reader = pytest.mark.skipif(
+    not detector.HeaderReader.supported(), reason="needs os.preadv and dir_fd support"
+)
+
+
+@needs_reader
+@pytest.mark.parametrize("size", [0, 3, 511, 4095, 4096, 4097, 100_000])
+@pytest.mark.parametrize("classify_text", [False, True])
+def test_header_reader_matches_buffered_reads(tmp_path, size, classify_text):
+    path = tmp_path / "sub" / "file.bin"
+    write_bytes(path, (b"%PDF-" + b"a" * size)[:size])
+
+    with detector.HeaderReader() as reader:
+        fast = detector.detect_with_rule(str(path), classify_text, reader)
+
+    assert fast == detector.detect_with_rule(str(path), classify_text)
+
+
+@needs_reader
+def test_header_reader_reuses_directory_descriptor(tmp_path, monkeypatch):
+    for name in ("a.png", "b.png", "c.png"):
+        write_bytes(tmp_path / name, b"\x89PNG\r\n\x1a\n" + b"\x00" * 8000)
+    opened = []
+    real_open = detector.os.open
+
+    def recording_open(path, flags, *args, **kwargs):
+        opened.append((path, kwargs.get("dir_fd")))
+        return real_open(path, flags, *args, **kwargs)
+
+    monkeypatch.setattr(detector.os, "open", recording_open)
+
+    with detector.HeaderReader() as reader:
+        sizes = [reader.read(str(tmp_path / n), 8)[0] for n in ("a.png", "b.png", "c.png")]
+        assert reader.read(str(tmp_path / "a.png"), 8, size=123) == (123, b"\x89PNG\r\n\x1a\n")
+
+    assert sizes == [8008, 8008, 8008]
+    assert opened[0] == (str(tmp_path), None)
+    file_opens = opened[1:]
+    assert [name for name, _ in file_opens] == ["a.png", "b.png", "c.png", "a.png"]
+    assert len({dir_fd for _, dir_fd in file_opens}) == 1
+
+
+@needs_reader
+def test_header_reader_reads_only_the_window(tmp_path, monkeypatch):
+    write_bytes(tmp_path / "a.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+    requested = []
+    real_preadv = detector.os.preadv
+
+    def recording_preadv(fd, buffers, offset):
+        requested.append(sum(len(b) for b in buffers))
+        return real_preadv(fd, buffers, offset)
+
+    monkeypatch.setattr(detector.os, "preadv", recording_preadv)
+
+    with detector.HeaderReader() as reader:
+        assert reader.read(str(tmp_path / "a.png"), 8) == (108, b"\x89PNG\r\n\x1a\n")
+
+    assert requested == [8]
+
+
+@needs_reader
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs procfs")
+def test_header_reader_reports_stat_size_for_special_files():
+    path = "/proc/self/status"
+
+    with detector.HeaderReader() as reader:
+        fast = detector.detect_with_rule(path, reader=reader)[0]
+
+    assert fast["size_bytes"] == os.stat(path).st_size
+
+
+@needs_reader
+def test_header_reader_maps_errors(tmp_path):
+    with detector.HeaderReader() as reader:
+        with pytest.raises(PathNotFoundError):
+            detector.detect_with_rule(str(tmp_path / "missing.bin"), reader=reader)
+        with pytest.raises(PathIsDirectoryError):
+            detector.detect_with_rule(str(tmp_path), reader=reader)
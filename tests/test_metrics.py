@@ -0,0 +1,111 @@
+import urllib.request
+
+from filetype_checker import metrics
+
+
+def _ok_item(file_type: str, matched: bool, size: int = 100, text: bool = False) -> dict:
+    item = {"ok": True, "file_type": file_type, "size_bytes": size, "magic": {"matched": matched}}
+    if text:
+        item["text"] = {"encoding": "ascii"}
+    return item
+
+
+def _error_item(code: str) -> dict:
+    return {"ok": False, "path": "x", "error": {"code": code, "message": "m"}}
+
+
+def test_observe_counts_items_by_outcome_type_and_code():
+    m = metrics.ScanMetrics(read_window=16)
+    m.observe(_ok_item("PNG Image", True, size=100))
+    m.observe(_ok_item("PNG Image", True, size=8))
+    m.observe(_ok_item("Unknown File Type", False))
+    m.observe(_ok_item("ASCII Text", False, text=True))
+    m.observe(_error_item("ENOENT"))
+    m.observe(_error_item("EACCES"))
+    m.observe(_error_item("ENOENT"))
+    m.observe_detection(_ok_item("PNG Image", True, size=100), 0.001)
+    m.observe_detection(_ok_item("PNG Image", True, size=8), 0.001)
+    m.observe_detection(_error_item("ENOENT"), 0.001)
+
+    text = m.render()
+
+    assert "ftcheck_files_scanned_total 4\n" in text
+    assert "ftcheck_files_matched_total 2\n" in text
+    assert "ftcheck_files_unknown_total 1\n" in text
+    assert "ftcheck_files_text_total 1\n" in text
+    assert "ftcheck_bytes_read_total 24\n" in text
+    assert "ftcheck_detect_seconds_count 3\n" in text
+    assert 'ftcheck_errors_total{code="ENOENT"} 2\n' in text
+    assert 'ftcheck_errors_total{code="EACCES"} 1\n' in text
+    assert 'ftcheck_files_by_type_total{file_type="PNG Image"} 2\n' in text
+    assert "# TYPE ftcheck_detect_seconds histogram\n" in text
+
+
+def test_latency_histogram_is_cumulative():
+    m = metrics.ScanMetrics(read_window=16)
+    for seconds in (0.00005, 0.0003, 0.0003, 2.0):
+        m.observe_latency(seconds)
+
+    text = m.render()
+
+    assert 'ftcheck_detect_seconds_bucket{le="0.0001"} 1\n' in text
+    assert 'ftcheck_detect_seconds_bucket{le="0.0005"} 3\n' in text
+    assert 'ftcheck_detect_seconds_bucket{le="1.0"} 3\n' in text
+    assert 'ftcheck_detect_seconds_bucket{le="+Inf"} 4\n' in text
+    assert "ftcheck_detect_seconds_count 4\n" in text
+
+
+def test_label_values_are_escaped():
+    m = metrics.ScanMetrics(read_window=16)
+    m.observe(_ok_item('odd "type"\\', False))
+
+    assert 'file_type="odd \\"type\\"\\\\"' in m.render()
+
+
+def test_textfile_is_rewritten_on_interval_and_close(tmp_path):
+    now = [0.0]
+    path = tmp_path / "ftcheck.prom"
+    m = metrics.ScanMetrics(16, str(path), interval=5.0, clock=lambda: now[0])
+
+    m.observe(_ok_item("PNG Image", True))
+    assert not path.exists()
+    now[0] = 5.0
+    m.observe(_ok_item("PNG Image", True))
+    assert "ftcheck_files_scanned_total 2\n" in path.read_text()
+    assert "ftcheck_scan_running 1\n" in path.read_text()
+
+    m.observe(_ok_item("PNG Image", True))
+    m.close()
+    text = path.read_text()
+    assert "ftcheck_files_scanned_total 3\n" in text
+    assert "ftcheck_scan_running 0\n" in text
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_http_endpoint_serves_metrics():
+    m = metrics.ScanMetrics(read_window=16)
+    port = m.serve("127.0.0.1", 0)
+    try:
+        m.observe(_ok_item("PNG Image", True))
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+            body = resp.read().decode("utf-8")
+            content_type = resp.headers["Content-Type"]
+    finally:
+        m.close()
+
+    assert content_type == metrics.CONTENT_TYPE
+    assert "ftcheck_files_scanned_total 1\n" in body
+
+
+def test_textfile_write_failure_warns_and_scan_continues(tmp_path, capsys):
+    now = [0.0]
+    path = tmp_path / "missing" / "ftcheck.prom"
+    m = metrics.ScanMetrics(16, str(path), interval=5.0, clock=lambda: now[0])
+
+    now[0] = 5.0
+    m.observe(_ok_item("PNG Image", True))
+    m.close()
+
+    err = capsys.readouterr().err.splitlines()
+    assert len(err) == 2
+    assert err[0].startswith(f"ftcheck: error: [EIO] {path} Cannot write metrics file:")
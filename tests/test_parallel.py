@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from filetype_checker import cli, detector, parallel
+from filetype_checker.error import ErrorRecord
+
+PAYLOADS = [
+    b"%PDF-1.4",
+    b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a",
+    b"plain text\n",
+    b"\x00\x11\x22\x33",
+    b"\xff\xd8\xff\xe0",
+]
+
+
+def make_files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"{i:04}.bin"
+        path.write_bytes(PAYLOADS[i % len(PAYLOADS)])
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("classify_text", [False, True])
+def test_encode_decode_round_trip(tmp_path, classify_text):
+    for path in make_files(tmp_path, len(PAYLOADS)):
+        fields = parallel.encode_result(path, classify_text)
+        record = parallel.RECORD.unpack(parallel.RECORD.pack(0, *fields, 0.0))
+
+        report, rule = parallel.decode_result(path, *record[1:-1])
+
+        assert (report, rule) == detector.detect_with_rule(path, classify_text)
+
+
+def test_decode_missing_file_gives_error(tmp_path):
+    missing = str(tmp_path / "missing")
+
+    error, rule = parallel.decode_result(missing, *parallel.encode_result(missing))
+
+    assert error == ErrorRecord("ENOENT", missing)
+    assert error.item()["error"]["message"] == f"File not found: {missing}"
+    assert rule is None
+
+
+def test_decode_read_error_keeps_os_error(tmp_path, monkeypatch):
+    path = str(tmp_path / "bad.bin")
+    failure = ErrorRecord("EIO", path, str(OSError(5, "Input/output error", path)))
+    monkeypatch.setattr(detector, "detect_or_error", lambda *args: failure)
+
+    error, _ = parallel.decode_result(path, *parallel.encode_result(path))
+
+    assert error.item()["error"]["details"] == {
+        "path": path,
+        "os_error": "[Errno 5] Input/output error",
+    }
+
+
+def test_iter_results_matches_serial_detection_in_order(tmp_path):
+    paths = make_files(tmp_path, 300) + [str(tmp_path / "missing")]
+    batches = []
+
+    results = list(
+        parallel.iter_results(
+            paths, 3, classify_text=True, before_batch=batches.append, batch_size=16, ring_slots=8
+        )
+    )
+
+    assert len(results) == len(paths)
+    for path, (report, _) in zip(paths[:-1], results[:-1], strict=True):
+        assert report == detector.detect(path, classify_text=True)
+    assert results[-1][0].code == "ENOENT"
+    assert sum(len(b) for b in batches) == len(paths)
+
+
+def test_iter_results_workers_use_installed_signatures(tmp_path):
+    paths = make_files(tmp_path, 10)
+    pdf = detector.SignatureSet([(0, b"%PDF", "Custom PDF", 1)])
+
+    previous = detector.install_signatures(pdf)
+    try:
+        results = list(parallel.iter_results(paths, 2, batch_size=2))
+    finally:
+        detector.install_signatures(previous)
+
+    labels = [report["file_type"] for report, _ in results]
+    assert labels[::5] == ["Custom PDF", "Custom PDF"]
+    assert all(report["magic"]["db_version"] == pdf.version for report, _ in results)
+
+
+def test_iter_results_can_be_closed_early(tmp_path):
+    results = parallel.iter_results(make_files(tmp_path, 100), 2, batch_size=4, ring_slots=4)
+
+    next(results)
+    results.close()
+
+
+def test_cli_workers_output_matches_serial(tmp_path, capsys):
+    make_files(tmp_path, 40)
+
+    serial_code = cli.main([str(tmp_path), "--json", "--classify-text"])
+    serial = json.loads(capsys.readouterr().out)
+    pooled_code = cli.main([str(tmp_path), "--json", "--classify-text", "--workers", "2"])
+    pooled = json.loads(capsys.readouterr().out)
+
+    assert pooled_code == serial_code
+    assert pooled == serial
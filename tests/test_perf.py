@@ -0,0 +1,52 @@
+import contextlib
+import io
+
+import pytest
+
+from filetype_checker import cli, detector, scanner
+
+pytestmark = pytest.mark.perf
+
+HEADERS = [
+    b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a",
+    b"\xff\xd8\xff\xe0\x00\x10JF",
+    b"GIF89a\x01\x00",
+    b"%PDF-1.7",
+    b"PK\x03\x04\x14\x00\x00\x00",
+    b"\x00\x11\x22\x33\x44\x55\x66\x77",
+]
+TREE_FILES = 2000
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    root = tmp_path_factory.mktemp("perf_tree")
+    for i in range(TREE_FILES):
+        sub = root / f"d{i % 20:02}" / f"e{i % 7}"
+        sub.mkdir(parents=True, exist_ok=True)
+        (sub / f"{i:05}.bin").write_bytes(HEADERS[i % len(HEADERS)] + b"\x00" * 64)
+    return root
+
+
+def test_perf_match_magic(perf):
+    headers = HEADERS * 1000
+
+    perf.measure("match_magic", lambda: [detector.match_magic(h) for h in headers], len(headers))
+
+
+def test_perf_expand_paths(perf, tree):
+    perf.measure("expand_paths", lambda: scanner.expand_paths([str(tree)], True), TREE_FILES)
+
+
+def test_perf_detect(perf, tree):
+    files, _ = scanner.expand_paths([str(tree)], True)
+
+    perf.measure("detect", lambda: [detector.detect(f) for f in files], len(files))
+
+
+def test_perf_cli_json(perf, tree):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            cli.main([str(tree), "-r", "--json"])
+
+    perf.measure("cli_main_json", run, TREE_FILES, repeat=3)
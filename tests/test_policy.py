@@ -0,0 +1,121 @@
+import json
+import os
+import time
+
+import pytest
+
+from filetype_checker import policy
+from filetype_checker.error import PolicyError
+
+
+def _item(path: str, file_type: str, size: int = 10, ext: str = "", mismatch: bool = False):
+    return {
+        "ok": True,
+        "path": path,
+        "file_type": file_type,
+        "size_bytes": size,
+        "ext": ext,
+        "mismatch": mismatch,
+    }
+
+
+def _policy(tmp_path, rules) -> policy.Policy:
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"rules": rules}))
+    return policy.load_policy(str(path))
+
+
+def test_rules_apply_by_type_extension_prefix_and_size(tmp_path):
+    p = _policy(
+        tmp_path,
+        [
+            {
+                "id": "zip-as-image",
+                "types": ["ZIP Archive"],
+                "extensions": ["png", ".JPG"],
+                "deny": True,
+            },
+            {"id": "uploads", "prefix": "/srv/uploads", "allow_types": ["PNG Image"]},
+            {"id": "big-pdf", "types": ["PDF Document"], "max_size": 100},
+            {"id": "mismatch", "mismatch": True, "message": "wrong extension"},
+        ],
+    )
+
+    assert p.evaluate(_item("/x/a.png", "ZIP Archive", ext=".png")) == [
+        {"rule": "zip-as-image", "message": "ZIP Archive with extension '.png' is denied"}
+    ]
+    assert p.evaluate(_item("/x/a.zip", "ZIP Archive", ext=".zip")) == []
+    violations = p.evaluate(_item("/srv/uploads/a/b.pdf", "PDF Document", 500))
+    assert [v["rule"] for v in violations] == ["uploads", "big-pdf"]
+    assert p.evaluate(_item("/srv/uploads/ok.png", "PNG Image")) == []
+    assert p.evaluate(_item("/srv/uploadsX/b.pdf", "PDF Document")) == []
+    item = _item("/y/c.gif", "PNG Image", ext=".gif", mismatch=True)
+    assert p.evaluate(item) == [{"rule": "mismatch", "message": "wrong extension"}]
+    assert item["violations"] == [{"rule": "mismatch", "message": "wrong extension"}]
+    assert p.hit_counts() == {"zip-as-image": 1, "uploads": 1, "big-pdf": 1, "mismatch": 1}
+
+
+def test_relative_paths_match_prefixes_against_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    p = _policy(tmp_path, [{"id": "in-data", "prefix": "data", "deny": True}])
+
+    assert p.evaluate(_item("data/x.bin", "Unknown File Type"))[0]["rule"] == "in-data"
+    assert p.evaluate(_item("./data/x.bin", "Unknown File Type"))[0]["rule"] == "in-data"
+    assert p.evaluate(_item(os.path.join(str(tmp_path), "other", "x"), "Unknown File Type")) == []
+
+
+def test_dot_dot_components_are_resolved_before_matching(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    p = _policy(tmp_path, [{"id": "in-data", "prefix": "data", "deny": True}])
+
+    assert p.evaluate(_item("data/../other/x.bin", "Unknown File Type")) == []
+    escaped = os.path.join(str(tmp_path), "data", "..", "x.bin")
+    assert p.evaluate(_item(escaped, "Unknown File Type")) == []
+    assert p.evaluate(_item("other/../data/x.bin", "Unknown File Type"))[0]["rule"] == "in-data"
+
+
+@pytest.mark.parametrize(
+    "rules, message",
+    [
+        ([{"id": "a"}], "exactly one"),
+        ([{"id": "a", "deny": True, "max_size": 3}], "exactly one"),
+        ([{"id": "a", "max_size": -1}], "non-negative"),
+        ([{"id": "a", "deny": True, "colour": "red"}], "unknown keys"),
+        ([{"id": "a", "deny": True, "types": []}], "non-empty list"),
+        ([{"id": "a", "deny": True}, {"id": "a", "mismatch": True}], "Duplicate"),
+        ([{"deny": True}], "id"),
+    ],
+)
+def test_invalid_rules_raise_policy_error(tmp_path, rules, message):
+    with pytest.raises(PolicyError, match=message):
+        _policy(tmp_path, rules)
+
+
+def test_unreadable_policy_raises_policy_error(tmp_path):
+    (tmp_path / "bad.json").write_text("{not json")
+    with pytest.raises(PolicyError) as excinfo:
+        policy.load_policy(str(tmp_path / "bad.json"))
+    assert excinfo.value.code == "POLICY"
+    with pytest.raises(PolicyError):
+        policy.load_policy(str(tmp_path / "missing.json"))
+
+
+def test_thousands_of_rules_stay_fast(tmp_path):
+    rules = [
+        {"id": f"dir-{i}", "prefix": f"/data/team{i}", "allow_types": ["PNG Image"]}
+        for i in range(3000)
+    ]
+    rules += [
+        {"id": f"ext-{i}", "types": ["ZIP Archive"], "extensions": [f".x{i}"], "deny": True}
+        for i in range(3000)
+    ]
+    p = _policy(tmp_path, rules)
+    items = [_item(f"/data/team{i % 4000}/f.pdf", "PDF Document", ext=".pdf") for i in range(4000)]
+
+    start = time.perf_counter()
+    hits = sum(bool(p.evaluate(item)) for item in items)
+    elapsed = time.perf_counter() - start
+
+    assert hits == 3000
+    # A linear scan over 6000 rules would take far longer than this
+    assert elapsed < 0.5
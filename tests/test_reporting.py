@@ -0,0 +1,137 @@
+import io
+import json
+import time
+
+import pytest
+
+from filetype_checker import reporting
+from filetype_checker.error import ErrorRecord
+
+
+def test_format_tsv_escapes_and_fills_fixed_columns():
+    success = {
+        "ok": True,
+        "path": "dir/a\tb\\c.png",
+        "file_type": "PNG Image",
+        "size_bytes": 12,
+        "magic": {"matched": True, "offset": 0, "signature": "89504E47"},
+        "ext": ".png",
+        "mismatch": False,
+    }
+    error = {"ok": False, "path": "x\ny", "error": {"code": "ENOENT", "message": "File not found"}}
+
+    success_cols = reporting.format_tsv(success).rstrip("\n").split("\t")
+    error_cols = reporting.format_tsv(error).rstrip("\n").split("\t")
+
+    assert len(success_cols) == len(error_cols) == len(reporting.TSV_COLUMNS)
+    assert dict(zip(reporting.TSV_COLUMNS, success_cols, strict=True)) == {
+        "path": "dir/a\\tb\\\\c.png",
+        "ok": "1",
+        "file_type": "PNG Image",
+        "size_bytes": "12",
+        "matched": "1",
+        "offset": "0",
+        "signature": "89504E47",
+        "ext": ".png",
+        "mismatch": "0",
+        "error_code": "",
+        "error_message": "",
+    }
+    assert error_cols[0] == "x\\ny"
+    assert error_cols[1] == "0"
+    assert error_cols[-2:] == ["ENOENT", "File not found"]
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_line_writer_batches_until_size_or_interval():
+    now = [0.0]
+    stream = CountingStream()
+    writer = reporting.LineWriter(stream, buffer_size=10, flush_interval=5.0, clock=lambda: now[0])
+
+    writer.write("abc\n")
+    writer.write("def\n")
+    assert stream.writes == 0
+    writer.write("ghi\n")
+    assert (stream.writes, stream.getvalue()) == (1, "abc\ndef\nghi\n")
+
+    writer.write("j\n")
+    now[0] = 5.0
+    writer.write("k\n")
+    assert (stream.writes, stream.getvalue()) == (2, "abc\ndef\nghi\nj\nk\n")
+
+    writer.write("tail\n")
+    writer.close()
+    assert stream.getvalue().endswith("k\ntail\n")
+    assert not stream.closed
+
+
+def test_line_writer_flushes_on_deadline_without_further_writes():
+    stream = CountingStream()
+    writer = reporting.LineWriter(stream, flush_interval=0.05)
+
+    writer.write("a\n")
+    deadline = time.monotonic() + 5
+    while not stream.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    flushed = stream.getvalue()
+    writer.close()
+
+    assert flushed == "a\n"
+
+
+def test_line_writer_raises_timer_write_errors_on_next_call():
+    class BrokenStream(io.StringIO):
+        def write(self, text):
+            raise BrokenPipeError
+
+    writer = reporting.LineWriter(BrokenStream(), flush_interval=0.05)
+    writer.write("a\n")
+    deadline = time.monotonic() + 5
+    while writer._timer.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with pytest.raises(BrokenPipeError):
+        writer.write("b\n")
+    with pytest.raises(BrokenPipeError):
+        writer.close()
+
+
+def test_line_writer_zero_interval_writes_every_line():
+    stream = CountingStream()
+    writer = reporting.LineWriter(stream, flush_interval=0)
+
+    writer.write("a\n")
+    writer.write("b\n")
+
+    assert stream.writes == 2
+
+
+def test_error_groups_count_by_code_and_keep_first_examples():
+    groups = reporting.ErrorGroups(examples=2)
+    for name in ("a", "b", "c"):
+        groups.add(ErrorRecord("EACCES", name))
+    groups.add({"ok": False, "path": "d", "error": {"code": "ENOENT"}})
+
+    assert groups.summary() == [
+        {"code": "EACCES", "count": 3, "examples": ["a", "b"]},
+        {"code": "ENOENT", "count": 1, "examples": ["d"]},
+    ]
+    assert groups.format_human() == [
+        "ftcheck: error: [EACCES] 3 errors (a, b, ...)",
+        "ftcheck: error: [ENOENT] 1 error (d)",
+    ]
+
+
+def test_format_json_serializes_error_records():
+    record = ErrorRecord("EACCES", "/x")
+
+    assert json.loads(reporting.format_json({"results": [record]})) == {"results": [record.item()]}
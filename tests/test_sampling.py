@@ -0,0 +1,139 @@
+import json
+import random
+
+import pytest
+
+from filetype_checker import cli, sampling
+from filetype_checker.error import PathNotFoundError
+
+PDF = b"%PDF-1.4"
+PNG = b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a"
+
+
+def test_iter_directories_keeps_each_directory_in_one_list(tmp_path):
+    for rel in ["a/1", "a/2", "a/b/3", "a/4", "c/5"]:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(PDF)
+
+    entries = list(sampling.iter_directories([str(tmp_path), str(tmp_path / "gone")], True))
+
+    assert entries[:3] == [
+        [str(tmp_path / "a" / n) for n in ("1", "2", "4")],
+        [str(tmp_path / "a" / "b" / "3")],
+        [str(tmp_path / "c" / "5")],
+    ]
+    assert entries[3].code == "ENOENT"
+
+
+def test_iter_strata_merges_small_directories():
+    problem = PathNotFoundError("gone")
+    directories = [["a/1"], problem, ["b/1", "b/2", "b/3"], ["c/1"] * 4, ["d/1"]]
+
+    strata = list(sampling.iter_strata(directories, 0.5))
+
+    assert strata == [problem, ["a/1", "b/1", "b/2", "b/3"], ["c/1"] * 4, ["d/1"]]
+
+
+def test_stratified_sampler_allocates_proportionally():
+    rng = random.Random(1)
+    sampler = sampling.StratifiedSampler(0.1, rng)
+    directories = ([f"d{d}/{i}" for i in range(d % 7 + 1)] for d in range(500))
+    strata = list(sampling.iter_strata(directories, 0.1))
+
+    sizes = [len(sampler.sample(group)) for group in strata]
+    population = sum(map(len, strata))
+
+    assert all(size >= 2 for size in sizes)
+    # Only the topped-up last stratum may push the total past rate * population
+    assert abs(sum(sizes) - 0.1 * population) <= 2
+    picked = sampler.sample([f"e/{i}" for i in range(40)])
+    assert picked == sorted(picked, key=lambda p: int(p[2:]))
+
+
+def test_reservoir_sample_is_uniform_sized_and_reports_problems():
+    problems = []
+    entries = [f"f{i:03}" for i in range(100)] + [PathNotFoundError("gone")]
+
+    population, chosen = sampling.reservoir_sample(entries, 10, random.Random(0), problems.append)
+
+    assert population == 100
+    assert len(chosen) == 10 and len(set(chosen)) == 10
+    assert len(problems) == 1
+
+
+def test_estimator_census_has_zero_width_interval():
+    est = sampling.ProportionEstimator()
+    est.add_stratum(4, ["PDF", "PDF", "PNG", "PDF"])
+
+    out = est.estimates()
+
+    assert out["PDF"] == {
+        "proportion": 0.75,
+        "ci_low": 0.75,
+        "ci_high": 0.75,
+        "estimated_files": 3,
+    }
+
+
+def test_estimator_single_sample_from_larger_stratum_gives_full_interval():
+    est = sampling.ProportionEstimator()
+    est.add_stratum(1, ["PDF"])
+    assert est.estimates()["PDF"]["ci_low"] == 1.0
+
+    est.add_stratum(10, ["PNG"])
+    out = est.estimates()
+
+    assert (out["PNG"]["ci_low"], out["PNG"]["ci_high"]) == (0.0, 1.0)
+
+
+def test_estimator_weights_strata_by_population():
+    est = sampling.ProportionEstimator()
+    est.add_stratum(100, ["PDF", "PNG"])
+    est.add_stratum(300, ["PNG", "PNG"])
+
+    out = est.estimates()
+
+    assert est.population == 400 and est.sampled == 4
+    assert out["PDF"]["proportion"] == pytest.approx(50 / 400)
+    assert out["PNG"]["estimated_files"] == 350
+    # Stratum 1: N^2 * fpc * p(1-p)/(n-1) = 100^2 * 0.98 * 0.25
+    half_width = 1.96 * (100**2 * 0.98 * 0.25) ** 0.5 / 400
+    assert out["PDF"]["ci_high"] == pytest.approx(50 / 400 + half_width, abs=1e-6)
+
+
+def test_cli_sample_reports_estimates(tmp_path, capsys):
+    for d in range(4):
+        sub = tmp_path / f"d{d}"
+        sub.mkdir()
+        for i in range(10):
+            (sub / f"{i}.bin").write_bytes(PDF if i < 5 else PNG)
+
+    exit_code = cli.main([str(tmp_path), "-r", "--json", "--sample", "0.5", "--seed", "3"])
+    doc = json.loads(capsys.readouterr().out)
+
+    sample = doc["summary"]["sample"]
+    assert exit_code == 0
+    assert sample["method"] == "stratified"
+    assert sample["population"] == 40
+    assert sample["sampled"] == 20
+    assert doc["summary"]["files_scanned"] == 20
+    shares = sum(e["proportion"] for e in sample["estimates"].values())
+    assert shares == pytest.approx(1.0)
+
+
+def test_cli_sample_count_human_output(tmp_path, capsys):
+    for i in range(20):
+        (tmp_path / f"{i}.pdf").write_bytes(PDF)
+
+    exit_code = cli.main([str(tmp_path), "--sample-count", "5", "--seed", "1"])
+    captured = capsys.readouterr()
+
+    assert exit_code == 0
+    assert len(captured.out.splitlines()) == 5
+    assert "Sampled: 5 of 20 files" in captured.err
+    assert "PDF Document: 100.00%" in captured.err
+
+
+def test_cli_sample_options_are_exclusive(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path), "--sample", "0.1", "--sample-count", "5"])
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from filetype_checker import scandiff
+from filetype_checker.error import ScanDiffError
+
+
+def ok_item(path, file_type="PDF Document", size=8, mismatch=False):
+    return {
+        "ok": True,
+        "path": path,
+        "file_type": file_type,
+        "size_bytes": size,
+        "magic": {"matched": True, "offset": 0, "signature": "255044462D"},
+        "ext": ".pdf",
+        "mismatch": mismatch,
+    }
+
+
+def error_item(path, code="EACCES"):
+    return {"ok": False, "path": path, "error": {"code": code, "message": "x", "details": {}}}
+
+
+def write_document(path, items):
+    doc = {"ok": True, "summary": {"inputs": 1, "files_scanned": len(items)}, "results": items}
+    path.write_text(json.dumps(doc, indent=2))
+
+
+def write_ndjson(path, items):
+    path.write_text("".join(json.dumps(item) + "\n" for item in items))
+
+
+@pytest.mark.parametrize("chunk", [3, 1 << 20])
+def test_iter_items_streams_json_document(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(scandiff, "_CHUNK", chunk)
+    items = [ok_item("a", size=123456), error_item("b"), ok_item("c")]
+    doc = tmp_path / "scan.json"
+    write_document(doc, items)
+
+    assert list(scandiff.iter_items(str(doc))) == items
+
+
+def test_iter_items_reads_ndjson(tmp_path):
+    items = [ok_item("a"), error_item("b")]
+    out = tmp_path / "scan.ndjson"
+    write_ndjson(out, items)
+
+    assert list(scandiff.iter_items(str(out))) == items
+
+
+def test_diff_reports_added_removed_and_changed(tmp_path):
+    old = tmp_path / "old.json"
+    new = tmp_path / "new.ndjson"
+    write_document(
+        old, [error_item("z"), ok_item("a"), ok_item("b"), ok_item("c", "PNG Image", 8, True)]
+    )
+    write_ndjson(
+        new,
+        [ok_item("d", mismatch=True), ok_item("a"), ok_item("b", "GIF Image", 6, True)],
+    )
+
+    counts = scandiff.new_counts()
+    with scandiff.sorted_entries(str(old)) as a, scandiff.sorted_entries(str(new)) as b:
+        changes = list(scandiff.diff_entries(a, b, counts))
+
+    assert changes == [
+        {
+            "change": "changed",
+            "path": "b",
+            "file_type": ["PDF Document", "GIF Image"],
+            "size_bytes": [8, 6],
+            "mismatch": [False, True],
+        },
+        {
+            "change": "removed",
+            "path": "c",
+            "file_type": "PNG Image",
+            "size_bytes": 8,
+            "mismatch": True,
+        },
+        {
+            "change": "added",
+            "path": "d",
+            "file_type": "PDF Document",
+            "size_bytes": 8,
+            "mismatch": True,
+        },
+        {"change": "removed", "path": "z", "error": "EACCES"},
+    ]
+    assert counts == {
+        "added": 1,
+        "removed": 2,
+        "changed": 1,
+        "unchanged": 1,
+        "type_changes": 1,
+        "size_changes": 1,
+        "new_mismatches": 2,
+    }
+
+
+def test_sorted_entries_spill_to_runs(tmp_path):
+    items = [ok_item(f"{i:04}", size=i) for i in reversed(range(500))]
+    out = tmp_path / "scan.ndjson"
+    write_ndjson(out, items)
+
+    with scandiff.sorted_entries(str(out), memory_limit=4096, tmpdir=str(tmp_path)) as sorter:
+        assert sorter.runs
+        entries = list(sorter)
+
+    assert [path for path, _ in entries] == [f"{i:04}" for i in range(500)]
+    assert entries[7] == ("0007", ("PDF Document", 7, False, None))
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"ok": true, "summary": {}, "results": [{"ok": tru',
+        '{"ok": true, "summary": {}, "results": [1 2]}',
+        '{"ok": true, "path": "a"}\nnot json\n',
+        '[1, 2]\n',
+        '{"ok": true, "path": "a", "file_type": "X", "size_bytes": "8"}\n',
+    ],
+)
+def test_invalid_input_raises_scan_diff_error(tmp_path, text):
+    bad = tmp_path / "bad.json"
+    bad.write_text(text)
+
+    with pytest.raises(ScanDiffError):
+        scandiff.sorted_entries(str(bad)).close()
@@ -1,3 +1,7 @@
+import io
+import os
+
+import pytest
 
 from filetype_checker import scanner
 from filetype_checker.error import FtcheckError
@@ -71,4 +75,200 @@ def test_expand_path_missing_returns_problem(tmp_path):
     err = problems[0]
     assert isinstance(err, FtcheckError)
     assert err.code == "ENOENT"
-    assert (err.details or {}).get("path") == str(missing_path)
\ No newline at end of file
+    assert (err.details or {}).get("path") == str(missing_path)
+
+
+def _make_tree(root):
+    for rel in ["a.bin", "b/c.bin", "b/d/e.bin", "b.txt", "c/f.bin", "c/g.bin", "z.bin"]:
+        write_bytes(root / rel, b"x")
+
+
+def test_tree_walker_matches_expand_paths_in_sorted_order(tmp_path):
+    _make_tree(tmp_path)
+
+    expected, _ = scanner.expand_paths([str(tmp_path)], recursive=True)
+    walked = list(scanner.TreeWalker([str(tmp_path)], recursive=True))
+
+    assert walked == expected
+
+
+def test_iter_scan_path_yields_files_in_sorted_path_order(tmp_path):
+    _make_tree(tmp_path)
+    write_bytes(tmp_path / "b-x.bin", b"x")
+    write_bytes(tmp_path / "b-x" / "h.bin", b"x")
+
+    walked = [
+        file_path
+        for files, _ in scanner.iter_scan_path(str(tmp_path), recursive=True)
+        for file_path, _ in files
+    ]
+
+    assert walked == sorted(walked)
+    assert len(walked) == 9
+
+
+@pytest.mark.parametrize("recursive", [True, False])
+def test_tree_walker_merges_overlapping_roots_like_expand_paths(tmp_path, recursive):
+    _make_tree(tmp_path)
+    write_bytes(tmp_path / "b-x.bin", b"x")
+    roots = [
+        str(tmp_path / "c"),
+        str(tmp_path),
+        str(tmp_path / "b"),
+        str(tmp_path / "b" / "d"),
+        str(tmp_path / "b" / "c.bin"),
+        str(tmp_path) + os.sep,
+    ]
+
+    expected, _ = scanner.expand_paths(roots, recursive)
+    walked = list(scanner.TreeWalker(roots, recursive))
+
+    assert walked == expected
+    assert len(set(walked)) == len(walked)
+
+
+def test_tree_walker_non_recursive_skips_subdirectories(tmp_path):
+    _make_tree(tmp_path)
+
+    walked = list(scanner.TreeWalker([str(tmp_path)], recursive=False))
+
+    assert walked == [str(tmp_path / n) for n in ["a.bin", "b.txt", "z.bin"]]
+
+
+def test_tree_walker_resumes_from_saved_state(tmp_path):
+    _make_tree(tmp_path)
+    missing = str(tmp_path / "missing")
+    paths = [str(tmp_path / "b"), missing, str(tmp_path)]
+    full = list(scanner.TreeWalker(paths, recursive=True))
+    expected, _ = scanner.expand_paths(paths, recursive=True)
+    assert [x for x in full if isinstance(x, str)] == expected
+
+    for stop in range(1, len(full)):
+        walker = scanner.TreeWalker(paths, recursive=True)
+        it = iter(walker)
+        head = [next(it) for _ in range(stop)]
+        tail = list(scanner.TreeWalker(paths, recursive=True, state=walker.state()))
+
+        assert [str(x) for x in head + tail] == [str(x) for x in full]
+
+
+def test_tree_walker_state_is_the_last_path(tmp_path):
+    for i in range(50):
+        write_bytes(tmp_path / "wide" / f"{i:03}.bin", b"x")
+
+    walker = scanner.TreeWalker([str(tmp_path)], recursive=True)
+    it = iter(walker)
+    for _ in range(25):
+        next(it)
+
+    assert walker.state() == {"after": str(tmp_path / "wide" / "024.bin")}
+
+
+def test_scan_paths_gives_hard_links_the_same_file_id(tmp_path):
+    write_bytes(tmp_path / "a.bin", b"data")
+    os.link(tmp_path / "a.bin", tmp_path / "b.bin")
+    write_bytes(tmp_path / "c.bin", b"data")
+
+    files, problems = scanner.scan_paths([str(tmp_path)], recursive=True)
+
+    ids = dict(files)
+    assert problems == []
+    assert ids[str(tmp_path / "a.bin")] == ids[str(tmp_path / "b.bin")]
+    assert ids[str(tmp_path / "a.bin")] != ids[str(tmp_path / "c.bin")]
+
+
+def test_scan_paths_does_not_enter_linked_dirs_by_default(tmp_path):
+    write_bytes(tmp_path / "real" / "a.bin", b"x")
+    os.symlink(tmp_path / "real", tmp_path / "link")
+
+    files, problems = scanner.expand_paths([str(tmp_path)], recursive=True)
+
+    assert problems == []
+    assert files == [str(tmp_path / "real" / "a.bin")]
+
+
+def test_scan_paths_follow_symlinks_lists_every_alias_and_stops_at_cycles(tmp_path):
+    write_bytes(tmp_path / "real" / "a.bin", b"x")
+    os.symlink(tmp_path / "real", tmp_path / "link")
+    # A link back to the root would loop forever without the cycle check
+    os.symlink(tmp_path, tmp_path / "real" / "loop")
+
+    files, problems = scanner.scan_paths([str(tmp_path)], recursive=True, follow_symlinks=True)
+
+    assert problems == []
+    st = os.stat(tmp_path / "real" / "a.bin")
+    assert files == [
+        (str(tmp_path / "link" / "a.bin"), (st.st_dev, st.st_ino)),
+        (str(tmp_path / "real" / "a.bin"), (st.st_dev, st.st_ino)),
+    ]
+
+
+def test_scan_paths_follow_symlinks_reports_broken_links(tmp_path):
+    write_bytes(tmp_path / "a.bin", b"x")
+    os.symlink(tmp_path / "missing.bin", tmp_path / "broken.bin")
+    os.symlink(tmp_path / "a.bin", tmp_path / "alias.bin")
+
+    files, problems = scanner.scan_paths([str(tmp_path)], recursive=True, follow_symlinks=True)
+
+    ids = dict(files)
+    assert sorted(ids) == [str(tmp_path / "a.bin"), str(tmp_path / "alias.bin")]
+    assert ids[str(tmp_path / "a.bin")] == ids[str(tmp_path / "alias.bin")]
+    assert [p.code for p in problems] == ["ENOENT"]
+    assert problems[0].details["path"] == str(tmp_path / "broken.bin")
+
+
+def test_scan_paths_threaded_matches_serial(tmp_path):
+    _make_tree(tmp_path)
+    for i in range(20):
+        write_bytes(tmp_path / "wide" / f"d{i:02}" / "x.bin", b"x")
+        os.symlink(tmp_path / "c", tmp_path / "wide" / f"d{i:02}" / "back")
+        os.symlink(tmp_path / f"missing{i}", tmp_path / "wide" / f"d{i:02}" / "broken")
+
+    for follow in (False, True):
+        serial = scanner.scan_paths([str(tmp_path)], recursive=True, follow_symlinks=follow)
+        for _ in range(3):
+            threaded = scanner.scan_paths(
+                [str(tmp_path)], recursive=True, follow_symlinks=follow, threads=8
+            )
+            assert threaded == serial
+        if follow:
+            assert len(serial[1]) == 20
+            assert str(tmp_path / "wide" / "d07" / "back" / "f.bin") in dict(serial[0])
+
+
+def test_scan_paths_threaded_reports_unreadable_dirs(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    real_scandir = os.scandir
+
+    def failing_scandir(path):
+        if path == str(tmp_path / "b"):
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(scanner.os, "scandir", failing_scandir)
+
+    files, problems = scanner.expand_paths([str(tmp_path)], recursive=True, threads=4)
+
+    assert str(tmp_path / "c" / "f.bin") in files
+    assert not any(f.startswith(str(tmp_path / "b") + os.sep) for f in files)
+    assert [p.code for p in problems] == ["EACCES"]
+    assert problems[0].details["path"] == str(tmp_path / "b")
+
+
+def test_path_list_splits_across_chunks():
+    data = "a/one.bin\0\0b/twö.bin\0c/three\nlines.bin".encode()
+    path_list = scanner.PathList(io.BytesIO(data), null=True, chunk_size=3)
+
+    assert list(path_list) == ["a/one.bin", "b/twö.bin", "c/three\nlines.bin"]
+    assert path_list.count == 3
+
+    lines = scanner.PathList(io.BytesIO(b"x.bin\n\ny.bin\n"), chunk_size=4)
+    assert list(lines) == ["x.bin", "y.bin"]
+
+
+def test_path_list_reads_lazily():
+    stream = io.BytesIO(b"first\nsecond\nthird\n")
+    it = iter(scanner.PathList(stream, chunk_size=6))
+
+    assert next(it) == "first"
+    assert stream.tell() == 6
@@ -0,0 +1,149 @@
+import json
+import threading
+
+import pytest
+
+from filetype_checker import cli, detector
+from filetype_checker.error import ErrorRecord
+from filetype_checker.session import Session
+
+
+def make_tree(root) -> None:
+    (root / "sub").mkdir()
+    (root / "a.pdf").write_bytes(b"%PDF-1.4")
+    (root / "b.png").write_bytes(b"GIF89a")
+    (root / "c.txt").write_bytes(b"plain text\n")
+    (root / "sub" / "d.gif").write_bytes(b"GIF89a")
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_scan_matches_cli_results(tmp_path, capsys, threads):
+    make_tree(tmp_path)
+    cli.main(["--json", "-r", str(tmp_path)])
+    expected = json.loads(capsys.readouterr().out)["results"]
+
+    with Session(recursive=True, threads=threads) as session:
+        items = list(session.scan(str(tmp_path)))
+
+    assert sorted(items, key=lambda item: item["path"]) == expected
+    assert session.stats()["files_scanned"] == 4
+
+
+def test_scan_reports_path_problems_as_error_items(tmp_path):
+    missing = [str(tmp_path / "missing1"), tmp_path / "missing2"]
+
+    with Session(recursive=True) as session:
+        items = list(session.scan(missing))
+
+    assert [(item["path"], item["error"]["code"]) for item in items] == [
+        (str(path), "ENOENT") for path in missing
+    ]
+    assert session.stats()["errors"] == 2
+
+
+def test_unreadable_file_gives_error_record(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4")
+    target = tmp_path / "b.pdf"
+    target.write_bytes(b"%PDF-1.4")
+
+    with Session() as session:
+        scan = session.scan(str(tmp_path))
+        assert next(scan)["file_type"] == "PDF Document"
+        target.unlink()
+        rest = list(scan)
+
+    assert rest == [ErrorRecord("ENOENT", str(target))]
+
+
+def test_cache_reuses_results_until_file_changes(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "link.pdf").hardlink_to(tmp_path / "a.pdf")
+
+    with Session(cache_size=100) as session:
+        first = list(session.scan(str(tmp_path)))
+        assert session.stats()["cache_hits"] == 1  # the hard link
+        second = list(session.scan(str(tmp_path)))
+        assert session.stats()["cache_hits"] == 5
+        assert second == first
+
+        (tmp_path / "a.pdf").write_bytes(b"\x89PNG\r\n\x1a\n\x00")
+        changed = {item["path"]: item for item in session.scan(str(tmp_path))}
+
+    assert changed[str(tmp_path / "a.pdf")]["file_type"] == "PNG Image"
+    assert changed[str(tmp_path / "a.pdf")]["mismatch"] is True
+    assert changed[str(tmp_path / "link.pdf")]["file_type"] == "PNG Image"
+
+
+def test_cache_hits_are_new_items(tmp_path):
+    make_tree(tmp_path)
+
+    with Session(cache_size=100) as session:
+        first = {item["path"]: item for item in session.scan(str(tmp_path))}
+        first[str(tmp_path / "a.pdf")]["file_type"] = "changed"
+        again = {item["path"]: item for item in session.scan(str(tmp_path))}
+
+    assert again[str(tmp_path / "a.pdf")]["file_type"] == "PDF Document"
+    assert session.stats()["cache_hits"] == 3
+
+
+def test_cache_is_bounded_and_keyed_by_signature_version(tmp_path):
+    make_tree(tmp_path)
+
+    with Session(cache_size=2) as session:
+        list(session.scan(str(tmp_path)))
+        assert len(session._cache) == 2
+
+        session.signatures = detector.SignatureSet([(0, b"%PDF", "Custom PDF", 1)])
+        items = {item["path"]: item for item in session.scan(str(tmp_path / "a.pdf"))}
+
+    item = items[str(tmp_path / "a.pdf")]
+    assert item["file_type"] == "Custom PDF"
+    assert item["magic"]["db_version"] == session.signatures.version
+    assert session.stats()["cache_hits"] == 0
+
+
+def test_concurrent_scans_share_one_session(tmp_path):
+    make_tree(tmp_path)
+    results = []
+
+    with Session(recursive=True, threads=2, cache_size=10) as session:
+        expected = list(session.scan(str(tmp_path)))
+
+        def scan() -> None:
+            results.append(list(session.scan(str(tmp_path))))
+
+        threads = [threading.Thread(target=scan) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert results == [expected] * 8
+    assert session.stats()["files_scanned"] == 36
+
+
+def test_close_leaves_readers_of_running_scans_open(tmp_path):
+    make_tree(tmp_path)
+    closed = []
+
+    session = Session()
+    scan = session.scan(str(tmp_path))
+    first = next(scan)
+    lent = list(session._readers)
+    for reader in lent:
+        reader.close = lambda reader=reader: closed.append(reader)
+    session.close()
+
+    assert closed == []
+    rest = list(scan)
+    assert closed == lent
+    assert [item["ok"] for item in [first, *rest]] == [True] * 3
+
+
+def test_closed_session_rejects_scans(tmp_path):
+    session = Session(threads=2)
+    list(session.scan(str(tmp_path)))
+    session.close()
+
+    with pytest.raises(ValueError):
+        session.scan(str(tmp_path))
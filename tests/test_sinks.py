@@ -0,0 +1,167 @@
+import csv
+import sqlite3
+
+import pytest
+
+from filetype_checker import cli, sinks
+
+
+def make_tree(root):
+    (root / "a.png").write_bytes(b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a")
+    (root / "b.jpg").write_bytes(b"%PDF-1.4")
+    (root / "c.bin").write_bytes(b"\x00\x01\x02")
+
+
+def test_item_row_flattens_success_and_error_items():
+    success = {
+        "ok": True,
+        "path": "x.pdf",
+        "file_type": "PDF Document",
+        "size_bytes": 10,
+        "magic": {"matched": True, "offset": 0, "signature": "255044462D"},
+        "ext": ".pdf",
+        "mismatch": False,
+    }
+    error = {
+        "ok": False,
+        "path": "y",
+        "error": {"code": "ENOENT", "message": "File not found: y", "details": {"path": "y"}},
+    }
+
+    row = dict(zip(sinks.COLUMN_NAMES, sinks.item_row(success), strict=True))
+    err_row = dict(zip(sinks.COLUMN_NAMES, sinks.item_row(error), strict=True))
+
+    assert row["magic_signature"] == "255044462D"
+    assert row["mismatch"] == 0 and row["error_code"] is None
+    assert err_row["ok"] == 0
+    assert err_row["error_details"] == '{"path": "y"}'
+
+
+def test_sqlite_sink_commits_in_batches(tmp_path):
+    db = tmp_path / "out.db"
+    item = {"ok": False, "path": "p", "error": {"code": "EIO", "message": "m"}}
+
+    sink = sinks.SqliteSink(str(db), batch_size=3)
+    for _ in range(4):
+        sink.write(item)
+    # The first full batch is visible to other connections before close
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM ftcheck_results").fetchone() == (3,)
+    sink.close()
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM ftcheck_results").fetchone() == (4,)
+
+
+def test_cli_output_sqlite(tmp_path, capsys):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    make_tree(tree)
+    db = tmp_path / "scan.db"
+
+    exit_code = cli.main([str(tree), "-o", f"sqlite:{db}", "--batch-size", "2"])
+    captured = capsys.readouterr()
+
+    assert exit_code == 1
+    assert captured.out == ""
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute(
+            "SELECT path, file_type, mismatch FROM ftcheck_results ORDER BY path"
+        ).fetchall()
+        summary = dict(conn.execute("SELECT key, value FROM ftcheck_summary"))
+    assert rows == [
+        (str(tree / "a.png"), "PNG Image", 0),
+        (str(tree / "b.jpg"), "PDF Document", 1),
+        (str(tree / "c.bin"), "Unknown File Type", 0),
+    ]
+    assert summary["files_scanned"] == 3 and summary["unknown"] == 1
+
+
+def test_cli_output_sqlite_replaces_older_database(tmp_path, capsys):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    make_tree(tree)
+    db = tmp_path / "scan.db"
+    with sqlite3.connect(db) as conn:
+        # A table from before magic_db_version and violations existed
+        conn.execute("CREATE TABLE ftcheck_results (path TEXT, ok INTEGER)")
+        conn.execute("INSERT INTO ftcheck_results VALUES ('stale', 1)")
+        # The user's own tables, which happen to share the generic names
+        conn.execute("CREATE TABLE results (path TEXT)")
+        conn.execute("INSERT INTO results VALUES ('mine')")
+        conn.execute("CREATE TABLE summary (key TEXT)")
+    conn.close()
+
+    assert cli.main([str(tree), "-o", f"sqlite:{db}"]) == 1
+    assert cli.main([str(tree), "-o", f"sqlite:{db}"]) == 1
+    capsys.readouterr()
+
+    with sqlite3.connect(db) as conn:
+        paths = [row[0] for row in conn.execute("SELECT path FROM ftcheck_results ORDER BY path")]
+        mine = conn.execute("SELECT path FROM results").fetchall()
+        summary_columns = [row[1] for row in conn.execute("PRAGMA table_info(summary)")]
+    conn.close()
+    assert paths == [str(tree / name) for name in ("a.png", "b.jpg", "c.bin")]
+    assert mine == [("mine",)]
+    assert summary_columns == ["key"]
+
+
+def test_cli_sink_write_failure_exits_2(tmp_path, capsys, monkeypatch):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    make_tree(tree)
+
+    def failing_write(self, rows):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(sinks.SqliteSink, "_write_batch", failing_write)
+
+    exit_code = cli.main([str(tree), "-o", f"sqlite:{tmp_path / 'scan.db'}"])
+
+    assert exit_code == 2
+    assert "[SINK]" in capsys.readouterr().err
+
+
+def test_sink_base_class_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        sinks.Sink(str(tmp_path / "x"))
+
+
+def test_cli_output_csv(tmp_path, capsys):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    make_tree(tree)
+    out = tmp_path / "scan.csv"
+
+    cli.main([str(tree), str(tmp_path / "missing"), "-o", f"csv:{out}"])
+    capsys.readouterr()
+
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["path"] for r in rows][0] == str(tmp_path / "missing")
+    assert rows[0]["error_code"] == "ENOENT"
+    assert {r["file_type"] for r in rows[1:]} == {"PNG Image", "PDF Document", "Unknown File Type"}
+
+
+def test_cli_output_parquet(tmp_path, capsys):
+    pq = pytest.importorskip("pyarrow.parquet")
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    make_tree(tree)
+    out = tmp_path / "scan.parquet"
+
+    cli.main([str(tree), "-o", f"parquet:{out}"])
+    capsys.readouterr()
+
+    assert pq.read_table(out).num_rows == 3
+
+
+def test_cli_sink_rejects_json(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path), "--json", "-o", f"sqlite:{tmp_path / 'x.db'}"])
+
+
+def test_parse_sink_spec_leaves_plain_paths_alone():
+    assert sinks.parse_sink_spec("sqlite:/tmp/x.db") == ("sqlite", "/tmp/x.db")
+    assert sinks.parse_sink_spec("results.txt") is None
+    assert sinks.parse_sink_spec("C:\\\\out.txt") is None
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from filetype_checker import cli, throttle
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_waits():
+    clock = FakeClock()
+    bucket = throttle.TokenBucket(10, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(12)]
+
+    assert waits[:10] == [0.0] * 10
+    assert waits[10] == pytest.approx(0.1)
+    assert waits[11] == pytest.approx(0.1)
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = throttle.TokenBucket(100, clock=clock, sleep=clock.sleep)
+    bucket.acquire(100)
+
+    clock.now += 0.5
+    assert bucket.acquire(50) == 0.0
+    assert bucket.acquire(50) == pytest.approx(0.5)
+
+
+def test_throttle_records_time_spent_waiting():
+    clock = FakeClock()
+    limiter = throttle.Throttle(files_per_sec=1, bytes_per_sec=4, clock=clock, sleep=clock.sleep)
+
+    for _ in range(3):
+        limiter.before_file()
+        limiter.after_read(8)
+
+    assert limiter.throttled_count == 3
+    assert limiter.throttled_seconds == pytest.approx(sum(clock.slept))
+
+
+def test_throttle_is_shared_safely_between_threads():
+    clock = FakeClock()
+    lock = threading.Lock()
+
+    def sleep(seconds):
+        with lock:
+            clock.slept.append(seconds)
+
+    limiter = throttle.Throttle(files_per_sec=10, clock=clock, sleep=sleep)
+    threads = [
+        threading.Thread(target=lambda: [limiter.before_file() for _ in range(25)])
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 100 files with a 10-file burst need 90 more tokens at 10/s, whoever asks first
+    assert sum(clock.slept) == pytest.approx(sum(i / 10 for i in range(1, 91)))
+    assert limiter.throttled_count == 90
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [("idle", (3, 0)), ("best-effort", (2, 4)), ("best-effort:7", (2, 7))],
+)
+def test_parse_ionice(spec, expected):
+    assert throttle.parse_ionice(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["realtime", "idle:3", "best-effort:9", "best-effort:x"])
+def test_parse_ionice_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        throttle.parse_ionice(spec)
+
+
+def test_cli_reports_throttle_stats(tmp_path, capsys):
+    for i in range(3):
+        (tmp_path / f"{i}.pdf").write_bytes(b"%PDF-1.4")
+
+    exit_code = cli.main([str(tmp_path), "--max-files-per-sec", "1000", "--nice", "0"])
+    captured = capsys.readouterr()
+
+    assert exit_code == 0
+    assert "Throttled: " in captured.err
+
+
+def test_cli_rejects_non_positive_rate(tmp_path):
+    with pytest.raises(SystemExit) as excinfo:
+        cli.main([str(tmp_path), "--max-bytes-per-sec", "0"])
+    assert excinfo.value.code == 2
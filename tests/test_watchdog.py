@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+
+from filetype_checker import watchdog
+from filetype_checker.error import FileTimeoutError
+
+
+def test_map_preserves_order():
+    with watchdog.Watchdog(str.upper, timeout=5, threads=3) as dog:
+        results = list(dog.map(["a", "b", "c", "d", "e"]))
+
+    assert results == [("a", "A"), ("b", "B"), ("c", "C"), ("d", "D"), ("e", "E")]
+    assert dog.abandoned == 0
+
+
+def test_hung_call_times_out_and_scan_continues():
+    release = threading.Event()
+
+    def fn(path):
+        if path == "hung":
+            release.wait()
+        return path
+
+    with watchdog.Watchdog(fn, timeout=0.2, threads=1) as dog:
+        results = list(dog.map(["a", "hung", "b", "c"]))
+    release.set()
+
+    assert [path for path, _ in results] == ["a", "hung", "b", "c"]
+    error = results[1][1]
+    assert isinstance(error, FileTimeoutError)
+    assert error.code == "ETIMEDOUT"
+    assert error.details == {"path": "hung", "timeout_seconds": 0.2}
+    assert [result for _, result in results[2:]] == ["b", "c"]
+    assert dog.abandoned == 1
+
+
+def test_exceptions_propagate_to_caller():
+    def fn(path):
+        raise ValueError(path)
+
+    with watchdog.Watchdog(fn, timeout=5, threads=2) as dog:
+        with pytest.raises(ValueError, match="x"):
+            list(dog.map(["x"]))
+
+
+def test_consecutive_timeouts_give_up_on_the_rest_of_the_directory():
+    release = threading.Event()
+    calls = []
+
+    def fn(path):
+        calls.append(path)
+        if "hung" in path:
+            release.wait()
+        return path
+
+    paths = ["a/x", "a/hung1", "a/hung2", "a/y", "a/z", "b/x", "b/y"]
+    try:
+        with watchdog.Watchdog(fn, timeout=0.1, threads=1, max_consecutive=2) as dog:
+            results = list(dog.map(paths))
+    finally:
+        release.set()
+
+    assert [path for path, _ in results] == paths
+    assert results[0][1] == "a/x"
+    assert [result.code for _, result in results[1:5]] == ["ETIMEDOUT"] * 4
+    assert results[3][1].message == "Not read: 2 files in a row timed out in a: a/y"
+    assert results[5:] == [("b/x", "b/x"), ("b/y", "b/y")]
+    assert dog.abandoned == 2 and not dog.dead
+    assert calls == ["a/x", "a/hung1", "a/hung2", "b/x", "b/y"]
+
+
+def test_completed_file_resets_the_timeout_count():
+    release = threading.Event()
+
+    def fn(path):
+        if "hung" in path:
+            release.wait()
+        return path
+
+    paths = ["a/hung1", "a/x", "a/hung2", "a/y"]
+    try:
+        with watchdog.Watchdog(fn, timeout=0.1, threads=1, max_consecutive=2) as dog:
+            results = list(dog.map(paths))
+    finally:
+        release.set()
+
+    assert results[1] == ("a/x", "a/x")
+    assert results[3] == ("a/y", "a/y")
+
+
+def test_stuck_threads_are_replaced_up_to_the_cap():
+    release = threading.Event()
+
+    def fn(path):
+        if path.startswith("hung"):
+            release.wait()
+        return path
+
+    paths = ["hung1/a", "x/a", "hung2/a", "x/b", "hung3/a", "x/c"]
+    before = threading.active_count()
+    try:
+        with watchdog.Watchdog(fn, timeout=0.1, threads=1, max_abandoned=2) as dog:
+            results = list(dog.map(paths))
+            alive = threading.active_count() - before
+            dead = dog.dead
+    finally:
+        release.set()
+
+    assert [results[i][1].code for i in (0, 2, 4, 5)] == ["ETIMEDOUT"] * 4
+    assert results[1] == ("x/a", "x/a") and results[3] == ("x/b", "x/b")
+    assert results[5][1].message == "Not read: 3 reads are still hung: x/c"
+    assert dead and dog.abandoned == 3
+    assert alive <= 3
+
+
+def test_stuck_thread_goes_back_to_work_when_its_call_returns():
+    release = threading.Event()
+
+    def fn(path):
+        if path.startswith("hung"):
+            release.wait()
+        return path
+
+    with watchdog.Watchdog(fn, timeout=0.1, threads=1, max_abandoned=0) as dog:
+        error = dog.call("hung/a")
+        assert dog.dead
+        release.set()
+        deadline = time.monotonic() + 5
+        while dog.dead and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert dog.call("x/a") == "x/a"
+    assert error.code == "ETIMEDOUT"
+
+
+def test_call_runs_on_watchdog_threads_with_a_deadline():
+    release = threading.Event()
+
+    def hang(path):
+        release.wait()
+        return path
+
+    try:
+        with watchdog.Watchdog(str.upper, timeout=0.1, threads=1) as dog:
+            assert dog.call("a") == "A"
+            assert dog.call("b", str.title) == "B"
+            error = dog.call("c", hang)
+    finally:
+        release.set()
+
+    assert isinstance(error, FileTimeoutError)
+    assert error.details == {"path": "c", "timeout_seconds": 0.1}